@@ -1,44 +1,57 @@
 
 
-import plotly.express as px
 import time
-from sqlalchemy.orm import joinedload
-from sqlalchemy.dialects.sqlite import dialect  # Change dialect if needed
-import uuid
-from deep_translator import GoogleTranslator
+import functools
+import mimetypes
 import random
-import openai
 import os
 import streamlit as st
 from streamlit_option_menu import option_menu
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session
 import pandas as pd
-from dateutil import parser
 from datetime import datetime, timedelta
-from streamlit_extras.dataframe_explorer import dataframe_explorer
-from streamlit_extras.stylable_container import stylable_container
 #from pages import add_country_form, add_city_form, add_project_form, add_plan_form, add_role_form
-from pages import dashboard
-import re
+from database import engine, SessionLocal, unit_of_work
+
+# Page-only dependencies (plotly via pages.dashboard, deep_translator, jwt,
+# _qa_automation_, sequence_audit) are imported where they are used, so the
+# login page does not pay for them. See benchmarks/bench_imports.py.
 
 st.set_page_config(page_title="QA", page_icon="person-plus", layout="wide")
 
 
-import jwt
 import secrets
 from dotenv import load_dotenv
-from passlib.hash import pbkdf2_sha256 as sha256
 from streamlit_cookies_manager import EncryptedCookieManager
 from models import (
     User, countryIT, cityIT, projectIT, planIT, Role, Comment, Chat, Attachments, 
-    StatusCount, ModifiedLog, DeletedLog, ToDoList, TaskHistory, TestCase,
+    StatusCount, ToDoList, TaskHistory, TestCase,
     create_superadmin, generate_password_hash, check_password_hash, generate_sequential_code
 )
 
 
-from _qa_automation_ import qa_automation_page
+from migrations import bootstrap
+from audit_log import record
+from bulk_ops import bulk_update, chunked_delete, diff_frames
+from blob_store import delete_test_case_attachments, store_blob
+from history import previous_values, record_deletions, record_updates, snapshot_rows
+from ingest import ingest_tasks, ingest_test_cases
+from numbering import assign_test_case_number, format_test_case_id, scenario_key, with_number_columns
+from sqlalchemy.exc import IntegrityError
+from data_access import (
+    TEST_CASE_SORTS, count_attachments, count_test_cases, get_attachment_page, get_distinct_values,
+    get_test_case_label, get_test_case_page, get_test_case_statuses, get_user_frame, search_test_case_labels,
+)
+
+
+@st.cache_resource(show_spinner=False)
+def init_database():
+    """First-run hook: creates the schema and seeds data once per server process."""
+    bootstrap(engine)
+
+
+# Set AUTO_BOOTSTRAP=false when deployments run `python manage.py bootstrap` instead
+if os.getenv("AUTO_BOOTSTRAP", "true").lower() in ("1", "true", "yes"):
+    init_database()
 
 
 # Load environment variables
@@ -152,9 +165,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-DATABASE_URL = 'sqlite:///dataQatables.db'
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = scoped_session(sessionmaker(bind=engine))
 db_session = SessionLocal()
 
 
@@ -286,6 +296,8 @@ def update_password():
 
 # Restore authentication from cookies if available
 if auth_token and not st.session_state.logged_in:
+    import jwt
+
     try:
         payload = jwt.decode(auth_token, SECRET_KEY, algorithms=["HS256"])
         st.session_state.logged_in = True
@@ -302,6 +314,8 @@ if auth_token and not st.session_state.logged_in:
 
 def generate_token(username, role):
     """Generate a secure JWT token."""
+    import jwt
+
     payload = {
         "username": username,
         "role": role,
@@ -312,6 +326,8 @@ def generate_token(username, role):
 
 # --- Function to Decode Token ---
 def decode_token(token):
+    import jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         return payload["username"], payload["role"], None
@@ -424,151 +440,34 @@ def show_loader(duration=3, message="⏳ Loading..."):
 
 
 
-def get_user_data(username):
-    with SessionLocal() as session:
-        return {
-            "test_cases": session.query(TestCase).filter_by(created_by=username).all(),
-            "tasks": session.query(ToDoList).filter_by(created_by=username).all(),
-            "privileges": session.query(User).filter_by(username=username).all(),
-            "attachments": session.query(Attachments).filter_by(created_by=username).all(),
-            "plans": session.query(planIT).filter_by(created_by=username).all(),
-            "projects": session.query(projectIT).filter_by(created_by=username).all(),
-        }
-
-# Store user data in session state to prevent multiple DB queries
-if "user_data" not in st.session_state:
-    st.session_state.user_data = get_user_data(st.session_state.username)
-
-
-
-# Function to load tasks from DB
-def load_tasks():
-    return pd.DataFrame([task.__dict__ for task in db_session.query(ToDoList).all()])
+# Task grid columns that Save Changes may write (id, dates and Select are not editable/persisted)
+TASK_EDITABLE_COLUMNS = [
+    "project", "tasks_assigned", "description", "build_version", "priority", "severity", "status",
+    "time_spent_min", "test_cases", "defects_count", "fixed", "need_to_fix_remaining", "pass_count",
+    "ongoing", "time_spent_per_case_min",
+]
 
 
 # Function to delete tasks
 def delete_task(task_ids):
-    db_session.query(ToDoList).filter(ToDoList.id.in_(task_ids)).delete(synchronize_session=False)
+    """Deletes the tasks in one transaction, chunked under SQLite's parameter limit, and logs their snapshots."""
+    snapshots = snapshot_rows(db_session, ToDoList, task_ids)
+    deleted = chunked_delete(db_session, ToDoList, ToDoList.id, task_ids)
     db_session.commit()
+    record_deletions(ToDoList, snapshots, st.session_state.username, "tasks_assigned")
+    return deleted
 
 
-# Function to display task list in a professional table with checkboxes and save edits
-def display_task_list():
-    st.subheader("Tasks List")
-
-
-    # Fetch only the logged-in user's tasks
-    user_tasks = get_user_data(st.session_state.username)["tasks"]
-
-    if user_tasks:
-        # Convert to DataFrame
-        tasks_df = pd.DataFrame([t.__dict__ for t in user_tasks])
-        tasks_df.drop(columns=['_sa_instance_state'], inplace=True)  # Remove SQLAlchemy metadata
-
-
-
-    if not tasks_df.empty:
-        # Convert 'Start Date' & 'End Date' to readable format
-        tasks_df["start_date"] = tasks_df["start_date"].apply(lambda x: x.strftime("%Y-%m-%d"))
-        tasks_df["end_date"] = tasks_df["end_date"].apply(lambda x: x.strftime("%Y-%m-%d"))
-
-        # Convert 'Ongoing' column to integer (avoid checkbox rendering)
-        tasks_df["ongoing"] = tasks_df["ongoing"].astype(int)
-
-        # Add checkbox column for selection
-        tasks_df["Select"] = False  # Default to unchecked
-
-        # Create "Select All" checkbox
-        select_all = st.checkbox("Select All Tasks", key="select_all")
-
-        # Update all checkboxes based on "Select All"
-        if select_all:
-            tasks_df["Select"] = True  # Mark all as selected
-
-        # Display the table with editable fields
-        edited_df = st.data_editor(
-            tasks_df[
-                [
-                    "Select",
-                    "id",  # Hidden in UI but required for database updates
-                    "project",
-                    "tasks_assigned",
-                    "description",
-                    "build_version",
-                    "priority",
-                    "severity",
-                    "start_date",
-                    "end_date",
-                    "status",
-                    "time_spent_min",
-                    "test_cases",
-                    "defects_count",
-                    "fixed",
-                    "need_to_fix_remaining",
-                    "pass_count",
-                    "ongoing",
-                    "time_spent_per_case_min",
-                ]
-            ],
-            column_config={
-                "Select": st.column_config.CheckboxColumn("✔️ Select"),
-                "ongoing": st.column_config.NumberColumn("Ongoing", help="Number of ongoing tasks"),
-            },
-            disabled=["id", "start_date", "end_date"],  # Prevent edits for specific columns
-            num_rows="fixed",
-            height=400,
-        )
-
-        # Extract selected task IDs for deletion
-        selected_task_ids = edited_df.loc[edited_df["Select"], "id"].tolist()
-
-        # Button to save changes
-        if st.button("💾 Save Changes"):
-            for index, row in edited_df.iterrows():
-                update_task(
-                    row["id"],  # Primary Key
-                    {
-                        "project": row["project"],
-                        "tasks_assigned": row["tasks_assigned"],
-                        "description": row["description"],
-                        "build_version": row["build_version"],
-                        "priority": row["priority"],
-                        "severity": row["severity"],
-                        "status": row["status"],
-                        "time_spent_min": row["time_spent_min"],
-                        "test_cases": row["test_cases"],
-                        "defects_count": row["defects_count"],
-                        "fixed": row["fixed"],
-                        "need_to_fix_remaining": row["need_to_fix_remaining"],
-                        "pass_count": row["pass_count"],
-                        "ongoing": row["ongoing"],
-                        "time_spent_per_case_min": row["time_spent_per_case_min"],
-                    }
-                )
-            st.success("✅ Changes saved successfully!")
-            time.sleep(1)
-            st.rerun()  # Refresh page to reflect updates
-
-        # Delete Button
-        if selected_task_ids:
-            if st.button("🗑️ Delete Selected Tasks"):
-                delete_task(selected_task_ids)
-                st.warning("🚨 Selected tasks deleted!")
-                st.rerun()
-
-    else:
-        st.info("No tasks uploaded yet.")
-
-
-
-# Function to update a task
-def update_task(task_id, updates):
-    task = db_session.query(ToDoList).filter_by(id=task_id).first()
-    if task:
-        for field, value in updates.items():
-            setattr(task, field, value)  # Dynamically update fields
+# Function to save edited tasks
+def save_task_changes(original_df, edited_df):
+    """Writes only the changed task rows/cells in one transaction and logs their diffs; returns the number of rows updated."""
+    changes = diff_frames(original_df, edited_df, {column: column for column in TASK_EDITABLE_COLUMNS})
+    if changes:
+        previous = previous_values(db_session, ToDoList, changes, "tasks_assigned")
+        bulk_update(db_session, ToDoList, changes)
         db_session.commit()
-        st.success(f"✅ Task {task_id} updated successfully!")
+        record_updates(ToDoList, changes, previous, st.session_state.username, "tasks_assigned")
+    return len(changes)
 
 # Function to update a task
 def update_test_case(task_id, updates):
@@ -583,68 +482,24 @@ def update_test_case(task_id, updates):
 
 # Function to process and store data
 def process_uploaded_file(uploaded_file):
-    try:
-        df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-
-        # ✅ Fill missing values
-        df.fillna({
-            'Build Version': 'N/A',
-            'Priority': '-',
-            'Severity': '-',
-            'Start Date': datetime.today().date(),
-            'End Date': datetime.today().date(),
-            'Time Spent (Min)': 0,
-            'Test Cases': 0,
-            'Defects Count': 0,
-            'Fixed': 0,
-            'Need to Fix (Remaining)': 0,
-            'Pass Count': 0,
-            'Ongoing': 0,
-            'Time Spent Per Case (Min)': 0.00
-        }, inplace=True)
-
-        # ✅ Convert date columns
-        df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce').dt.date
-        df['End Date'] = pd.to_datetime(df['End Date'], errors='coerce').dt.date
-
-        # Database session
-        Session = sessionmaker(bind=engine)
-        db_session = Session()
-
-        # ✅ Insert data into the database
-        for _, row in df.iterrows():
-            db_session.add(ToDoList(
-                project=row.get('Project', "N/A"),
-                tasks_assigned=row.get('Tasks Assigned', "N/A"),
-                description=row.get('Description', "N/A"),
-                build_version=row.get('Build Version', "N/A"),
-                priority=row.get('Priority', "N/A"),
-                severity=row.get('Severity', "N/A"),
-                start_date=row['Start Date'] if pd.notna(row['Start Date']) else datetime.today().date(),
-                end_date=row['End Date'] if pd.notna(row['End Date']) else datetime.today().date(),
-                status=row.get('Status', "N/A"),
-                time_spent_min=int(row.get('Time Spent (Min)', 0)),
-                test_cases=int(row.get('Test Cases', 0)),
-                defects_count=int(row.get('Defects Count', 0)),
-                fixed=int(row.get('Fixed', 0)),
-                need_to_fix_remaining=int(row.get('Need to Fix (Remaining)', 0)),
-                pass_count=int(row.get('Pass Count', 0)),
-                ongoing=str(row.get('Ongoing', "False")).strip().lower() in ['yes', 'true', '1'],
-                time_spent_per_case_min=float(row.get('Time Spent Per Case (Min)', 0.00)),
-                created_by=st.session_state.username  
-            ))
+    """Streams the sheet into to_do_list in chunks, with a progress bar; nothing is saved if it fails."""
+    progress_bar = st.progress(0.0, text="Importing tasks...")
 
-        db_session.commit()
-        db_session.close()
-
-        # ✅ Show success message and refresh page automatically
-        st.success("✅ Tasks uploaded successfully!")
-        #time.sleep(2)
-        #st.rerun()
+    def report(fraction, inserted):
+        progress_bar.progress(fraction if fraction is not None else 0.0, text=f"Imported {inserted:,} tasks...")
 
+    try:
+        result = ingest_tasks(uploaded_file, st.session_state.username, progress=report)
     except Exception as e:
-        db_session.rollback()
+        progress_bar.empty()
         st.error(f"❌ Error processing file: {str(e)}")
+        return False
+
+    progress_bar.empty()
+    st.success(f"✅ {result['inserted']:,} tasks uploaded successfully!")
+    if result["invalid"]:
+        st.warning(f"⚠️ {result['invalid']:,} cell(s) could not be parsed and were replaced with defaults.")
+    return True
 
 # Function to handle file uploads
 def upload_sheet():
@@ -652,8 +507,10 @@ def upload_sheet():
     
     uploaded_file = st.file_uploader("Upload CSV or Excel", type=["csv", "xlsx"])
     
-    if uploaded_file:
-        process_uploaded_file(uploaded_file)  # Process the file immediately
+    # Reruns keep the upload in the widget; import each file only once
+    if uploaded_file and st.session_state.get("imported_file_id") != uploaded_file.file_id:
+        if process_uploaded_file(uploaded_file):  # Process the file immediately
+            st.session_state.imported_file_id = uploaded_file.file_id
 
 
 
@@ -681,6 +538,8 @@ def generate_test_case_sentence(test_scenario, field_parent, field_child, detail
     
     if add_urdu:
         try:
+            from deep_translator import GoogleTranslator
+
             urdu_translation = GoogleTranslator(source="auto", target="ur").translate(sentence)
             return f"{sentence}\n\n {urdu_translation}"
         except Exception as e:
@@ -768,43 +627,6 @@ def add_test_case():
     # Store test_case_id in session state
     st.session_state.test_case_id = test_case_id
 
-    # TS# and TC# logic
-    ts_number = 1
-    tc_number = 1
-    scenario_exists = False
-    expectation_exists = False
-    duplicated_case_found = False
-
-    for case in existing_cases:
-        match = re.search(r"-TS# (\d+)-TC# (\d+)", case.test_case_id)
-        if match:
-            existing_ts = int(match.group(1))
-            existing_tc = int(match.group(2))
-
-            if case.test_scenario == selected_scenario_clean:
-                scenario_exists = True
-                ts_number = existing_ts
-
-                if case.expected_result == expected_result:
-                    expectation_exists = True
-                    tc_number = existing_tc
-                else:
-                    tc_number = existing_tc + 1
-
-                if existing_ts == ts_number and existing_tc == tc_number:
-                    duplicated_case_found = True
-                    break
-
-    if not scenario_exists:
-        last_ts = int(existing_cases[-1].test_case_id.split("-TS# ")[1].split("-")[0]) if existing_cases else 0
-        ts_number = last_ts + 1
-        tc_number = 1
-
-
-    # Generate Test Case ID
-    timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
-    test_case_id = f"{task_id}-{build_version}-{project}-TS# {ts_number}-TC# {tc_number}-{timestamp}"
-
     # Input Fields
     with col2:
         field_parent = st.text_input("Field Name / Parent", value="")
@@ -866,9 +688,12 @@ def add_test_case():
     # Save Test Case Button
     with col2:
         if st.button("✅ Save Test Case"):
-            if not test_case_id.strip():
-                st.error("🚨 Test Case ID cannot be empty!")
-                return
+            # TS#/TC#: same scenario and expectation keep their numbers, otherwise the next free ones
+            ts_number, tc_number, _ = assign_test_case_number(
+                db_session, task_id, selected_scenario_clean, expected_result
+            )
+            timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+            test_case_id = format_test_case_id(task_id, build_version, project, ts_number, tc_number, timestamp)
 
             # Generate Test Cases
             test_cases = generate_test_case_sentence(
@@ -878,6 +703,9 @@ def add_test_case():
             # Create new TestCase entry
             new_test_case = TestCase(
                 test_case_id=test_case_id,
+                ts_number=ts_number,
+                tc_number=tc_number,
+                scenario_key=scenario_key(selected_scenario_clean),
                 test_scenario=selected_scenario_clean,
                 field_parent=field_parent,
                 field_child=field_child,
@@ -917,115 +745,47 @@ def generate_test_case_log(task_id, build_version, project, timestamp):
 # Function to log modifications
 def log_changes(test_case_id, task_assigned, action, modified_by="admin"):
     changes = f"Test case {test_case_id} {action}."
-    new_log = ModifiedLog(
-        code=test_case_id,
-        tasks_assigned=task_assigned,
-        modified_by=modified_by,
-        modified_at=datetime.now(),
-        changes=changes
-    )
-    db_session.add(new_log)
-    db_session.commit()
-    
-    
-    # Optional: Log the deletion event if needed
-    # new_deletion_log = DeletedLog(
-    #     code=test_case_id,
-    #     tasks_assigned=task_assigned,
-    #     deleted_by=modified_by,
-    #     deleted_at=datetime.now()
-    # )
-    # db_session.add(new_deletion_log)
-    # db_session.commit()
+    record("modification", test_case_id, task_assigned, modified_by, changes)
 
 
 
 def upload_test_cases():
     st.subheader("📤 Upload Test Cases")
     
-    # Fetch only the logged-in user's test cases
-    user_cases = get_user_data(st.session_state.username)["test_cases"]
-
-    if user_cases:
-        # Convert to DataFrame
-        test_cases = pd.DataFrame([t.__dict__ for t in user_cases])
-        test_cases.drop(columns=['_sa_instance_state'], inplace=True)  # Remove SQLAlchemy metadata
-    else:
-        test_cases = pd.DataFrame()  # ✅ Always initialize as a DataFrame
-
-    if test_cases.empty:  # ✅ Correct way to check for empty DataFrame
+    if not count_test_cases(st.session_state.username):
         st.info("No test cases uploaded yet.")
 
-    uploaded_file = st.file_uploader("Upload CSV or Excel", type=["csv", "xlsx"])
+    uploaded_file = st.file_uploader("Upload CSV or Excel", type=["csv", "xlsx"], key="test_case_upload")
 
-    if uploaded_file is not None:
+    # Reruns keep the upload in the widget; import each file only once
+    if uploaded_file is not None and st.session_state.get("imported_test_case_file_id") != uploaded_file.file_id:
         try:
-            # Load file based on format
-            df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-
-            # Fetch all tasks from DB for mapping
-            tasks = {task.id: task for task in db_session.query(ToDoList).all()}
-
-            new_test_cases = []  # Store valid cases for bulk insert
-
-            for _, row in df.iterrows():
-                test_case_id = str(row.get("Test Case ID", "")).strip()
-
-                if not test_case_id:
-                    st.warning("⚠️ Skipping row with empty Test Case ID.")
-                    continue
-
-                task_id = int(row["Task ID"]) if "Task ID" in row and not pd.isna(row["Task ID"]) else None
-
-                if task_id not in tasks:
-                    st.error(f"❌ Task ID {task_id} not found. Skipping row.")
-                    continue
-
-                # Auto-fill missing fields
-                selected_task = tasks[task_id]
-                build_version, project = selected_task.build_version, selected_task.project
-
-                # Generate unique Test Case ID if missing
-                if not test_case_id or test_case_id == "nan":
-                    timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
-                    test_case_id = f"{task_id}-{build_version}-{project}-{timestamp}"
-
-                # Check for duplicate Test Case ID
-                if db_session.query(TestCase).filter_by(test_case_id=test_case_id).first():
-                    st.warning(f"⚠️ Skipping duplicate Test Case ID: {test_case_id}")
-                    continue
-
-                # Create new TestCase object
-                new_case = TestCase(
-                    test_case_id=test_case_id,
-                    test_scenario=row.get("Test Scenario", ""),
-                    field_parent=row.get("Field Name / Parent", ""),
-                    field_child=row.get("Field Name / Child", ""),
-                    detailed_input=row.get("Detailed Input", ""),
-                    test_cases=row.get("Test Cases", ""),
-                    pre_condition=row.get("Pre-Condition", ""),
-                    test_steps=row.get("Test Steps", ""),
-                    test_data=row.get("Test Data", ""),
-                    post_condition=row.get("Post Condition", ""),
-                    expected_result=row.get("Expected Result", ""),
-                    actual_result=row.get("Actual Result", ""),
-                    status=row.get("Status (Pass/Fail)", "Pending"),
-                    task_id=task_id,
-                    build_version=build_version,
-                    created_by=st.session_state.username,
-                )
-                new_test_cases.append(new_case)
-
-            if new_test_cases:
-                db_session.bulk_save_objects(new_test_cases)  # ✅ Bulk insert for efficiency
-                db_session.commit()
-                st.success(f"✅ {len(new_test_cases)} test cases uploaded successfully!")
-                st.rerun()
-            else:
-                st.warning("⚠️ No valid test cases found to upload.")
-
+            result = ingest_test_cases(uploaded_file, st.session_state.username)
         except Exception as e:
             st.error(f"❌ Error processing file: {e}")
+        else:
+            st.session_state.imported_test_case_file_id = uploaded_file.file_id
+            st.session_state.test_case_import_result = result
+            st.rerun()
+
+    # Summary of the last import, with the skipped rows as one report
+    result = st.session_state.get("test_case_import_result")
+    if result:
+        if result["inserted"]:
+            st.success(f"✅ {result['inserted']:,} test cases uploaded successfully!")
+        else:
+            st.warning("⚠️ No valid test cases found to upload.")
+
+        rejected = result["rejected"]
+        if not rejected.empty:
+            counts = ", ".join(f"{reason}: {count:,}" for reason, count in rejected["Reason"].value_counts().items())
+            st.warning(f"⚠️ {len(rejected):,} row(s) skipped ({counts}).")
+            st.download_button(
+                "📥 Download skipped rows (CSV)",
+                rejected.to_csv(index=False),
+                "test_case_upload_rejections.csv",
+                "text/csv",
+            )
 
 
 
@@ -1038,7 +798,7 @@ def test_cases_page():
     
 def display_task_list():
     st.subheader("Tasks List")
-    tasks_df = load_tasks()  # Fetch tasks from DB
+    tasks_df = get_user_frame("tasks", None)  # Every user's tasks
 
     # ✅ Ensure tasks_df is always a DataFrame
     if tasks_df is None or tasks_df.empty:
@@ -1101,36 +861,24 @@ def display_task_list():
 
     # Button to save changes
     if st.button("💾 Save Changes"):
-        for index, row in edited_df.iterrows():
-            update_task(
-                row["id"],  # Primary Key
-                {
-                    "project": row["project"],
-                    "tasks_assigned": row["tasks_assigned"],
-                    "description": row["description"],
-                    "build_version": row["build_version"],
-                    "priority": row["priority"],
-                    "severity": row["severity"],
-                    "status": row["status"],
-                    "time_spent_min": row["time_spent_min"],
-                    "test_cases": row["test_cases"],
-                    "defects_count": row["defects_count"],
-                    "fixed": row["fixed"],
-                    "need_to_fix_remaining": row["need_to_fix_remaining"],
-                    "pass_count": row["pass_count"],
-                    "ongoing": row["ongoing"],
-                    "time_spent_per_case_min": row["time_spent_per_case_min"],
-                }
-            )
-        st.success("✅ Changes saved successfully!")
-        time.sleep(1)
-        st.rerun()  # Refresh page to reflect updates
+        try:
+            updated = save_task_changes(tasks_df, edited_df)
+        except Exception as e:
+            db_session.rollback()
+            st.error(f"❌ Could not save changes: {e}")
+        else:
+            if updated:
+                st.success(f"✅ {updated} task(s) updated.")
+                time.sleep(1)
+                st.rerun()  # Refresh page to reflect updates
+            else:
+                st.info("ℹ️ No changes to save.")
 
     # Delete Button
     if selected_task_ids:
         if st.button("🗑️ Delete Selected Tasks"):
-            delete_task(selected_task_ids)
-            st.warning("🚨 Selected tasks deleted!")
+            deleted = delete_task(selected_task_ids)
+            st.warning(f"🚨 {deleted} task(s) deleted!")
             st.rerun()
 
 
@@ -1138,7 +886,10 @@ def display_task_list():
 
 
 def delete_test_cases(test_case_ids):
-    db_session.query(TestCase).filter(TestCase.test_case_id.in_(test_case_ids)).delete(synchronize_session=False)
+    """Deletes test cases by Test Case ID, with their attachments, in one transaction."""
+    ids = [row.id for row in db_session.query(TestCase.id).filter(TestCase.test_case_id.in_(test_case_ids))]
+    delete_test_case_attachments(db_session, ids)
+    chunked_delete(db_session, TestCase, TestCase.id, ids)
     db_session.commit()
 
 
@@ -1191,63 +942,30 @@ def display_scenario_list():
             st.error("Test Scenario and Expected Result cannot be empty!")
             return
 
-        # Fetch existing test cases for the same task
-        existing_cases = (
-            db_session.query(TestCase)
-            .filter(TestCase.task_id == task_data.tasks_assigned)
-            .order_by(TestCase.test_case_id)
-            .all()
+        # TS#/TC# from the numbering index and the per-task counters
+        ts_number, tc_number, duplicated_case_found = assign_test_case_number(
+            db_session, task_data.tasks_assigned, test_scenario, expected_result
         )
 
-        # Initialize numbering
-        ts_number = 1
-        tc_number = 1
-        scenario_exists = False
-        expectation_exists = False
-        duplicated_case_found = False
-
-        for case in existing_cases:
-            match = re.search(r"-TS# (\d+)-TC# (\d+)", case.test_case_id)  # Extract TS# & TC#
-            if match:
-                existing_ts = int(match.group(1))  # Extract TS#
-                existing_tc = int(match.group(2))  # Extract TC#
-
-                if case.test_scenario == test_scenario:
-                    scenario_exists = True
-                    ts_number = existing_ts  # Keep TS# same
-
-                    if case.expected_result == expected_result:
-                        expectation_exists = True
-                        tc_number = existing_tc  # Keep TC# same
-                    else:
-                        tc_number = existing_tc + 1  # Increment TC# when expectation is different
-
-                    # Check if the exact combination of TS# and TC# already exists
-                    if existing_ts == ts_number and existing_tc == tc_number:
-                        duplicated_case_found = True
-                        break
-
-        if not scenario_exists:
-            last_ts = (
-                int(existing_cases[-1].test_case_id.split("-TS# ")[1].split("-")[0])
-                if existing_cases else 0
-            )
-            ts_number = last_ts + 1  # Increment TS# if new scenario
-            tc_number = 1  # Reset TC# for a new scenario
-
         # If a duplicate test case is found
         if duplicated_case_found:
+            db_session.rollback()
             st.error("Duplicated case found, Check it!")
             return
 
         # Generate unique Test Case ID
         timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
-        test_case_id = f"{task_data.tasks_assigned}-{task_data.build_version}-{task_data.project}-TS# {ts_number}-TC# {tc_number}-{timestamp}"
+        test_case_id = format_test_case_id(
+            task_data.tasks_assigned, task_data.build_version, task_data.project, ts_number, tc_number, timestamp
+        )
 
         try:
             # Create and save test case
             new_test_case = TestCase(
                 test_case_id=test_case_id,
+                ts_number=ts_number,
+                tc_number=tc_number,
+                scenario_key=scenario_key(test_scenario),
                 task_id=task_data.tasks_assigned,
                 test_scenario=test_scenario,
                 expected_result=expected_result,
@@ -1269,99 +987,141 @@ def display_scenario_list():
 
 
 
+# Column -> label for the test case grid ("id" stays as-is, it is required for DB updates)
+TEST_CASE_LABELS = {
+    "test_case_id": "Test Case ID",
+    "test_scenario": "Test Scenario",
+    "field_parent": "Field Name / Parent",
+    "field_child": "Field Name / Child",
+    "detailed_input": "Detailed Input",
+    "test_cases": "Test Cases",
+    "pre_condition": "Pre-Condition",
+    "test_steps": "Test Steps",
+    "test_data": "Test Data",
+    "post_condition": "Post Condition",
+    "expected_result": "Expected Result",
+    "actual_result": "Actual Result",
+    "status": "Status",
+    "task_id": "Task ID",
+    "build_version": "Build Version",
+}
+
+
+# Rows per page offered by the test case grid; TEST_CASE_PAGE_SIZE picks the default
+PAGE_SIZES = [25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = int(os.getenv("TEST_CASE_PAGE_SIZE", "50"))
+
+
 def display_test_cases():
     st.subheader("📌 List View")
+    username = st.session_state.username
+
+    # Filters and sort run in SQL; only one page is ever loaded
+    with st.expander("🔎 Filter & Sort"):
+        col1, col2, col3, col4 = st.columns(4)
+        status = col1.selectbox("Status", ["All"] + get_test_case_statuses(username), key="tc_filter_status")
+        build_version = col2.text_input("Build Version", key="tc_filter_build").strip()
+        task_id = col3.text_input("Task ID", key="tc_filter_task").strip()
+        text = col4.text_input("Search", placeholder="ID, scenario or test case text", key="tc_filter_text").strip()
+        col5, col6 = st.columns(2)
+        sort = col5.selectbox("Sort By", list(TEST_CASE_SORTS), key="tc_sort")
+        page_size = col6.selectbox(
+            "Rows Per Page", PAGE_SIZES,
+            index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE) if DEFAULT_PAGE_SIZE in PAGE_SIZES else 1,
+            key="tc_page_size",
+        )
 
-    # Fetch only the logged-in user's test cases
-    user_cases = get_user_data(st.session_state.username)["test_cases"]
+    if task_id and not task_id.isdigit():
+        st.error("🚨 Task ID must be a number.")
+        task_id = ""
 
-    if user_cases:
-        # Convert to DataFrame
-        test_cases = pd.DataFrame([t.__dict__ for t in user_cases])
-        test_cases.drop(columns=['_sa_instance_state'], inplace=True)  # Remove SQLAlchemy metadata
-    else:
-        test_cases = pd.DataFrame()  # Ensure it's always a DataFrame
+    filters = {
+        "status": None if status == "All" else status,
+        "build_version": build_version or None,
+        "task_id": int(task_id) if task_id else None,
+        "text": text or None,
+    }
 
-    if test_cases.empty:  # ✅ Correct way to check if DataFrame is empty
-        st.info("No test cases uploaded yet.")
+    # Start again from the first page whenever the query changes
+    query = (tuple(sorted(filters.items())), sort, page_size)
+    if st.session_state.get("tc_query") != query:
+        st.session_state.tc_query = query
+        st.session_state.tc_cursors = [None]  # Keyset cursor of every visited page
+    cursors = st.session_state.tc_cursors
+
+    page, next_cursor = get_test_case_page(username, filters, sort, cursors[-1], page_size)
+
+    if page.empty and len(cursors) > 1:  # The rest of this page was deleted
+        cursors.pop()
+        st.rerun()
+
+    if page.empty:
+        filtered = any(value is not None for value in filters.values())
+        st.info("No test cases match the filters." if filtered else "No test cases uploaded yet.")
         return
 
-    # Convert to DataFrame for display
-    df = pd.DataFrame(
-        [
-            {
-                "id": case.id,  # Required for DB updates
-                "Select": False,  # For selection
-                "Test Case ID": case.test_case_id,
-                "Test Scenario": case.test_scenario,
-                "Field Name / Parent": case.field_parent,
-                "Field Name / Child": case.field_child,
-                "Detailed Input": case.detailed_input,
-                "Test Cases": case.test_cases,
-                "Pre-Condition": case.pre_condition,
-                "Test Steps": case.test_steps,
-                "Test Data": case.test_data,
-                "Post Condition": case.post_condition,
-                "Expected Result": case.expected_result,
-                "Actual Result": case.actual_result,
-                "Status": case.status,
-                "Task ID": case.task_id,
-                "Build Version": case.build_version,
-            }
-            for _, case in test_cases.iterrows()
-        ]
-    )
+    total = count_test_cases(username, filters)
+    first_row = (len(cursors) - 1) * page_size + 1
+    nav_prev, nav_info, nav_next = st.columns([1, 4, 1])
+    if nav_prev.button("⬅️ Previous", disabled=len(cursors) == 1, key="tc_prev"):
+        cursors.pop()
+        st.rerun()
+    nav_info.caption(f"Showing {first_row}-{first_row + len(page) - 1} of {total} test cases (page {len(cursors)})")
+    if nav_next.button("Next ➡️", disabled=next_cursor is None, key="tc_next"):
+        cursors.append(next_cursor)
+        st.rerun()
 
-    # Session state to track changes
-    if "edited_df" not in st.session_state:
-        st.session_state.edited_df = df.copy()
+    # Display labels for the editable grid
+    df = page.rename(columns=TEST_CASE_LABELS)
+    df.insert(1, "Select", False)  # For selection
 
     # Select All Checkbox
-    select_all = st.checkbox("Select All")
+    select_all = st.checkbox("Select All", key="tc_select_all")
     if select_all:
         df["Select"] = True
 
-    # Display Editable Table
+    # Display Editable Table: only the saved columns (and Select) are editable; id keys the update
     edited_df = st.data_editor(df, 
-        column_config={"Select": st.column_config.CheckboxColumn("✔️ Select")}
+        column_config={"Select": st.column_config.CheckboxColumn("✔️ Select")},
+        disabled=[column for column in df.columns if column != "Select" and column not in TEST_CASE_LABELS.values()],
+        num_rows="fixed",
     )
 
     # Extract Selected IDs for Deletion
     selected_ids = edited_df.loc[edited_df["Select"], "id"].tolist()
 
-    # ✅ Save Changes Button
+    # ✅ Save Changes Button: write only the cells that differ from the page as loaded
     if st.button("💾 Save Changes"):
-        update_dict = edited_df.set_index("id").to_dict(orient="index")
-
-        for case_id, new_values in update_dict.items():
-            test_case = db_session.query(TestCase).filter_by(id=case_id).first()
-            if test_case:
-                test_case.test_case_id = new_values["Test Case ID"]
-                test_case.test_scenario = new_values["Test Scenario"]
-                test_case.field_parent = new_values["Field Name / Parent"]
-                test_case.field_child = new_values["Field Name / Child"]
-                test_case.detailed_input = new_values["Detailed Input"]
-                test_case.test_cases = new_values["Test Cases"]
-                test_case.pre_condition = new_values["Pre-Condition"]
-                test_case.test_steps = new_values["Test Steps"]
-                test_case.test_data = new_values["Test Data"]
-                test_case.post_condition = new_values["Post Condition"]
-                test_case.expected_result = new_values["Expected Result"]
-                test_case.actual_result = new_values["Actual Result"]
-                test_case.status = new_values["Status"]
-                test_case.task_id = new_values["Task ID"]
-                test_case.build_version = new_values["Build Version"]
-
-        db_session.commit()  # ✅ Save all changes at once
-        st.success("✅ Changes saved successfully!")
-        time.sleep(1)
-        st.rerun()
+        try:
+            changes = diff_frames(df, edited_df, {label: field for field, label in TEST_CASE_LABELS.items()})
+        except ValueError as e:
+            st.error(f"❌ Could not save changes: {e}")
+            return
+        changes = [with_number_columns(change) for change in changes]  # Keep TS#/TC# and scenario key in step
+        if not changes:
+            st.info("ℹ️ No changes to save.")
+        else:
+            try:
+                previous = previous_values(db_session, TestCase, changes, "task_id")
+                bulk_update(db_session, TestCase, changes)
+                db_session.commit()  # ✅ One transaction for all changed rows
+            except IntegrityError as e:
+                db_session.rollback()
+                st.error(f"❌ Could not save changes (duplicate Test Case ID?): {e.orig}")
+            else:
+                record_updates(TestCase, changes, previous, username, "task_id")
+                st.success(f"✅ {len(changes)} test case(s) updated.")
+                time.sleep(1)
+                st.rerun()
 
     # 🗑️ Delete Button
     if selected_ids:
         if st.button("🗑️ Delete Selected"):
-            db_session.query(TestCase).filter(TestCase.id.in_(selected_ids)).delete(synchronize_session=False)
+            snapshots = snapshot_rows(db_session, TestCase, selected_ids)
+            delete_test_case_attachments(db_session, selected_ids)  # Releases their blobs too
+            chunked_delete(db_session, TestCase, TestCase.id, selected_ids)
             db_session.commit()
+            record_deletions(TestCase, snapshots, username, "task_id")
             st.warning("🚨 Selected test cases deleted!")
             st.rerun()
 
@@ -1404,60 +1164,28 @@ st.markdown(
 
 
 def log_modification(code, tasks_assigned, modified_by, changes):
-    db_session = SessionLocal()
     try:
-        log_entry = ModifiedLog(
-            code=code,
-            tasks_assigned=tasks_assigned,
-            modified_by=modified_by,
-            modified_at=datetime.utcnow(),
-            changes=changes,
-        )
-        db_session.add(log_entry)
-        db_session.commit()
+        record("modification", code, tasks_assigned, modified_by, changes)
     except Exception as e:
-        db_session.rollback()
         st.error(f"Error logging modification: {e}")
-    finally:
-        db_session.close()
 
 # Function to log deletions
-def log_deletion(code, tasks_assigned, deleted_by):
-    db_session = SessionLocal()
+def log_deletion(code, tasks_assigned, deleted_by, changes=None):
     try:
-        log_entry = DeletedLog(
-            code=code,
-            tasks_assigned=tasks_assigned,
-            modified_by=modified_by,
-            modified_at=datetime.utcnow(),
-            changes=changes,
-        )
-        db_session.add(log_entry)
-        db_session.commit()
+        record("deletion", code, tasks_assigned, deleted_by, changes or f"{code} deleted.")
     except Exception as e:
-        db_session.rollback()
         st.error(f"Error logging deletion: {e}")
-    finally:
-        db_session.close()
 
 
 def log_creation(code, tasks_assigned, created_by, changes):
-    db_session = SessionLocal()
     try:
-        log_entry = CreationLog(
-            code=code,
-            tasks_assigned=tasks_assigned,
-            created_by=created_by,
-            created_at=datetime.utcnow(),
-            changes=changes,
-        )
-        db_session.add(log_entry)
-        db_session.commit()
+        record("creation", code, tasks_assigned, created_by, changes)
     except Exception as e:
-        db_session.rollback()
         st.error(f"Error logging creation: {e}")
-    finally:
-        db_session.close()
+
+
+# Test case options listed at once in the attachment form; the search narrows them down
+TEST_CASE_OPTION_LIMIT = 50
 
 
 def directory_image():
@@ -1467,19 +1195,14 @@ def directory_image():
     UPLOAD_DIR = "attachments"
     os.makedirs(UPLOAD_DIR, exist_ok=True)  # ✅ Creates directory if missing
 
-    # Fetch dropdown options
-    projects = [p[0] for p in db_session.query(ToDoList.project).distinct().all()]
-    tasks = [t[0] for t in db_session.query(ToDoList.description).distinct().all()]
-    test_cases = db_session.query(TestCase).all()
+    # Fetch dropdown options (cached; refreshed when tasks or test cases change)
+    projects = get_distinct_values("projects")
+    tasks = get_distinct_values("task_descriptions")
     statuses = ["Open", "In Progress", "Closed"]  
-    build_versions = [bv[0] for bv in db_session.query(TestCase.build_version).distinct().all()]
+    build_versions = get_distinct_values("build_versions")
 
-    # ✅ Handle empty test cases
-    test_case_options = [tc.id for tc in test_cases] if test_cases else []
-    test_case_format_func = lambda x: db_session.query(TestCase).filter_by(id=x).first().test_cases if test_cases else str(x)
-    
     # Return all fetched data
-    return UPLOAD_DIR, projects, tasks, test_case_options, statuses, build_versions, test_case_format_func
+    return UPLOAD_DIR, projects, tasks, statuses, build_versions
 
 
 
@@ -1487,7 +1210,7 @@ def handle_attachments():
     """Handles file uploads and displays existing attachments."""
 
     # ✅ Fetch dropdown values before using them
-    UPLOAD_DIR, projects, tasks, test_case_options, statuses, build_versions, test_case_format_func = directory_image()
+    UPLOAD_DIR, projects, tasks, statuses, build_versions = directory_image()
 
     # ✅ Check if upload was successful (for auto-refresh)
     if "upload_success" not in st.session_state:
@@ -1496,7 +1219,7 @@ def handle_attachments():
     st.subheader("📤 Upload Files")
 
     # ✅ Prevent form submission if required dropdowns are empty
-    if not (projects and tasks and test_case_options and build_versions):
+    if not (projects and tasks and search_test_case_labels(limit=1) and build_versions):
         st.error("⚠️ Cannot upload files. Ensure projects, tasks, test cases, and build versions exist.")
         return  
 
@@ -1506,7 +1229,14 @@ def handle_attachments():
     
     # ✅ Section 2: Test Case Details
     st.markdown("### Test Case Details")
-    test_case_id = st.selectbox("🔹 Test Case", options=test_case_options, format_func=test_case_format_func)
+    test_case_search = st.text_input("🔎 Search Test Case", placeholder="Type part of the test case text or its ID")
+    test_case_options = search_test_case_labels(test_case_search, limit=TEST_CASE_OPTION_LIMIT)
+    if not test_case_options:
+        st.warning("⚠️ No test case matches the search.")
+    test_case_id = st.selectbox(
+        "🔹 Test Case", options=list(test_case_options), format_func=get_test_case_label,
+        help=f"Shows up to {TEST_CASE_OPTION_LIMIT} matches, newest first.",
+    )
     build_version = st.selectbox("🔹 Build Version", options=build_versions)
     
     # ✅ Section 3: Status Selection
@@ -1529,38 +1259,44 @@ def handle_attachments():
     if st.button("💾 Upload"):
         if not uploaded_files:
             st.error("Please upload at least one file.")
+        elif test_case_id is None:
+            st.error("Please select a test case.")
         else:
             uploaded_file_paths = []  # Store uploaded file paths
 
-            for index, uploaded_file in enumerate(uploaded_files):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                file_path = os.path.join(UPLOAD_DIR, f"{timestamp}_{uploaded_file.name}")
-
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-
-                test_case_record = db_session.query(TestCase).filter_by(id=test_case_id).first()
-                if not test_case_record:
-                    st.error(f"Test case with ID {test_case_id} not found!")
-                    return  
-
-                test_case = test_case_record.test_cases if test_case_record.test_cases else "None"
-
-                new_attachment = Attachments(
-                    file_path=file_path,
-                    project=project,
-                    task_assigned=task_assigned,
-                    test_case_id=test_case_id,
-                    test_case=test_case,
-                    status=status,
-                    build_version=build_version,
-                    timestamp=datetime.utcnow(),
-                    created_by=st.session_state.username,
-                )
-                db_session.add(new_attachment)
-                db_session.commit()
+            # One lookup for all files of the upload
+            test_case_text = db_session.query(TestCase.test_cases).filter_by(id=test_case_id).first()
+            if not test_case_text:
+                st.error(f"Test case with ID {test_case_id} not found!")
+                return
+            test_case = test_case_text[0] if test_case_text[0] else "None"
 
-                uploaded_file_paths.append(file_path)  # Store file path for download
+            try:
+                for index, uploaded_file in enumerate(uploaded_files):
+                    # Content-addressed: a file that is already stored is only referenced again
+                    digest, file_path = store_blob(db_session, uploaded_file)
+
+                    new_attachment = Attachments(
+                        file_path=file_path,
+                        file_name=uploaded_file.name,
+                        blob_digest=digest,
+                        project=project,
+                        task_assigned=task_assigned,
+                        test_case_id=test_case_id,
+                        test_case=test_case,
+                        status=status,
+                        build_version=build_version,
+                        timestamp=datetime.utcnow(),
+                        created_by=st.session_state.username,
+                    )
+                    db_session.add(new_attachment)
+
+                    uploaded_file_paths.append(file_path)  # Store file path for download
+                db_session.commit()  # ✅ One transaction for all files
+            except Exception as e:
+                db_session.rollback()
+                st.error(f"❌ Error saving attachments: {e}")
+                return
 
             # ✅ Update session state to trigger refresh
             st.session_state.upload_success = True
@@ -1576,49 +1312,110 @@ def handle_attachments():
 
 
 
+# Attachment gallery: attachments per page, and the preview size (images are scaled down before sending)
+GALLERY_PAGE_SIZES = [5, 10, 20, 50]
+PREVIEW_WIDTH = 640
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp"]
+VIDEO_EXTENSIONS = [".mp4", ".avi", ".mov"]
+
+
+def read_attachment(file_path):
+    """Reads an attachment from disk; passed to st.download_button so it only runs on click."""
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
 def upload_image():
-    """Displays uploaded files in an expandable section."""
+    """Displays uploaded files, one page at a time; files are read only when opened or downloaded."""
     
     st.subheader("📂 Uploaded Files")
-    attachments = db_session.query(Attachments).all()
 
-    if not attachments:
-        st.warning("No files uploaded yet.")
-    else:
-        for attachment in attachments:
-
-            with st.expander(f"📄 Attachment: {os.path.basename(attachment.file_path)}"):
-                # Display metadata
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Project:** {attachment.project}")
-                    st.write(f"**Task Assigned:** {attachment.task_assigned}")
-                    st.write(f"**User Name:** {attachment.created_by}")
-                with col2:
-                    st.write(f"**Test Case:** {attachment.test_case}")
-                    st.write(f"**Status:** {attachment.status}")
-                    st.write(f"**Build Version:** {attachment.build_version}")
-                st.write(f"**Timestamp:** {attachment.timestamp}")
-
-                # Display image or video preview
-                file_ext = os.path.splitext(attachment.file_path)[1].lower()
-                if file_ext in [".jpg", ".jpeg", ".png", ".bmp"]:
-                    st.image(attachment.file_path, caption=attachment.test_case)
+    with st.expander("🔎 Filter"):
+        col1, col2, col3, col4 = st.columns(4)
+        project = col1.selectbox("Project", ["All"] + get_distinct_values("attachment_projects"), key="att_filter_project")
+        build_version = col2.selectbox(
+            "Build Version", ["All"] + get_distinct_values("attachment_build_versions"), key="att_filter_build"
+        )
+        status = col3.selectbox("Status", ["All"] + get_distinct_values("attachment_statuses"), key="att_filter_status")
+        page_size = col4.selectbox("Per Page", GALLERY_PAGE_SIZES, index=1, key="att_page_size")
+
+    filters = {
+        "project": None if project == "All" else project,
+        "build_version": None if build_version == "All" else build_version,
+        "status": None if status == "All" else status,
+    }
+
+    # Start again from the first page whenever the query changes
+    query = (tuple(sorted(filters.items())), page_size)
+    if st.session_state.get("att_query") != query:
+        st.session_state.att_query = query
+        st.session_state.att_cursors = [None]  # Keyset cursor of every visited page
+    cursors = st.session_state.att_cursors
+
+    page, next_cursor = get_attachment_page(filters, cursors[-1], page_size)
+
+    if page.empty and len(cursors) > 1:  # The rest of this page was deleted
+        cursors.pop()
+        st.rerun()
+
+    if page.empty:
+        filtered = any(value is not None for value in filters.values())
+        st.warning("No attachments match the filters." if filtered else "No files uploaded yet.")
+        return
+
+    total = count_attachments(filters)
+    first_row = (len(cursors) - 1) * page_size + 1
+    nav_prev, nav_info, nav_next = st.columns([1, 4, 1])
+    if nav_prev.button("⬅️ Previous", disabled=len(cursors) == 1, key="att_prev"):
+        cursors.pop()
+        st.rerun()
+    nav_info.caption(f"Showing {first_row}-{first_row + len(page) - 1} of {total} attachments (page {len(cursors)})")
+    if nav_next.button("Next ➡️", disabled=next_cursor is None, key="att_next"):
+        cursors.append(next_cursor)
+        st.rerun()
+
+    for attachment in page.itertuples(index=False):
+        # Stored blobs are named by digest; the uploaded name is kept in file_name
+        file_name = attachment.file_name or os.path.basename(attachment.file_path)
+
+        # Tracked expander: the preview is only rendered (and the file only read) while it is open
+        expander = st.expander(f"📄 Attachment: {file_name}", key=f"attachment_{attachment.id}", on_change="rerun")
+        with expander:
+            # Display metadata
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Project:** {attachment.project}")
+                st.write(f"**Task Assigned:** {attachment.task_assigned}")
+                st.write(f"**User Name:** {attachment.created_by}")
+            with col2:
+                st.write(f"**Test Case:** {attachment.test_case}")
+                st.write(f"**Status:** {attachment.status}")
+                st.write(f"**Build Version:** {attachment.build_version}")
+            st.write(f"**Timestamp:** {attachment.timestamp}")
+
+            if not os.path.exists(attachment.file_path):
+                st.error(f"❌ File not found: {file_name}")
+                continue
+
+            # Display image or video preview
+            if expander.open:
+                file_ext = os.path.splitext(file_name)[1].lower()
+                if file_ext in IMAGE_EXTENSIONS:
+                    st.image(read_attachment(attachment.file_path), caption=attachment.test_case, width=PREVIEW_WIDTH)
                 elif file_ext == ".pdf":
                     st.write("📄 PDF files cannot be previewed. Please download the file.")
-                elif file_ext in [".mp4", ".avi", ".mov"]:
-                    st.video(attachment.file_path)
-
-
-                # ✅ FIX: Ensuring unique key for each download button
-                with open(attachment.file_path, "rb") as f:
-                    st.download_button(
-                        label=f"📥 Download {os.path.basename(attachment.file_path)}",
-                        data=f,
-                        file_name=os.path.basename(attachment.file_path),
-                        mime="application/octet-stream",
-                        key=f"download_{attachment.id}"  # 🔥 Unique key to avoid duplicate ID error
-                    )
+                elif file_ext in VIDEO_EXTENSIONS:
+                    st.video(attachment.file_path, format=mimetypes.guess_type(file_name)[0] or "video/mp4")
+
+            # The callable defers reading the file until the button is clicked
+            st.download_button(
+                label=f"📥 Download {file_name}",
+                data=functools.partial(read_attachment, attachment.file_path),
+                file_name=file_name,
+                mime="application/octet-stream",
+                key=f"download_{attachment.id}",  # 🔥 Unique key to avoid duplicate ID error
+                on_click="ignore",
+            )
 
 
 # Current Page Session:
@@ -1660,7 +1457,8 @@ def main():
                     "Minutes of Meeting", 
                     "QA Automation", 
                     "Logout", 
-                    "Check Log"
+                    "Check Log",
+                    "Sequence Audit"
                 ],
                 icons=[
                     "house", 
@@ -1679,7 +1477,8 @@ def main():
                     "file-earmark-text", 
                     "robot", 
                     "box-arrow-right", 
-                    "list-task"
+                    "list-task",
+                    "123"
                 ],
                 menu_icon="cast",  # Sidebar main icon
                 default_index=0,  # Default selected option
@@ -1688,17 +1487,16 @@ def main():
         # Page Routing
         if selected == "Dashboard":
             st.write(f"Welcome, {st.session_state.username}!")   
+            from pages import dashboard
             dashboard()
 
         elif selected == "Review Test Cases":            
             st.write(f"### Recent Activities by: {st.session_state.username}")
 
-            user_test_cases = st.session_state.user_data["test_cases"]
+            user_test_cases = get_user_frame("test_cases", st.session_state.username)
 
-            if user_test_cases:
-                df = pd.DataFrame([t.__dict__ for t in user_test_cases])
-                df.drop(columns=['_sa_instance_state'], inplace=True)  # Remove SQLAlchemy metadata
-                st.dataframe(df)
+            if not user_test_cases.empty:
+                st.dataframe(user_test_cases)
             else:
                 st.info("No test cases found for your account.")
 
@@ -1730,33 +1528,23 @@ def main():
             
         elif selected == "QA Automation":
             if st.session_state.get("logged_in", False):
+                from _qa_automation_ import qa_automation_page
                 qa_automation_page()
                 display_test_cases()
             
         elif selected == "Check Log":
-            st.subheader("Modification Logs")
-            db_session = SessionLocal()
-            modification_logs = db_session.query(ModifiedLog).all()
-            if modification_logs:
-                for log in modification_logs:
-                    st.write(f"**Code:** {log.code}, **Tasks Assigned:** {log.tasks_assigned}, **Modified By:** {log.modified_by}, **Changes:** {log.changes}, **Modified At:** {log.modified_at}")
-            else:
-                st.warning("No modification logs found.")
-
-            st.subheader("Deletion Logs")
-            deletion_logs = db_session.query(DeletedLog).all()
-            if deletion_logs:
-                for log in deletion_logs:
-                    st.write(f"**Code:** {log.code}, **Tasks Assigned:** {log.tasks_assigned}, **Deleted By:** {log.deleted_by}, **Deleted At:** {log.deleted_at}")
-            else:
-                st.warning("No deletion logs found.")
+            from log_viewer import log_viewer_page
+            log_viewer_page()
 
-            db_session.close()
+        elif selected == "Sequence Audit":
+            from sequence_audit import sequence_audit_page
+            sequence_audit_page()
 
         elif selected == "Logout":
             logout()
             st.rerun()
 
-# Run the main function
+# Run the main function (one unit of work per script run)
 if __name__ == "__main__":
-    main()
+    with unit_of_work():
+        main()
@@ -0,0 +1,272 @@
+"""
+Asynchronous, batched writer for the audit log tables.
+
+``record`` puts a log entry on an in-memory queue and returns at once; a
+background thread writes the queued entries in batches, each batch in one
+transaction, so a save that logs hundreds of rows costs one commit instead
+of one per row. A batch is written when ``AUDIT_BATCH_SIZE`` entries are
+waiting or ``AUDIT_FLUSH_INTERVAL`` seconds after its first entry, and the
+queue is drained at process exit.
+
+The queue is bounded (``AUDIT_QUEUE_SIZE``). When it is full, ``record``
+waits up to ``AUDIT_PUT_TIMEOUT`` seconds for room and then writes its
+entry itself, so a slow database slows the callers down instead of growing
+memory or losing entries.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, DisconnectionError, SQLAlchemyError
+
+from database import engine
+from models import CreationLog, DeletedLog, ModifiedLog
+
+# Log kind -> (model, user column, time column)
+LOG_MODELS = {
+    "modification": (ModifiedLog, "modified_by", "modified_at"),
+    "deletion": (DeletedLog, "deleted_by", "deleted_at"),
+    "creation": (CreationLog, "created_by", "created_at"),
+}
+
+_STOP = object()
+# Driver messages of errors that go away by themselves (SQLite, MySQL, PostgreSQL); lowercase
+_TRANSIENT_MESSAGES = (
+    "database is locked", "database table is locked", "busy", "lock wait timeout", "deadlock",
+    "gone away", "lost connection", "can't connect", "connection refused", "server closed the connection",
+)
+
+
+def _is_transient(error) -> bool:
+    """
+    True for a locked/busy database or a lost connection, worth retrying the
+    same batch. SQLite also reports schema errors ("no such table") as
+    OperationalError; those would fail forever and are not transient.
+    """
+    if isinstance(error, DisconnectionError):
+        return True
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    message = str(getattr(error, "orig", None) or error).lower()
+    return any(marker in message for marker in _TRANSIENT_MESSAGES)
+
+
+class AuditLogWriter:
+    """
+    Queue plus background thread that writes audit log entries in batches.
+
+    The thread starts on the first ``record`` (and again if it died, e.g.
+    after a fork). A batch that fails on a locked or unreachable database is
+    kept and retried. A batch the database rejects (constraint or data
+    errors) is written row by row, and only the rejected rows are dropped
+    and reported.
+    """
+
+    def __init__(self, bind, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_queue: int = 10000, put_timeout: float = 2.0, retry_delay: float = 0.5):
+        self.bind = bind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "dropped": 0,  # Entries the database rejected
+            "blocked_puts": 0,  # record() calls that found the queue full
+            "direct_writes": 0,  # ... and wrote their entry themselves
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def record(self, kind: str, code, tasks_assigned, user, changes, at: datetime = None):
+        """
+        Queues one audit log entry.
+
+        Args:
+            kind (str): One of LOG_MODELS ("modification", "deletion", "creation").
+            code: Code or test case ID the entry is about.
+            tasks_assigned: Task the entry belongs to.
+            user: User who made the change.
+            changes (str): Description of the change.
+            at (datetime): Time of the change, now (UTC) by default.
+
+        Raises:
+            ValueError: When code, task, user or changes is missing.
+        """
+        _, user_column, time_column = LOG_MODELS[kind]
+        missing = [name for name, value in (("code", code), ("tasks_assigned", tasks_assigned),
+                                            ("user", user), ("changes", changes)) if value is None or value == ""]
+        if missing:
+            raise ValueError(f"Audit log entry without {', '.join(missing)}")
+        entry = (kind, {
+            "code": str(code),
+            "tasks_assigned": str(tasks_assigned),
+            user_column: user,
+            time_column: at or datetime.utcnow(),
+            "changes": changes,
+        })
+        self._ensure_started()
+        self._count(enqueued=1)
+        try:
+            self._queue.put_nowait(entry)
+            return
+        except queue.Full:
+            self._count(blocked_puts=1)
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            self._write([entry])  # The writer is behind: pay for this entry here
+            self._count(direct_writes=1)
+
+    def _write(self, entries):
+        """Inserts ``entries`` in one transaction, one executemany per log table."""
+        rows = {}
+        for kind, row in entries:
+            rows.setdefault(kind, []).append(row)
+
+        started = time.perf_counter()
+        with self.bind.begin() as conn:
+            for kind, kind_rows in rows.items():
+                conn.execute(insert(LOG_MODELS[kind][0].__table__), kind_rows)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._stats_lock:
+            stats = self._stats
+            stats["written"] += len(entries)
+            stats["flushes"] += 1
+            stats["last_batch_size"] = len(entries)
+            stats["last_flush_ms"] = elapsed_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            stats["total_flush_ms"] += elapsed_ms
+
+    def _write_each(self, entries) -> list:
+        """
+        Writes a rejected batch one entry per transaction, dropping (and
+        reporting) the entries the database refuses.
+
+        Returns:
+            list: Entries left unwritten because the database became unavailable.
+        """
+        for position, entry in enumerate(entries):
+            try:
+                self._write([entry])
+            except SQLAlchemyError as e:
+                if _is_transient(e):
+                    return entries[position:]
+                self._count(dropped=1)
+                print(f"Dropped audit log entry {entry[1]}: {e}")
+        return []
+
+    def _run(self):
+        pending, waiters, stopping = [], [], False
+        while not stopping:
+            # Collect until the batch is full or the oldest pending entry is flush_interval old
+            deadline = time.monotonic() + self.flush_interval
+            while len(pending) < self.batch_size and not waiters:
+                timeout = deadline - time.monotonic() if pending else None
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)  # flush() is waiting for everything queued before it
+                else:
+                    pending.append(item)
+
+            if pending:
+                try:
+                    self._write(pending)
+                    pending = []
+                except SQLAlchemyError as e:
+                    self._count(failed_flushes=1)
+                    if not _is_transient(e):
+                        # Retrying would fail the same way: keep the good rows, drop the rejected ones
+                        print(f"Audit log batch of {len(pending)} entries rejected, writing them one by one: {e}")
+                        pending = self._write_each(pending)
+                    if pending:
+                        if stopping:
+                            print(f"Error writing {len(pending)} audit log entries at exit; they are lost: {e}")
+                            return
+                        print(f"Error writing {len(pending)} audit log entries (will retry): {e}")
+                        time.sleep(self.retry_delay)
+                        continue
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Waits until everything queued so far is written; False if that took longer than ``timeout``."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Writes what is queued and stops the thread (called at process exit)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("Audit log queue still full at exit; unwritten entries are lost.")
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Queue depth, entries written and flush latency (last, max, average in ms)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total_ms = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = total_ms / stats["flushes"] if stats["flushes"] else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+
+audit_writer = AuditLogWriter(
+    engine,
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0")),
+    max_queue=int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+    put_timeout=float(os.getenv("AUDIT_PUT_TIMEOUT", "2.0")),
+)
+atexit.register(audit_writer.close)
+
+
+def record(kind: str, code, tasks_assigned, user, changes, at: datetime = None):
+    """Queues an entry on the process-wide writer; see AuditLogWriter.record."""
+    audit_writer.record(kind, code, tasks_assigned, user, changes, at)
@@ -0,0 +1,104 @@
+"""
+Import-time report per page, in the spirit of ``python -X importtime``.
+
+Usage:
+    python benchmarks/bench_imports.py [--top 5]
+
+Each page runs in a fresh interpreter with ``-X importtime``. The modules
+app.py imports at startup (the login page) are loaded first; the page's own
+modules are loaded after a marker, so their numbers are what routing to the
+page adds on top of the login page. For every page the report shows the
+total and its heaviest top-level imports.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MARKER = "--- page imports ---"
+
+# What app.py imports before the login page renders
+STARTUP = [
+    "streamlit", "streamlit_option_menu", "pandas", "dotenv", "streamlit_cookies_manager",
+    "database", "models", "migrations", "audit_log", "bulk_ops", "blob_store", "history", "ingest",
+    "numbering", "data_access",
+]
+
+# Modules each routed page (or feature) imports lazily
+PAGES = {
+    "Login (startup)": [],
+    "Login with cookie token": ["jwt"],
+    "Dashboard": ["pages"],
+    "Scenarios (Urdu translation)": ["deep_translator"],
+    "QA Automation": ["_qa_automation_"],
+    "Sequence Audit": ["sequence_audit"],
+    "Check Log": ["log_viewer"],
+}
+
+CHILD = """
+import sys
+def load(name):
+    try:
+        __import__(name)
+    except Exception as e:
+        print(f"{{name}}: {{type(e).__name__}}: {{str(e).splitlines()[0]}}")
+for name in {startup!r}:
+    load(name)
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+for name in {page!r}:
+    load(name)
+"""
+
+
+def parse_importtime(lines):
+    """Returns [(module, cumulative_us)] for the top-level imports in ``-X importtime`` output."""
+    top = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) == 1:  # One space = imported directly, not as a dependency
+            top.append((name.strip(), int(cumulative)))
+    return top
+
+
+def profile_page(page_modules, startup_modules):
+    code = CHILD.format(startup=startup_modules, page=page_modules, marker=MARKER)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    stderr = result.stderr.splitlines()
+    split = stderr.index(MARKER) if MARKER in stderr else len(stderr)
+    startup, page = stderr[:split], stderr[split + 1:]
+    errors = [line for line in result.stdout.splitlines() if line]
+    return parse_importtime(startup), parse_importtime(page), errors
+
+
+def print_section(title, imports, errors, top):
+    total_ms = sum(us for _, us in imports) / 1000
+    print(f"\n{title}: {total_ms:,.1f} ms")
+    for name, us in sorted(imports, key=lambda item: item[1], reverse=True)[:top]:
+        print(f"    {us / 1000:>9,.1f} ms  {name}")
+    for error in errors:
+        print(f"    ⚠️ {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports listed per page")
+    args = parser.parse_args()
+
+    for page, modules in PAGES.items():
+        if not modules:
+            startup, _, errors = profile_page([], STARTUP)
+            print_section(page, startup, errors, args.top)
+            continue
+        _, added, errors = profile_page(modules, STARTUP)
+        page_errors = [e for e in errors if e.split(":")[0] in modules]
+        print_section(f"{page} (on top of startup)", added, page_errors, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Read/write throughput of each SQLite profile preset.
+
+Usage:
+    python benchmarks/bench_sqlite_profiles.py [--rows 2000] [--readers 4]
+
+Each preset runs against a fresh temporary database:
+  - single-row writes, one commit per row (the app's form-save pattern)
+  - batched writes, one executemany per 500 rows
+  - point reads by primary key from several threads while one thread writes
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sqlite_profile import SQLITE_PROFILES, apply_sqlite_profile  # noqa: E402
+
+metadata = MetaData()
+items = Table(
+    "bench_items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_by", String(100), nullable=False),
+    Column("payload", String(200), nullable=False),
+)
+
+
+def make_engine(path, profile):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine, profile)
+    metadata.create_all(engine)
+    return engine
+
+
+def bench_single_writes(engine, rows):
+    start = time.perf_counter()
+    for i in range(rows):
+        with engine.begin() as conn:
+            conn.execute(insert(items), {"created_by": "bench", "payload": f"row {i}"})
+    return rows / (time.perf_counter() - start)
+
+
+def bench_batch_writes(engine, rows, batch=500):
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        with engine.begin() as conn:
+            conn.execute(
+                insert(items),
+                [{"created_by": "bench", "payload": f"batch {i}"} for i in range(offset, min(rows, offset + batch))],
+            )
+    return rows / (time.perf_counter() - start)
+
+
+def bench_concurrent_reads(engine, max_id, readers, duration=2.0):
+    """Point reads per second across ``readers`` threads while one thread keeps writing."""
+    stop = threading.Event()
+    reads = [0] * readers
+    errors = []
+
+    def reader(slot):
+        with engine.connect() as conn:
+            while not stop.is_set():
+                conn.execute(select(items.c.payload).where(items.c.id == random.randint(1, max_id))).first()
+                reads[slot] += 1
+
+    def writer():
+        try:
+            while not stop.is_set():
+                with engine.begin() as conn:
+                    conn.execute(insert(items), {"created_by": "writer", "payload": "concurrent"})
+        except Exception as e:  # "database is locked" shows up here without WAL/busy_timeout
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(reads) / duration, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'single writes/s':>16} {'batch rows/s':>14} {'reads/s (+1 writer)':>20} {'write errors':>13}")
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(os.path.join(tmp, "bench.db"), profile)
+            single = bench_single_writes(engine, args.rows)
+            batch = bench_batch_writes(engine, args.rows * 10)
+            reads, errors = bench_concurrent_reads(engine, args.rows, args.readers)
+            engine.dispose()
+        print(f"{profile:<10} {single:>16,.0f} {batch:>14,.0f} {reads:>20,.0f} {errors:>13}")
+
+
+if __name__ == "__main__":
+    main()
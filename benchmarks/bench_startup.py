@@ -0,0 +1,91 @@
+"""
+Startup cost of the app: cold imports, database bootstrap and first page render.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+
+Every measurement runs in a fresh interpreter against a temporary SQLite
+database (DATABASE_URL is overridden), so nothing is shared between runs:
+  - cold ``import models`` (should do no database work)
+  - ``bootstrap()`` on an empty database and on an already prepared one
+  - first render of app.py through Streamlit's AppTest (login page)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+IMPORT_MODELS = """
+import time
+started = time.perf_counter()
+import models
+print(time.perf_counter() - started)
+"""
+
+BOOTSTRAP = """
+import time
+from database import engine
+from migrations import bootstrap
+started = time.perf_counter()
+bootstrap(engine, progress=lambda message: None)
+print(time.perf_counter() - started)
+"""
+
+FIRST_RENDER = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+elapsed = time.perf_counter() - started
+if at.exception:
+    sys.exit("render failed: " + at.exception[0].message.splitlines()[0])
+print(elapsed)
+"""
+
+
+def run_snippet(code, database_url):
+    """Runs ``code`` in a new interpreter and returns the seconds it prints (or the error)."""
+    env = dict(os.environ, DATABASE_URL=database_url, AUTO_BOOTSTRAP="true")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+    return float(result.stdout.strip().splitlines()[-1]), None
+
+
+def measure(name, code, runs, fresh_database):
+    timings = []
+    error = None
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+            if not fresh_database:
+                run_snippet(BOOTSTRAP, url)
+            seconds, error = run_snippet(code, url)
+        if error:
+            break
+        timings.append(seconds)
+
+    if error:
+        print(f"{name:<34} {'-':>10} {'-':>10}   {error}")
+    else:
+        print(f"{name:<34} {statistics.median(timings) * 1000:>10.1f} {max(timings) * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'step':<34} {'median ms':>10} {'max ms':>10}")
+    measure("import models (cold)", IMPORT_MODELS, args.runs, fresh_database=True)
+    measure("bootstrap (empty database)", BOOTSTRAP, args.runs, fresh_database=True)
+    measure("bootstrap (already prepared)", BOOTSTRAP, args.runs, fresh_database=False)
+    measure("first render of app.py", FIRST_RENDER.format(app=os.path.join(ROOT, "app.py")), args.runs, fresh_database=True)
+
+
+if __name__ == "__main__":
+    main()
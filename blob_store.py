@@ -0,0 +1,194 @@
+"""
+Content-addressed storage for attachment files.
+
+Every file is stored once per SHA-256 digest under
+``<ATTACHMENT_BLOB_DIR>/ab/cd/<digest>``; the two levels of two-character
+shards keep directories small. AttachmentBlob counts the Attachments rows
+that point at each blob, so the same screenshot or report attached to
+many test cases costs one file and, after the first upload, no write at all.
+
+Reference counts change inside the caller's transaction: ``store_blob``
+adds one per new Attachments row and ``delete_test_case_attachments``
+releases them when test cases are deleted. Files are only added before the
+commit and only removed by ``collect_garbage``, so a rolled-back upload can
+leave an unreferenced file behind but never a row without its file.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from bulk_ops import MAX_BIND_PARAMS, chunked_delete, python_value
+from models import AttachmentBlob, Attachments
+
+BLOB_DIR = os.getenv("ATTACHMENT_BLOB_DIR", os.path.join("attachments", "blobs"))
+READ_CHUNK = 1024 * 1024  # Bytes hashed/copied at a time
+
+
+def blob_path(digest: str, root: str = None) -> str:
+    """Sharded location of a blob: <root>/ab/cd/<digest>."""
+    return os.path.join(root or BLOB_DIR, digest[:2], digest[2:4], digest)
+
+
+def hash_stream(fileobj) -> tuple:
+    """Returns (sha256 hex digest, size in bytes), reading ``fileobj`` in chunks from its current position."""
+    digest, size = hashlib.sha256(), 0
+    for chunk in iter(lambda: fileobj.read(READ_CHUNK), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def hash_file(path: str) -> tuple:
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+def _write_atomically(fileobj, path: str):
+    """Streams ``fileobj`` into ``path`` through a temporary file, so readers never see half a blob."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fileobj, out, READ_CHUNK)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _add_reference(session, digest: str, size: int):
+    """Counts one more reference to ``digest``, creating its row on first use."""
+    blobs = AttachmentBlob.__table__
+    bump = update(blobs).where(blobs.c.digest == digest).values(ref_count=blobs.c.ref_count + 1)
+    if session.execute(bump).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.execute(
+                insert(blobs).values(digest=digest, size=size, ref_count=1, created_at=datetime.utcnow())
+            )
+    except IntegrityError:
+        session.execute(bump)  # Another session stored the same content first
+
+
+def store_blob(session, fileobj, root: str = None) -> tuple:
+    """
+    Stores an upload (Streamlit UploadedFile or any binary file object) and
+    counts a reference to it in the caller's transaction.
+
+    Seekable inputs are hashed first and only written when the digest is new;
+    others are copied to a temporary file while being hashed.
+
+    Returns:
+        tuple: (digest, path of the blob)
+    """
+    if fileobj.seekable():
+        fileobj.seek(0)
+        digest, size = hash_stream(fileobj)
+        path = blob_path(digest, root)
+        if not os.path.exists(path):
+            fileobj.seek(0)
+            _write_atomically(fileobj, path)
+    else:
+        with tempfile.SpooledTemporaryFile(max_size=64 * READ_CHUNK) as spool:
+            hasher, size = hashlib.sha256(), 0
+            for chunk in iter(lambda: fileobj.read(READ_CHUNK), b""):
+                hasher.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+            digest = hasher.hexdigest()
+            path = blob_path(digest, root)
+            if not os.path.exists(path):
+                spool.seek(0)
+                _write_atomically(spool, path)
+
+    _add_reference(session, digest, size)
+    return digest, path
+
+
+def release_blob(session, digest: str, count: int = 1):
+    """Drops ``count`` references to ``digest``; the file is removed by ``collect_garbage`` once none are left."""
+    blobs = AttachmentBlob.__table__
+    session.execute(
+        update(blobs).where(blobs.c.digest == digest, blobs.c.ref_count > 0).values(ref_count=blobs.c.ref_count - count)
+    )
+
+
+def delete_test_case_attachments(session, test_case_ids) -> int:
+    """
+    Deletes the attachments of the test cases ``test_case_ids`` (TestCase.id)
+    and releases their blobs, in the caller's transaction. Call it before
+    deleting the test cases themselves.
+
+    Returns:
+        int: Number of attachments deleted.
+    """
+    ids = [python_value(test_case_id) for test_case_id in test_case_ids]
+    references = Counter()
+    for start in range(0, len(ids), MAX_BIND_PARAMS):
+        stmt = (
+            select(Attachments.blob_digest, func.count())
+            .where(Attachments.test_case_id.in_(ids[start:start + MAX_BIND_PARAMS]), Attachments.blob_digest.isnot(None))
+            .group_by(Attachments.blob_digest)
+        )
+        references.update(dict(session.execute(stmt).all()))
+    deleted = chunked_delete(session, Attachments, Attachments.test_case_id, ids)
+    for digest, count in references.items():
+        release_blob(session, digest, count)
+    return deleted
+
+
+def collect_garbage(engine, root: str = None, grace_seconds: int = 3600) -> dict:
+    """
+    Deletes blobs without references: rows whose count dropped to zero and
+    files no row knows about (left by rolled-back uploads). Files younger
+    than ``grace_seconds`` are kept, since their upload may not have
+    committed yet. Best run while nobody is uploading.
+
+    Returns:
+        dict: number of blobs deleted and bytes freed.
+    """
+    root = root or BLOB_DIR
+    blobs = AttachmentBlob.__table__
+    deleted = freed = 0
+
+    with engine.begin() as conn:
+        unreferenced = conn.execute(select(blobs.c.digest).where(blobs.c.ref_count <= 0)).scalars().all()
+        for start in range(0, len(unreferenced), 900):
+            conn.execute(
+                blobs.delete().where(blobs.c.digest.in_(unreferenced[start:start + 900]), blobs.c.ref_count <= 0)
+            )
+        known = set(conn.execute(select(blobs.c.digest)).scalars())
+
+    cutoff = time.time() - grace_seconds
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if name in known or os.path.getmtime(path) > cutoff:
+                continue
+            freed += os.path.getsize(path)
+            os.remove(path)
+            deleted += 1
+    return {"deleted": deleted, "freed_bytes": freed}
+
+
+def store_stats(engine) -> dict:
+    """Blob count, references and bytes stored versus bytes referenced (what storing every copy would cost)."""
+    blobs = AttachmentBlob.__table__
+    with engine.connect() as conn:
+        count, references, stored, referenced = conn.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(blobs.c.ref_count), 0),
+                func.coalesce(func.sum(blobs.c.size), 0),
+                func.coalesce(func.sum(blobs.c.size * blobs.c.ref_count), 0),
+            )
+        ).one()
+    return {"blobs": count, "references": references, "stored_bytes": stored, "referenced_bytes": referenced}
@@ -0,0 +1,91 @@
+"""
+Change detection and batched writes for the editable grids.
+
+The grids compare the frame returned by ``st.data_editor`` with the frame
+they rendered, and write only the cells that changed, in executemany
+batches inside the caller's transaction.
+"""
+import pandas as pd
+from sqlalchemy import delete, update
+
+# Stay below SQLite's default limit of 999 bound parameters per statement (pre-3.32 builds)
+MAX_BIND_PARAMS = 900
+
+
+def python_value(value):
+    """Converts numpy/pandas scalars to values the DB driver can bind (NaN/NaT -> None)."""
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+def diff_frames(original: pd.DataFrame, edited: pd.DataFrame, columns: dict, key: str = "id") -> list:
+    """
+    Finds the edited cells with a vectorized comparison of the two frames.
+
+    Args:
+        original (DataFrame): Frame that was shown in the editor.
+        edited (DataFrame): Frame returned by the editor (same rows).
+        columns (dict): Frame column -> model attribute, for the columns that may be saved.
+        key (str): Column holding the primary key.
+
+    Returns:
+        list: One mapping per changed row with the primary key and only the changed attributes.
+
+    Raises:
+        ValueError: When rows of ``original`` are missing from ``edited`` (e.g. their key was edited).
+    """
+    missing = original[key][~original[key].isin(edited[key])]
+    if not missing.empty:
+        raise ValueError(f"Rows {', '.join(map(str, missing.tolist()))} are missing from the edited grid")
+    before = original.set_index(key)[list(columns)]
+    after = edited.set_index(key)[list(columns)].reindex(before.index)
+
+    # Compare as objects so 5 == 5.0 and missing == missing
+    old_values, new_values = before.to_numpy(dtype=object), after.to_numpy(dtype=object)
+    changed = (old_values != new_values) & ~(before.isna().to_numpy() & after.isna().to_numpy())
+    rows = changed.any(axis=1).nonzero()[0]
+
+    names = list(columns.values())
+    keys = before.index.to_numpy()
+    mappings = []
+    for row in rows:
+        mapping = {key: python_value(keys[row])}
+        for position in changed[row].nonzero()[0]:
+            mapping[names[position]] = python_value(new_values[row, position])
+        mappings.append(mapping)
+    return mappings
+
+
+def bulk_update(session, model, mappings: list, chunk_size: int = 500) -> int:
+    """
+    Applies ``diff_frames`` mappings as ORM bulk UPDATEs by primary key.
+
+    Rows with the same set of changed columns share one executemany. Nothing is
+    committed here, so the caller decides the transaction boundary.
+
+    Returns:
+        int: Number of rows updated.
+    """
+    for start in range(0, len(mappings), chunk_size):
+        session.execute(update(model), mappings[start:start + chunk_size])
+    return len(mappings)
+
+
+def chunked_delete(session, model, column, values, chunk_size: int = MAX_BIND_PARAMS) -> int:
+    """
+    Deletes the rows whose ``column`` is in ``values``, one IN (...) statement
+    per ``chunk_size`` values so no statement exceeds the bound-parameter limit.
+    Nothing is committed here.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    values = [python_value(v) for v in values]
+    deleted = 0
+    for start in range(0, len(values), chunk_size):
+        stmt = delete(model).where(column.in_(values[start:start + chunk_size]))
+        deleted += session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+    return deleted
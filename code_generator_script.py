@@ -1,7 +1,9 @@
 from locust import HttpUser, task, between
+import os
 import time
 import pandas as pd
-from models import SessionLocal, generate_sequential_code, engine, User
+from database import SessionLocal, engine
+from models import generate_sequential_code, generate_sequential_codes, User
 from bs4 import BeautifulSoup
 
 
@@ -13,6 +15,7 @@ class WebhookUser(HttpUser):
     """
     wait_time = between(1, 2.5)  # Simulate user wait time between tasks
     tasks_executed = False  # Track if tasks have been executed
+    batch_size = int(os.getenv("CODE_BATCH_SIZE", "0"))  # Codes per batch task, 0 disables it
 
     def get_test_data(self):
         """Fetch all test data from the database."""
@@ -75,3 +78,30 @@ class WebhookUser(HttpUser):
                     response.failure(f"Request failed with status {response.status_code}")
 
             self.tasks_executed = True
+
+    @task
+    def generate_code_batch(self):
+        """
+        Generates a batch of synthetic codes in a single transaction.
+        Enabled by setting CODE_BATCH_SIZE.
+        """
+        if self.batch_size <= 0:
+            return
+
+        start_time = time.time()
+        exception = None
+        db_session = SessionLocal()
+        try:
+            generate_sequential_codes(db_session, self.user.username if self.user else "user", self.batch_size)
+        except Exception as e:
+            exception = e
+        finally:
+            db_session.close()
+
+        self.environment.events.request.fire(
+            request_type="DB",
+            name="generate_code_batch",
+            response_time=(time.time() - start_time) * 1000,
+            response_length=self.batch_size,
+            exception=exception,
+        )
@@ -0,0 +1,508 @@
+"""
+Per-user read layer for the Streamlit pages.
+
+Each view selects only the columns its page shows and returns a DataFrame.
+Results are cached per (view, username) for USER_DATA_TTL seconds and are
+dropped as soon as a commit writes to the view's table, so editing one row
+reloads one view instead of every table the user owns. Dropdown data
+shared by all users (distinct values, test case labels) is cached the same
+way without a username and dropped by a write from any user.
+
+Every invalidation also bumps a generation counter of the table. A load
+that was running while its table was invalidated returns its result to its
+caller but does not cache it, so a slow read cannot put a pre-write result
+back into the cache after the write dropped it.
+
+Writes are picked up from the sessions created by ``SessionLocal``: ORM
+flushes and ``session.execute(update/delete/insert(...))`` are tracked
+automatically; paths that bypass the unit of work (``bulk_save_objects``,
+raw connections) call ``invalidate_user_data`` themselves.
+"""
+import os
+import threading
+import time
+from itertools import chain
+
+import pandas as pd
+from sqlalchemy import event, func, literal, or_, select, tuple_
+
+from database import SessionLocal
+from models import Attachments, TestCase, ToDoList
+
+
+CACHE_TTL = int(os.getenv("USER_DATA_TTL", "300"))  # Seconds; bounds staleness across processes
+MAX_ENTRIES = int(os.getenv("USER_DATA_CACHE_SIZE", "512"))
+
+# view name -> (model, columns the page needs)
+VIEWS = {
+    "tasks": (
+        ToDoList,
+        [
+            ToDoList.id, ToDoList.project, ToDoList.tasks_assigned, ToDoList.description,
+            ToDoList.build_version, ToDoList.priority, ToDoList.severity, ToDoList.start_date,
+            ToDoList.end_date, ToDoList.status, ToDoList.time_spent_min, ToDoList.test_cases,
+            ToDoList.defects_count, ToDoList.fixed, ToDoList.need_to_fix_remaining,
+            ToDoList.pass_count, ToDoList.ongoing, ToDoList.time_spent_per_case_min,
+        ],
+    ),
+    "test_cases": (
+        TestCase,
+        [
+            TestCase.id, TestCase.test_case_id, TestCase.test_scenario, TestCase.field_parent,
+            TestCase.field_child, TestCase.detailed_input, TestCase.test_cases, TestCase.pre_condition,
+            TestCase.test_steps, TestCase.test_data, TestCase.post_condition, TestCase.expected_result,
+            TestCase.actual_result, TestCase.status, TestCase.task_id, TestCase.build_version,
+        ],
+    ),
+    "attachments": (
+        Attachments,
+        [
+            Attachments.id, Attachments.file_path, Attachments.project, Attachments.task_assigned,
+            Attachments.test_case_id, Attachments.test_case, Attachments.status,
+            Attachments.build_version, Attachments.timestamp,
+        ],
+    ),
+}
+
+# Keyed views that are not plain per-user frames, and the table they read
+_VIEW_TABLES = {view: model.__tablename__ for view, (model, _) in VIEWS.items()}
+# Dropdown values shared by all users: view name -> column
+DISTINCT_VIEWS = {
+    "projects": ToDoList.project,
+    "task_descriptions": ToDoList.description,
+    "build_versions": TestCase.build_version,
+    "attachment_projects": Attachments.project,
+    "attachment_build_versions": Attachments.build_version,
+    "attachment_statuses": Attachments.status,
+}
+
+_VIEW_TABLES.update(
+    test_case_page=TestCase.__tablename__,
+    test_case_count=TestCase.__tablename__,
+    test_case_statuses=TestCase.__tablename__,
+    test_case_labels=TestCase.__tablename__,
+    attachment_page=Attachments.__tablename__,
+    attachment_count=Attachments.__tablename__,
+)
+_VIEW_TABLES.update({view: column.table.name for view, column in DISTINCT_VIEWS.items()})
+# Views computed from several tables: dropped by a write to any of them
+_MULTI_TABLE_VIEWS = {"dashboard": {ToDoList.__tablename__, TestCase.__tablename__}}
+_WATCHED_TABLES = set(_VIEW_TABLES.values()).union(*_MULTI_TABLE_VIEWS.values())
+_PENDING_KEY = "user_data_writes"
+
+_cache = {}  # (view, username, params) -> (expires_at, value)
+_generations = {}  # table -> number of invalidations so far
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _view_tables(view) -> set:
+    return _MULTI_TABLE_VIEWS.get(view, {_VIEW_TABLES.get(view)})
+
+
+def _cached(view, username, params, loader, ttl=None):
+    """
+    Returns the cached value for (view, username, params), calling ``loader``
+    on a miss; entries live ``ttl`` seconds (CACHE_TTL by default). The value
+    is not cached if the view's tables were invalidated while it loaded.
+    """
+    key = (view, username, params)
+    tables = _view_tables(view)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+        generations = [_generations.get(table, 0) for table in tables]
+
+    value = loader()
+
+    with _lock:
+        if generations != [_generations.get(table, 0) for table in tables]:
+            return value  # A write landed during the load: it may predate it
+        if len(_cache) >= MAX_ENTRIES:
+            # Drop the entries closest to expiry
+            for stale in sorted(_cache, key=lambda k: _cache[k][0])[: max(1, len(_cache) // 4)]:
+                del _cache[stale]
+        _cache[key] = (now + (CACHE_TTL if ttl is None else ttl), value)
+    return value
+
+
+def _load_view(view, username):
+    model, columns = VIEWS[view]
+    stmt = select(*columns).order_by(model.id)
+    if username is not None:
+        stmt = stmt.where(model.created_by == username)
+    with SessionLocal.session_factory() as session:
+        rows = session.execute(stmt).all()
+    return pd.DataFrame(rows, columns=[c.key for c in columns])
+
+
+def get_user_frame(view: str, username: str) -> pd.DataFrame:
+    """
+    Returns the user's rows for a view as a DataFrame (a copy; safe to modify).
+
+    Args:
+        view (str): One of VIEWS ("tasks", "test_cases", "attachments").
+        username (str): Owner of the rows (``created_by``); None for every user's rows.
+    """
+    return _cached(view, username, None, lambda: _load_view(view, username)).copy()
+
+
+# --- Paged test case grid ---
+
+# label -> (column, descending); every sort is made unique with TestCase.id
+TEST_CASE_SORTS = {
+    "Newest first": (TestCase.id, True),
+    "Oldest first": (TestCase.id, False),
+    "Test Case ID": (TestCase.test_case_id, False),
+    "Status": (TestCase.status, False),
+}
+
+
+def _test_case_conditions(username, filters):
+    """WHERE clauses for the user's test cases; ``filters`` keys: status, build_version, task_id, text."""
+    conditions = [TestCase.created_by == username]
+    if filters.get("status"):
+        conditions.append(TestCase.status == filters["status"])
+    if filters.get("build_version"):
+        conditions.append(TestCase.build_version == filters["build_version"])
+    if filters.get("task_id") is not None:
+        conditions.append(TestCase.task_id == filters["task_id"])
+    if filters.get("text"):
+        text = filters["text"]
+        conditions.append(
+            or_(
+                TestCase.test_case_id.icontains(text, autoescape=True),
+                TestCase.test_scenario.icontains(text, autoescape=True),
+                TestCase.test_cases.icontains(text, autoescape=True),
+            )
+        )
+    return conditions
+
+
+def _load_test_case_page(username, filters, sort, after, page_size):
+    column, descending = TEST_CASE_SORTS[sort]
+    if column is TestCase.status and filters.get("status"):
+        column = TestCase.id  # Every row has the same status; id order walks the index without a sort
+    _, columns = VIEWS["test_cases"]
+    conditions = _test_case_conditions(username, filters)
+
+    if after is not None:
+        # Keyset: continue strictly after the last (sort value, id) of the previous page
+        if column is TestCase.id:
+            conditions.append(TestCase.id < after[1] if descending else TestCase.id > after[1])
+        else:
+            key, last = tuple_(column, TestCase.id), tuple_(literal(after[0]), literal(after[1]))
+            conditions.append(key < last if descending else key > last)
+
+    order = [column.desc(), TestCase.id.desc()] if descending else [column, TestCase.id]
+    if column is TestCase.id:
+        order = order[:1]
+
+    stmt = select(*columns).where(*conditions).order_by(*order).limit(page_size + 1)
+    with SessionLocal.session_factory() as session:
+        rows = session.execute(stmt).all()
+
+    page = pd.DataFrame(rows[:page_size], columns=[c.key for c in columns])
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = (getattr(last, column.key), last.id)
+    return page, next_cursor
+
+
+def get_test_case_page(username: str, filters: dict = None, sort: str = "Newest first", after=None, page_size: int = 50):
+    """
+    Returns one page of the user's test cases, filtered and sorted in SQL.
+
+    Pagination is keyset-based on (sort column, TestCase.id), so every page
+    costs the same no matter how deep it is or how many rows the user owns.
+
+    Args:
+        username (str): Owner of the test cases.
+        filters (dict): Optional status, build_version, task_id and text (substring of id/scenario/case).
+        sort (str): One of TEST_CASE_SORTS.
+        after (tuple): Cursor returned for the previous page, None for the first page.
+        page_size (int): Rows per page.
+
+    Returns:
+        tuple: (DataFrame of the page, cursor of the next page or None on the last page)
+    """
+    filters = filters or {}
+    params = (tuple(sorted(filters.items())), sort, after, page_size)
+    page, next_cursor = _cached(
+        "test_case_page", username, params,
+        lambda: _load_test_case_page(username, filters, sort, after, page_size),
+    )
+    return page.copy(), next_cursor
+
+
+def count_test_cases(username: str, filters: dict = None) -> int:
+    """Number of the user's test cases matching ``filters`` (see get_test_case_page)."""
+    filters = filters or {}
+
+    def load():
+        stmt = select(func.count()).select_from(TestCase).where(*_test_case_conditions(username, filters))
+        with SessionLocal.session_factory() as session:
+            return session.execute(stmt).scalar()
+
+    return _cached("test_case_count", username, tuple(sorted(filters.items())), load)
+
+
+def get_test_case_statuses(username: str) -> list:
+    """Distinct statuses of the user's test cases, for the filter dropdown."""
+
+    def load():
+        stmt = select(TestCase.status).where(TestCase.created_by == username).distinct().order_by(TestCase.status)
+        with SessionLocal.session_factory() as session:
+            return list(session.execute(stmt).scalars())
+
+    return list(_cached("test_case_statuses", username, None, load))
+
+
+# --- Shared dropdown data (cached under username None) ---
+
+LABEL_LENGTH = int(os.getenv("TEST_CASE_LABEL_LENGTH", "120"))  # Characters of test case text kept per label
+
+
+def get_distinct_values(view: str) -> list:
+    """Distinct non-empty values of a DISTINCT_VIEWS column, sorted, for dropdowns."""
+    column = DISTINCT_VIEWS[view]
+
+    def load():
+        stmt = select(column).where(column.isnot(None)).distinct().order_by(column)
+        with SessionLocal.session_factory() as session:
+            return [value for value in session.execute(stmt).scalars() if value != ""]
+
+    return list(_cached(view, None, None, load))
+
+
+def _load_test_case_labels():
+    # Only the id and the start of the text: a few MB even for hundreds of thousands of cases
+    text = func.substr(func.coalesce(TestCase.test_cases, ""), 1, LABEL_LENGTH)
+    stmt = select(TestCase.id, text).order_by(TestCase.id)
+    with SessionLocal.session_factory() as session:
+        rows = session.execute(stmt).all()
+    labels = pd.DataFrame(rows, columns=["id", "label"]).set_index("id")["label"]
+    labels = labels.where(labels.str.strip() != "", labels.index.astype(str))  # No text: show the id
+    return pd.DataFrame({"label": labels, "search": labels.str.lower()})
+
+
+def get_test_case_label(test_case_id) -> str:
+    """Label of one test case, from the cached projection (the id when it is unknown)."""
+    labels = _cached("test_case_labels", None, None, _load_test_case_labels)["label"]
+    return labels.get(test_case_id, str(test_case_id))
+
+
+def search_test_case_labels(text: str = "", limit: int = 50) -> dict:
+    """
+    Type-ahead over all test cases: up to ``limit`` {id: label} whose text or
+    id contains ``text`` (case-insensitive), newest first.
+
+    The id -> label projection is loaded once and cached until test_management
+    is written; each search is an in-memory scan of it, never a query.
+    """
+    labels = _cached("test_case_labels", None, None, _load_test_case_labels)
+    text = (text or "").strip().lower()
+    if text:
+        matches = labels["search"].str.contains(text, regex=False) | (labels.index.astype(str) == text)
+        labels = labels[matches]
+    return labels["label"].iloc[::-1].head(limit).to_dict()
+
+
+# --- Paged attachment gallery (shared by all users) ---
+
+# Metadata only: file contents are read from disk when an attachment is opened or downloaded
+_GALLERY_COLUMNS = VIEWS["attachments"][1] + [Attachments.file_name, Attachments.created_by]
+
+
+def _attachment_conditions(filters):
+    """WHERE clauses for the gallery; ``filters`` keys: project, build_version, status."""
+    return [getattr(Attachments, name) == value for name, value in filters.items() if value is not None]
+
+
+def _load_attachment_page(filters, after, page_size):
+    conditions = _attachment_conditions(filters)
+    if after is not None:
+        conditions.append(Attachments.id < after)  # Keyset: newest first
+    stmt = select(*_GALLERY_COLUMNS).where(*conditions).order_by(Attachments.id.desc()).limit(page_size + 1)
+    with SessionLocal.session_factory() as session:
+        rows = session.execute(stmt).all()
+    page = pd.DataFrame(rows[:page_size], columns=[c.key for c in _GALLERY_COLUMNS])
+    next_cursor = rows[page_size - 1].id if len(rows) > page_size else None
+    return page, next_cursor
+
+
+def get_attachment_page(filters: dict = None, after=None, page_size: int = 10):
+    """
+    Returns one page of attachment metadata, newest first.
+
+    Args:
+        filters (dict): Optional project, build_version and status.
+        after (int): Cursor returned for the previous page, None for the first page.
+        page_size (int): Attachments per page.
+
+    Returns:
+        tuple: (DataFrame of the page, cursor of the next page or None on the last page)
+    """
+    filters = filters or {}
+    params = (tuple(sorted(filters.items())), after, page_size)
+    page, next_cursor = _cached(
+        "attachment_page", None, params, lambda: _load_attachment_page(filters, after, page_size)
+    )
+    return page.copy(), next_cursor
+
+
+def count_attachments(filters: dict = None) -> int:
+    """Number of attachments matching ``filters`` (see get_attachment_page)."""
+    filters = filters or {}
+
+    def load():
+        stmt = select(func.count()).select_from(Attachments).where(*_attachment_conditions(filters))
+        with SessionLocal.session_factory() as session:
+            return session.execute(stmt).scalar()
+
+    return _cached("attachment_count", None, tuple(sorted(filters.items())), load)
+
+
+# --- Dashboard rollups (shared by all users) ---
+
+DASHBOARD_TTL = int(os.getenv("DASHBOARD_TTL", str(CACHE_TTL)))  # Seconds; bounds staleness across processes
+
+
+def _count_by(frame, columns, count="count"):
+    return frame.groupby(columns, dropna=False)[count].sum().reset_index()
+
+
+def _load_dashboard():
+    """
+    Every dashboard rollup from three grouped reads: tasks by (status,
+    priority, severity, project), test cases by (task, build, status), and
+    the distinct task -> project pairs the test cases join to. The widgets
+    then slice these small frames instead of querying.
+    """
+    started = time.perf_counter()
+    task_keys = [ToDoList.status, ToDoList.priority, ToDoList.severity, ToDoList.project]  # ix_to_do_list_rollup order
+    case_keys = [TestCase.task_id, TestCase.build_version, TestCase.status]
+    with SessionLocal.session_factory() as session:
+        tasks = pd.DataFrame(
+            session.execute(select(*task_keys, func.count()).group_by(*task_keys)).all(),
+            columns=[c.key for c in task_keys] + ["count"],
+        )
+        cases = pd.DataFrame(
+            session.execute(select(*case_keys, func.count()).group_by(*case_keys)).all(),
+            columns=[c.key for c in case_keys] + ["count"],
+        )
+        # Test cases belong to a project through the task number (to_do_list.tasks_assigned)
+        task_projects = pd.DataFrame(
+            session.execute(
+                select(ToDoList.project, TestCase.task_id)
+                .join(TestCase, ToDoList.tasks_assigned == TestCase.task_id)
+                .distinct()
+            ).all(),
+            columns=["project", "task_id"],
+        )
+
+    # Distinct (project, task) pairs: a case counts once per project, like COUNT(DISTINCT id)
+    project_cases = task_projects.merge(cases, on="task_id")
+    rollups = {
+        "project_summary": _count_by(tasks, "project"),
+        "status_summary": _count_by(tasks, "status"),
+        "priority_summary": _count_by(tasks, "priority"),
+        "severity_summary": _count_by(tasks, "severity"),
+        "project_test_cases": _count_by(project_cases, "project"),
+        "test_case_status": _count_by(cases, "status"),
+        "build_versions": _count_by(cases[cases["build_version"].notna()], "build_version"),
+        "project_builds": _count_by(project_cases, ["project", "build_version", "status"]),
+        "projects": sorted(tasks["project"].dropna().unique()),
+    }
+    return {
+        "rollups": rollups,
+        "computed_at": time.time(),
+        "compute_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+def get_dashboard_data(refresh: bool = False) -> dict:
+    """
+    Task and test case rollups for the dashboard, cached for DASHBOARD_TTL
+    seconds and dropped by any write to to_do_list or test_management.
+    The frames are shared between sessions: read them, do not modify them.
+
+    Args:
+        refresh (bool): Recompute even if a cached copy exists.
+
+    Returns:
+        dict: "rollups" (name -> DataFrame, "projects" -> list), "compute_ms"
+        (time the rollups took) and "age_seconds" (time since they were computed).
+    """
+    if refresh:
+        with _lock:
+            _cache.pop(("dashboard", None, None), None)
+    data = _cached("dashboard", None, None, _load_dashboard, ttl=DASHBOARD_TTL)
+    return {**data, "age_seconds": time.time() - data["computed_at"]}
+
+
+def invalidate_user_data(table: str = None, username: str = None):
+    """
+    Drops cached views. ``table`` limits it to views over that table and
+    ``username`` to one user; with neither, the whole cache is cleared.
+    Shared views are dropped for a write by any user.
+    """
+    with _lock:
+        for changed in [table] if table else _WATCHED_TABLES:
+            _generations[changed] = _generations.get(changed, 0) + 1
+        for key in list(_cache):
+            view, user, _ = key
+            if table and table not in _view_tables(view):
+                continue
+            if username and user is not None and user != username:
+                continue
+            del _cache[key]
+        _stats["invalidations"] += 1
+
+
+def cache_stats() -> dict:
+    """Hit/miss/invalidation counters plus current size and hit ratio."""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_cache),
+            "hit_ratio": _stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+# --- Write-driven invalidation ---
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_flushed_writes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in _WATCHED_TABLES:
+            pending.add((table, getattr(obj, "created_by", None)))
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _collect_statement_writes(orm_execute_state):
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    table = orm_execute_state.bind_mapper.local_table.name
+    if table in _WATCHED_TABLES:
+        # Bulk UPDATE/DELETE can touch any user's rows
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add((table, None))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_committed_writes(session):
+    for table, username in session.info.pop(_PENDING_KEY, ()):
+        invalidate_user_data(table, username)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back_writes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,179 @@
+"""
+Field-level change history for the editable task and test case grids.
+
+Each save logs one ModifiedLog entry per changed row. The entry's code is
+``<table>:<id>`` (e.g. ``test_management:42``), and its changes field holds
+only the changed columns as compact JSON:
+
+    {"diff":{"status":["Pending","Pass"]}}
+
+Each value pair is [old, new]. A deleted row gets a DeletedLog entry with
+the same code and a snapshot of the row: ``{"row":{...}}``.
+
+``row_as_of`` rebuilds a row at a given time. It starts from the current
+row (or from the deletion snapshot) and undoes the newer diffs, newest
+first. Both lookups use the code index of the log tables, so a rebuild
+reads only the row's own entries. Storing diffs instead of full snapshots
+keeps an edit of one status cell to a few dozen bytes.
+
+Log times are UTC.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, select
+
+from audit_log import record
+from bulk_ops import MAX_BIND_PARAMS, python_value
+from models import DeletedLog, ModifiedLog
+
+
+def history_code(model, row_id) -> str:
+    """Log code of a row: ``<table>:<id>``."""
+    return f"{model.__tablename__}:{row_id}"
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot log a {type(value).__name__} value")
+
+
+def _encode(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=_json_value)
+
+
+def encode_diff(old: dict, new: dict) -> str:
+    """Compact JSON of the columns in ``new`` (primary key excluded) as [old, new] pairs."""
+    return _encode({"diff": {field: [old.get(field), value] for field, value in new.items() if field != "id"}})
+
+
+def decode_changes(changes: str) -> dict:
+    """The diff/row payload of a log entry; None for free-text entries."""
+    if not changes or not changes.startswith("{"):
+        return None
+    try:
+        payload = json.loads(changes)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) and ("diff" in payload or "row" in payload) else None
+
+
+def record_updates(model, mappings: list, previous: list, user: str, task_column: str):
+    """
+    Logs one diff entry per updated row.
+
+    Args:
+        model: TestCase or ToDoList.
+        mappings (list): New values per row (with "id"), as written by bulk_update.
+        previous (list): Old values per row, in the same order (previous_values).
+        user (str): User who saved.
+        task_column (str): Column whose value goes into tasks_assigned ("task_id", "tasks_assigned").
+    """
+    for new, old in zip(mappings, previous):
+        task = new.get(task_column, old.get(task_column))
+        record("modification", history_code(model, new["id"]), task, user, encode_diff(old, new))
+
+
+def snapshot_rows(session, model, ids) -> list:
+    """Column values of the rows ``ids``, for record_deletions; call it before deleting them."""
+    table = model.__table__
+    ids = [python_value(row_id) for row_id in ids]
+    rows = []
+    for start in range(0, len(ids), MAX_BIND_PARAMS):
+        stmt = select(table).where(table.c.id.in_(ids[start:start + MAX_BIND_PARAMS]))
+        rows.extend(dict(row) for row in session.execute(stmt).mappings())
+    return rows
+
+
+def previous_values(session, model, mappings: list, task_column: str) -> list:
+    """
+    Values that ``mappings`` are about to replace, read from the database.
+
+    Call it in the save transaction, before bulk_update, so the logged old
+    values are what the update overwrote rather than what the editor showed.
+
+    Returns:
+        list: Per mapping, its columns (and ``task_column``) as stored now, in the same order.
+    """
+    rows = {row["id"]: row for row in snapshot_rows(session, model, [mapping["id"] for mapping in mappings])}
+    previous = []
+    for mapping in mappings:
+        row = rows.get(mapping["id"], {})
+        previous.append({field: row.get(field) for field in [*mapping, task_column]})
+    return previous
+
+
+def record_deletions(model, rows: list, user: str, task_column: str):
+    """Logs a deletion entry with the full snapshot of each row in ``rows`` (see snapshot_rows)."""
+    for row in rows:
+        record("deletion", history_code(model, row["id"]), row.get(task_column), user, _encode({"row": row}))
+
+
+def _restore_types(model, row: dict) -> dict:
+    """Turns the ISO strings of DateTime columns back into datetimes."""
+    for column in model.__table__.columns:
+        value = row.get(column.key)
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            row[column.key] = datetime.fromisoformat(value)
+    return row
+
+
+def row_history(session, model, row_id) -> list:
+    """
+    Diff entries of a row, newest first.
+
+    Returns:
+        list: (modified_at, modified_by, {column: [old, new]}) per entry
+    """
+    stmt = (
+        select(ModifiedLog.modified_at, ModifiedLog.modified_by, ModifiedLog.changes)
+        .where(ModifiedLog.code == history_code(model, row_id))
+        .order_by(ModifiedLog.modified_at.desc(), ModifiedLog.id.desc())
+    )
+    history = []
+    for modified_at, modified_by, changes in session.execute(stmt):
+        payload = decode_changes(changes)
+        if payload and "diff" in payload:
+            history.append((modified_at, modified_by, payload["diff"]))
+    return history
+
+
+def row_as_of(session, model, row_id, at: datetime) -> dict:
+    """
+    Rebuilds a TestCase/ToDoList row as it was at ``at`` (UTC).
+
+    Rows that were already deleted at ``at``, or deleted without a snapshot,
+    return None. Rows created without a log entry are assumed to have existed
+    since before ``at`` and come back as they were first saved.
+
+    Returns:
+        dict: Column values of the row, or None.
+    """
+    code = history_code(model, row_id)
+    current = snapshot_rows(session, model, [row_id])
+    if current:
+        row = current[0]
+    else:
+        deleted_at, changes = session.execute(
+            select(DeletedLog.deleted_at, DeletedLog.changes)
+            .where(DeletedLog.code == code)
+            .order_by(DeletedLog.deleted_at.desc(), DeletedLog.id.desc())
+            .limit(1)
+        ).first() or (None, None)
+        payload = decode_changes(changes)
+        if deleted_at is None or deleted_at <= at or not payload or "row" not in payload:
+            return None
+        row = _restore_types(model, payload["row"])
+
+    newer = session.execute(
+        select(ModifiedLog.changes)
+        .where(ModifiedLog.code == code, ModifiedLog.modified_at > at)
+        .order_by(ModifiedLog.modified_at.desc(), ModifiedLog.id.desc())
+    ).scalars()
+    for changes in newer:
+        payload = decode_changes(changes)
+        if payload and "diff" in payload:
+            for field, (old, _) in payload["diff"].items():
+                row[field] = old
+    return _restore_types(model, row)
@@ -0,0 +1,350 @@
+"""
+Bulk import of uploaded sheets: tasks into ``to_do_list`` and test cases
+into ``test_management``.
+
+Task sheets are streamed: CSV files are read in chunks, so memory stays
+bounded by the chunk size; Excel files are read once and then processed in
+the same chunks. Every chunk is normalised with vectorized pandas
+operations and inserted with executemany batches on one Core connection,
+all inside one transaction (a bad file loads nothing).
+
+Test case sheets are validated as a set: tasks and existing Test Case IDs
+are looked up once for the whole file, rejected rows are returned as one
+report instead of being reported line by line.
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, MetaData, String, Table, insert, select
+
+from bulk_ops import python_value
+from database import engine
+from data_access import invalidate_user_data
+from models import TestCase, ToDoList
+from numbering import parse_test_case_numbers, refresh_counters
+
+
+READ_CHUNK_SIZE = int(os.getenv("TASK_IMPORT_CHUNK_SIZE", "20000"))  # Rows parsed at a time
+INSERT_BATCH_SIZE = int(os.getenv("TASK_IMPORT_BATCH_SIZE", "5000"))  # Rows per executemany
+
+# Sheet header -> (column, default when the cell or the whole column is missing)
+TEXT_COLUMNS = {
+    "Project": ("project", "N/A"),
+    "Tasks Assigned": ("tasks_assigned", "N/A"),
+    "Description": ("description", "N/A"),
+    "Build Version": ("build_version", "N/A"),
+    "Priority": ("priority", "-"),
+    "Severity": ("severity", "-"),
+    "Status": ("status", "N/A"),
+}
+DATE_COLUMNS = {
+    "Start Date": "start_date",
+    "End Date": "end_date",
+}
+INT_COLUMNS = {
+    "Time Spent (Min)": "time_spent_min",
+    "Test Cases": "test_cases",
+    "Defects Count": "defects_count",
+    "Fixed": "fixed",
+    "Need to Fix (Remaining)": "need_to_fix_remaining",
+    "Pass Count": "pass_count",
+}
+FLOAT_COLUMNS = {
+    "Time Spent Per Case (Min)": "time_spent_per_case_min",
+}
+ONGOING_TRUE = ["yes", "y", "true", "1", "1.0"]
+# CSV chunks are typed one by one, so columns that are parsed as text are read as text in every chunk.
+# Only empty cells are missing: "NA" or "null" is a value here, not a gap.
+CSV_TEXT_OPTIONS = {
+    "dtype": {header: str for header in [*TEXT_COLUMNS, *DATE_COLUMNS, "Ongoing"]},
+    "keep_default_na": False,
+    "na_values": [""],
+}
+
+
+def _is_csv(uploaded_file) -> bool:
+    return uploaded_file.name.lower().endswith(".csv")
+
+
+def read_sheet(uploaded_file, **options) -> pd.DataFrame:
+    """Reads a whole CSV or Excel upload; ``options`` go to pandas (e.g. dtype=str)."""
+    return pd.read_csv(uploaded_file, **options) if _is_csv(uploaded_file) else pd.read_excel(uploaded_file, **options)
+
+
+def read_sheet_chunks(uploaded_file, chunk_size: int = READ_CHUNK_SIZE):
+    """
+    Yields (DataFrame chunk, fraction of the file read) for a CSV or Excel upload.
+    CSV text columns are read as strings (CSV_TEXT_OPTIONS), whatever a chunk holds.
+    """
+    if _is_csv(uploaded_file):
+        size = getattr(uploaded_file, "size", None)
+        for chunk in pd.read_csv(uploaded_file, chunksize=chunk_size, **CSV_TEXT_OPTIONS):
+            yield chunk, min(uploaded_file.tell() / size, 1.0) if size else None
+        return
+
+    df = read_sheet(uploaded_file)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size], min((start + chunk_size) / len(df), 1.0)
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parses each distinct value once (sheets repeat the same dates); unparseable -> NaT."""
+    uniques = pd.Series(values.dropna().unique())
+    parsed = pd.to_datetime(uniques.astype(str), errors="coerce", format="mixed")
+    return values.map(dict(zip(uniques, parsed))).astype("datetime64[ns]")
+
+
+def normalize_task_chunk(chunk: pd.DataFrame, created_by: str):
+    """
+    Turns a sheet chunk into ``to_do_list`` rows with vectorized operations.
+
+    Missing text/dates get defaults (dates default to today), numbers that do
+    not parse become 0 and Ongoing maps yes/true/1 to 1, anything else to 0.
+
+    Returns:
+        tuple: (DataFrame with model columns, number of cells that failed to parse)
+    """
+    rows = pd.DataFrame(index=chunk.index)
+    invalid = 0
+
+    for header, (column, default) in TEXT_COLUMNS.items():
+        if header in chunk:
+            rows[column] = chunk[header].astype("string").str.strip().fillna(default).astype(object)
+        else:
+            rows[column] = default
+
+    today = pd.Timestamp(datetime.today().date())
+    for header, column in DATE_COLUMNS.items():
+        if header in chunk:
+            parsed = _parse_dates(chunk[header])
+            invalid += int((parsed.isna() & chunk[header].notna()).sum())
+            rows[column] = parsed.fillna(today)
+        else:
+            rows[column] = today
+
+    for headers, dtype in ((INT_COLUMNS, "int64"), (FLOAT_COLUMNS, "float64")):
+        for header, column in headers.items():
+            if header in chunk:
+                parsed = pd.to_numeric(chunk[header], errors="coerce")
+                invalid += int((parsed.isna() & chunk[header].notna()).sum())
+                rows[column] = parsed.fillna(0).astype(dtype)
+            else:
+                rows[column] = pd.Series(0, index=chunk.index, dtype=dtype)
+
+    if "Ongoing" in chunk:
+        ongoing = chunk["Ongoing"].astype("string").str.strip().str.lower().isin(ONGOING_TRUE)
+        rows["ongoing"] = ongoing.fillna(False).astype("int64")
+    else:
+        rows["ongoing"] = 0
+
+    rows["created_by"] = created_by
+    return rows, invalid
+
+
+def _insert_frame(conn, table, frame: pd.DataFrame, batch_size: int):
+    """
+    Inserts a normalised frame with the driver's executemany.
+
+    The INSERT is compiled once and rows go to the DBAPI as plain tuples (dicts
+    for named paramstyles). Type bind processors run once per column instead
+    of SQLAlchemy building and processing a parameter dict per row.
+    """
+    columns = list(frame.columns)
+    compiled = insert(table).compile(dialect=conn.dialect, column_keys=columns)
+    data = {}
+    for name in compiled.binds:
+        if name not in frame:  # Columns with Python-side scalar defaults (is_modified, ...)
+            frame = frame.assign(**{name: table.c[name].default.arg})
+    columns = list(frame.columns)
+    for name in columns:
+        processor = table.c[name].type.dialect_impl(conn.dialect).bind_processor(conn.dialect)
+        if processor:
+            # Imported columns repeat a few values (dates), so process each distinct one once
+            uniques = frame[name].unique()
+            processed = {value: processor(python_value(value)) for value in uniques}
+            data[name] = frame[name].map(processed).tolist()
+        else:
+            data[name] = frame[name].tolist()  # numpy scalars -> Python values
+
+    if compiled.positional:
+        params = list(zip(*(data[name] for name in compiled.positiontup)))
+    else:
+        params = [dict(zip(columns, row)) for row in zip(*(data[name] for name in columns))]
+
+    sql = str(compiled)
+    for start in range(0, len(params), batch_size):
+        conn.exec_driver_sql(sql, params[start:start + batch_size])
+
+
+def ingest_tasks(uploaded_file, created_by: str, progress=None,
+                 chunk_size: int = READ_CHUNK_SIZE, batch_size: int = INSERT_BATCH_SIZE) -> dict:
+    """
+    Streams a task sheet into the database.
+
+    Args:
+        uploaded_file: File-like object with a ``name`` (Streamlit UploadedFile or open file).
+        created_by (str): Owner of the imported tasks.
+        progress: Optional callable(fraction or None, rows inserted so far).
+        chunk_size (int): Rows parsed per chunk.
+        batch_size (int): Rows per executemany.
+
+    Returns:
+        dict: rows inserted and invalid (unparseable) cells replaced by defaults.
+    """
+    table = ToDoList.__table__
+    inserted = invalid = 0
+
+    with engine.begin() as conn:
+        for chunk, fraction in read_sheet_chunks(uploaded_file, chunk_size):
+            rows, bad_cells = normalize_task_chunk(chunk, created_by)
+            invalid += bad_cells
+            _insert_frame(conn, table, rows, batch_size)
+            inserted += len(rows)
+            if progress:
+                progress(fraction, inserted)
+
+    invalidate_user_data(table.name, created_by)  # Core inserts bypass the session events
+    return {"inserted": inserted, "invalid": invalid}
+
+
+# --- Test case sheets ---
+
+# Sheet header -> test_management column
+TEST_CASE_COLUMNS = {
+    "Test Scenario": "test_scenario",
+    "Field Name / Parent": "field_parent",
+    "Field Name / Child": "field_child",
+    "Detailed Input": "detailed_input",
+    "Test Cases": "test_cases",
+    "Pre-Condition": "pre_condition",
+    "Test Steps": "test_steps",
+    "Test Data": "test_data",
+    "Post Condition": "post_condition",
+    "Expected Result": "expected_result",
+    "Actual Result": "actual_result",
+}
+
+REJECT_EMPTY_ID = "Empty Test Case ID"
+REJECT_UNKNOWN_TASK = "Task ID not found"
+REJECT_DUPLICATE_IN_FILE = "Duplicate Test Case ID in file"
+REJECT_EXISTING = "Test Case ID already exists"
+
+_LOOKUP_CHUNK = 900  # IN (...) values per task lookup, below SQLite's bound-parameter limit
+
+
+def _lookup_tasks(conn, task_ids) -> pd.DataFrame:
+    """Build version and project of the given tasks, indexed by task id."""
+    rows = []
+    for start in range(0, len(task_ids), _LOOKUP_CHUNK):
+        stmt = select(ToDoList.id, ToDoList.build_version, ToDoList.project).where(
+            ToDoList.id.in_(task_ids[start:start + _LOOKUP_CHUNK])
+        )
+        rows.extend(conn.execute(stmt).all())
+    return pd.DataFrame(rows, columns=["id", "build_version", "project"]).set_index("id")
+
+
+def _existing_test_case_ids(conn, test_case_ids) -> set:
+    """
+    Which of ``test_case_ids`` are already taken, in one join.
+
+    The candidates go into a temporary table that is joined against the unique
+    index on test_case_id, so the cost does not depend on the size of the file
+    or of the table and no statement hits the bound-parameter limit.
+    """
+    candidates = Table(
+        "upload_test_case_ids", MetaData(),
+        Column("test_case_id", String, primary_key=True),
+        prefixes=["TEMPORARY"],
+    )
+    candidates.create(conn)
+    try:
+        _insert_frame(conn, candidates, pd.DataFrame({"test_case_id": list(test_case_ids)}), INSERT_BATCH_SIZE)
+        stmt = select(TestCase.test_case_id).join(
+            candidates, candidates.c.test_case_id == TestCase.test_case_id
+        )
+        return set(conn.execute(stmt).scalars())
+    finally:
+        candidates.drop(conn)
+
+
+def ingest_test_cases(uploaded_file, created_by: str) -> dict:
+    """
+    Imports a test case sheet with set-based validation and one bulk insert.
+
+    A row is rejected when its Test Case ID is blank, its Task ID does not
+    exist, its Test Case ID repeats an earlier row of the file or is already
+    taken. Rows without a Test Case ID get one generated from the task.
+
+    Args:
+        uploaded_file: File-like object with a ``name`` (Streamlit UploadedFile or open file).
+        created_by (str): Owner of the imported test cases.
+
+    Returns:
+        dict: rows inserted and a ``rejected`` DataFrame (sheet Row, Reason and the original columns).
+    """
+    df = read_sheet(uploaded_file, dtype=str)  # Keep IDs and texts exactly as typed
+    sheet_rows = pd.Series(df.index + 2, index=df.index)  # Line in the sheet, after the header
+    reasons = pd.Series(pd.NA, index=df.index, dtype="object")
+
+    def reject(mask, reason):
+        reasons[mask & reasons.isna()] = reason
+
+    test_case_ids = df["Test Case ID"].str.strip() if "Test Case ID" in df else pd.Series(pd.NA, index=df.index, dtype="object")
+    reject(test_case_ids.eq("").fillna(False).astype(bool), REJECT_EMPTY_ID)
+
+    raw_task_ids = pd.to_numeric(df["Task ID"], errors="coerce") if "Task ID" in df else pd.Series(np.nan, index=df.index)
+    whole = raw_task_ids.notna() & (raw_task_ids % 1 == 0)
+    task_ids = raw_task_ids.where(whole).astype("Int64")
+
+    with engine.begin() as conn:
+        tasks = _lookup_tasks(conn, [int(t) for t in task_ids.dropna().unique()])
+        reject(~task_ids.isin(tasks.index).fillna(False).astype(bool), REJECT_UNKNOWN_TASK)
+
+        valid = reasons.isna()
+        build_versions = task_ids.map(tasks["build_version"])
+        projects = task_ids.map(tasks["project"])
+
+        # Generated IDs for rows without one; rows generated in the same second get a counter
+        missing = valid & test_case_ids.isna()
+        if missing.any():
+            timestamp = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+            generated = (
+                task_ids[missing].astype(str) + "-" + build_versions[missing].astype(str)
+                + "-" + projects[missing].astype(str) + "-" + timestamp
+            )
+            repeat = generated.groupby(generated).cumcount()
+            generated = generated.where(repeat == 0, generated + "-" + repeat.astype(str))
+            test_case_ids = test_case_ids.where(~missing, generated)
+
+        reject(valid & test_case_ids.duplicated(), REJECT_DUPLICATE_IN_FILE)
+        valid = reasons.isna()
+        if valid.any():
+            existing = _existing_test_case_ids(conn, test_case_ids[valid].unique())
+            reject(valid & test_case_ids.isin(existing), REJECT_EXISTING)
+
+        accepted = reasons.isna()
+        rows = pd.DataFrame({"test_case_id": test_case_ids[accepted]})
+        for header, column in TEST_CASE_COLUMNS.items():
+            rows[column] = df[header][accepted] if header in df else ""
+        status = df["Status (Pass/Fail)"][accepted] if "Status (Pass/Fail)" in df else pd.Series(pd.NA, index=rows.index)
+        rows["status"] = status.fillna("Pending")
+        rows["task_id"] = task_ids[accepted].astype("int64")
+        rows["build_version"] = build_versions[accepted]
+        rows["created_by"] = created_by
+        rows = rows.join(parse_test_case_numbers(rows["test_case_id"]))
+        rows["scenario_key"] = rows["test_scenario"].astype("string").str.strip()
+        rows = rows.astype(object).where(rows.notna(), None)  # Empty cells -> NULL
+
+        if len(rows):
+            _insert_frame(conn, TestCase.__table__, rows, INSERT_BATCH_SIZE)
+            refresh_counters(conn, rows["task_id"].unique().tolist())  # Uploaded IDs may carry TS#/TC#
+
+    if len(rows):
+        invalidate_user_data(TestCase.__tablename__, created_by)  # Core inserts bypass the session events
+
+    rejected = df[~accepted].copy()
+    rejected.insert(0, "Reason", reasons[~accepted])
+    rejected.insert(0, "Row", sheet_rows[~accepted])
+    return {"inserted": len(rows), "rejected": rejected}
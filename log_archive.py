@@ -0,0 +1,149 @@
+"""
+Retention for the audit log tables: old rows move to compressed files.
+
+``archive_logs`` copies the log rows older than a cutoff into one gzip'd
+JSON Lines file per table and day,
+``<AUDIT_ARCHIVE_DIR>/<table>/<YYYY-MM-DD>.jsonl.gz``, and then deletes
+them from the live table. It works in chunks of the oldest rows (read
+through the time index) and commits once per chunk, so the write lock is
+never held for long and memory stays flat. A chunk is written and fsync'd
+before its rows are deleted. A crash between the two can therefore leave
+duplicates, never holes, and readers skip ids they have already seen.
+
+The log viewer reads the archive on demand and opens only the day files
+in its date range. Archived diffs are no longer seen by history.row_as_of,
+so rebuilds reach back as far as the retention period.
+"""
+import functools
+import gzip
+import json
+import os
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+from sqlalchemy import delete, select
+
+from audit_log import LOG_MODELS
+
+ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "log_archive")
+RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "180"))
+
+_DELETE_CHUNK = 900  # ids per DELETE ... IN (...), below SQLite's bound-parameter limit
+
+
+def archive_path(kind: str, day: date, root: str = None) -> str:
+    """Archive file of one log and day."""
+    model = LOG_MODELS[kind][0]
+    return os.path.join(root or ARCHIVE_DIR, model.__tablename__, f"{day.isoformat()}.jsonl.gz")
+
+
+def _append_rows(path: str, rows: list):
+    """Appends rows as one gzip member (a gzip file may hold several) and syncs it to disk."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for row in rows:
+                out.write(json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+                out.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_logs(engine, cutoff: datetime = None, chunk_size: int = 5000, root: str = None, progress=None) -> dict:
+    """
+    Moves the log rows older than ``cutoff`` (default: RETENTION_DAYS ago,
+    at midnight UTC) to the archive.
+
+    Args:
+        engine: Database engine.
+        cutoff (datetime): Rows logged before this time are archived.
+        chunk_size (int): Rows read, written and deleted per transaction.
+        root (str): Archive directory, ARCHIVE_DIR by default.
+        progress (callable): Called with (kind, rows archived so far) after each chunk.
+
+    Returns:
+        dict: Rows archived per log kind.
+    """
+    if cutoff is None:
+        cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=RETENTION_DAYS), time.min)
+    archived = {}
+    for kind, (model, user_column, time_column) in LOG_MODELS.items():
+        table = model.__table__
+        logged_at = table.c[time_column]
+        columns = [table.c.id, logged_at, table.c.code, table.c.tasks_assigned, table.c[user_column], table.c.changes]
+        archived[kind] = 0
+        while True:
+            # Each chunk deletes what it read, so the next one starts again from the oldest row
+            stmt = select(*columns).where(logged_at < cutoff).order_by(logged_at, table.c.id).limit(chunk_size)
+            with engine.begin() as conn:
+                rows = conn.execute(stmt).mappings().all()
+                if not rows:
+                    break
+                by_day = {}
+                for row in rows:
+                    record = dict(row)
+                    record[time_column] = record[time_column].isoformat()
+                    by_day.setdefault(row[time_column].date(), []).append(record)
+                for day, day_rows in by_day.items():
+                    _append_rows(archive_path(kind, day, root), day_rows)
+
+                ids = [row["id"] for row in rows]
+                for start in range(0, len(ids), _DELETE_CHUNK):
+                    conn.execute(delete(table).where(table.c.id.in_(ids[start:start + _DELETE_CHUNK])))
+            archived[kind] += len(rows)
+            if progress:
+                progress(kind, archived[kind])
+    return archived
+
+
+def archived_days(kind: str, root: str = None) -> list:
+    """Days with an archive file for the log, oldest first."""
+    directory = os.path.dirname(archive_path(kind, date.today(), root))
+    if not os.path.isdir(directory):
+        return []
+    return sorted(date.fromisoformat(name[:-len(".jsonl.gz")]) for name in os.listdir(directory)
+                  if name.endswith(".jsonl.gz"))
+
+
+@functools.lru_cache(maxsize=32)
+def _read_day(path: str, mtime: float) -> pd.DataFrame:
+    """One archive file as a frame; cached until the file changes (``mtime`` is part of the key)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        frame = pd.DataFrame([json.loads(line) for line in f])
+    return frame.drop_duplicates("id", keep="last")
+
+
+def read_archive(kind: str, filters: dict = None, root: str = None) -> pd.DataFrame:
+    """
+    Archived rows of a log matching ``filters`` (user, task, code, start,
+    end; as in the log viewer), newest first. Only the day files inside
+    start/end are opened.
+    """
+    filters = filters or {}
+    _, user_column, time_column = LOG_MODELS[kind]
+    start, end = filters.get("start"), filters.get("end")
+    frames = []
+    for day in archived_days(kind, root):
+        if (start and day < start.date()) or (end and datetime.combine(day, time.min) >= end):
+            continue
+        path = archive_path(kind, day, root)
+        frames.append(_read_day(path, os.path.getmtime(path)))
+    columns = ["id", time_column, user_column, "code", "tasks_assigned", "changes"]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    rows = pd.concat(frames, ignore_index=True)
+    rows[time_column] = pd.to_datetime(rows[time_column], format="ISO8601")
+    mask = pd.Series(True, index=rows.index)
+    if filters.get("user"):
+        mask &= rows[user_column] == filters["user"]
+    if filters.get("task"):
+        mask &= rows["tasks_assigned"] == filters["task"]
+    if filters.get("code"):
+        mask &= rows["code"] == filters["code"]
+    if start:
+        mask &= rows[time_column] >= start
+    if end:
+        mask &= rows[time_column] < end
+    return rows.loc[mask, columns].sort_values([time_column, "id"], ascending=False, ignore_index=True)
+
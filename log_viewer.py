@@ -0,0 +1,197 @@
+"""
+Check Log page: keyset-paginated explorer over the audit log tables.
+
+Every render runs one page query (LIMIT page size + 1) and two aggregate
+queries (total and per-user counts) against the (user, time) and (task,
+time) indexes, so its cost does not grow with the history. Rows moved out
+by log_archive are shown from their archive files for a chosen date range.
+"""
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import func, literal, select, tuple_
+
+from audit_log import audit_writer
+from log_archive import archived_days, read_archive
+from database import SessionLocal
+from models import CreationLog, DeletedLog, ModifiedLog
+
+# Log name -> (model, user column, time column)
+LOG_TABLES = {
+    "Modifications": (ModifiedLog, ModifiedLog.modified_by, ModifiedLog.modified_at),
+    "Deletions": (DeletedLog, DeletedLog.deleted_by, DeletedLog.deleted_at),
+    "Creations": (CreationLog, CreationLog.created_by, CreationLog.created_at),
+}
+# Log name -> audit_log kind, the key of its archive files
+LOG_KINDS = {"Modifications": "modification", "Deletions": "deletion", "Creations": "creation"}
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _log_conditions(log, filters):
+    """WHERE clauses for a log; ``filters`` keys: user, task, code, start, end (end exclusive)."""
+    model, user_column, time_column = LOG_TABLES[log]
+    conditions = []
+    if filters.get("user"):
+        conditions.append(user_column == filters["user"])
+    if filters.get("task"):
+        conditions.append(model.tasks_assigned == filters["task"])
+    if filters.get("code"):
+        conditions.append(model.code == filters["code"])
+    if filters.get("start"):
+        conditions.append(time_column >= filters["start"])
+    if filters.get("end"):
+        conditions.append(time_column < filters["end"])
+    return conditions
+
+
+def get_log_page(log: str, filters: dict = None, after=None, page_size: int = 50):
+    """
+    Returns one page of a log, newest first.
+
+    Pagination is keyset-based on (time, id), so a page deep in the history
+    costs the same as the first one.
+
+    Args:
+        log (str): One of LOG_TABLES.
+        filters (dict): Optional user, task, code, start and end (datetimes).
+        after (tuple): Cursor returned for the previous page, None for the first page.
+        page_size (int): Rows per page.
+
+    Returns:
+        tuple: (DataFrame of the page, cursor of the next page or None on the last page)
+    """
+    model, user_column, time_column = LOG_TABLES[log]
+    conditions = _log_conditions(log, filters or {})
+    if after is not None:
+        key, last = tuple_(time_column, model.id), tuple_(literal(after[0]), literal(after[1]))
+        conditions.append(key < last)
+
+    columns = [model.id, time_column, user_column, model.code, model.tasks_assigned, model.changes]
+    stmt = (
+        select(*columns)
+        .where(*conditions)
+        .order_by(time_column.desc(), model.id.desc())
+        .limit(page_size + 1)
+    )
+    with SessionLocal.session_factory() as session:
+        rows = session.execute(stmt).all()
+
+    page = pd.DataFrame(rows[:page_size], columns=[c.key for c in columns])
+    next_cursor = None
+    if len(rows) > page_size:
+        last_row = rows[page_size - 1]
+        next_cursor = (last_row[1], last_row.id)
+    return page, next_cursor
+
+
+def count_logs(log: str, filters: dict = None) -> int:
+    """Number of log rows matching ``filters``."""
+    model, _, _ = LOG_TABLES[log]
+    stmt = select(func.count()).select_from(model).where(*_log_conditions(log, filters or {}))
+    with SessionLocal.session_factory() as session:
+        return session.execute(stmt).scalar()
+
+
+def count_logs_by_user(log: str, filters: dict = None, limit: int = 10) -> pd.DataFrame:
+    """The users with the most matching log rows, as a (user, entries) frame."""
+    model, user_column, _ = LOG_TABLES[log]
+    entries = func.count().label("entries")
+    stmt = (
+        select(user_column.label("user"), entries)
+        .where(*_log_conditions(log, filters or {}))
+        .group_by(user_column)
+        .order_by(entries.desc())
+        .limit(limit)
+    )
+    with SessionLocal.session_factory() as session:
+        return pd.DataFrame(session.execute(stmt).all(), columns=["user", "entries"])
+
+
+def _archive_page(log, filters, after, page_size):
+    """
+    Page, next cursor (a row offset), total and per-user counts of the
+    archived rows, from one read of the day files in the date range.
+    """
+    rows = read_archive(LOG_KINDS[log], filters)
+    start = after or 0
+    next_cursor = start + page_size if len(rows) > start + page_size else None
+    user_column = LOG_TABLES[log][1].key
+    by_user = rows[user_column].value_counts().head(10).rename_axis("user").reset_index(name="entries")
+    return rows.iloc[start:start + page_size], next_cursor, len(rows), by_user
+
+
+def log_viewer_page():
+    """Filterable, paged view of the modification, deletion and creation logs."""
+    st.subheader("📜 Check Log")
+    audit_writer.flush(timeout=2)  # Include entries still queued in this process
+    stats = audit_writer.stats()
+    st.caption(
+        f"Audit writer: {stats['queue_depth']} queued, {stats['written']:,} written in {stats['flushes']:,} batches, "
+        f"last flush {stats['last_flush_ms']:.1f} ms (max {stats['max_flush_ms']:.1f} ms)"
+    )
+    if stats["dropped"]:
+        st.warning(f"⚠️ {stats['dropped']:,} audit log entries were rejected by the database and dropped.")
+
+    col1, col2 = st.columns(2)
+    log = col1.radio("Log", list(LOG_TABLES), horizontal=True, key="log_table")
+    source = col2.radio("Source", ["Live", "Archive"], horizontal=True, key="log_source")
+    with st.expander("🔎 Filter", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        user = col1.text_input("User", key="log_filter_user").strip()
+        task = col2.text_input("Task Assigned", key="log_filter_task").strip()
+        code = col3.text_input("Code", key="log_filter_code").strip()
+        col4, col5 = st.columns(2)
+        dates = col4.date_input("Date Range", value=(), key="log_filter_dates")
+        page_size = col5.selectbox("Rows Per Page", PAGE_SIZES, index=1, key="log_page_size")
+
+    filters = {"user": user or None, "task": task or None, "code": code or None, "start": None, "end": None}
+    if len(dates) >= 1:
+        filters["start"] = datetime.combine(dates[0], time.min)
+        filters["end"] = datetime.combine(dates[-1] + timedelta(days=1), time.min)  # Whole last day
+
+    if source == "Archive":
+        days = archived_days(LOG_KINDS[log])
+        if not days:
+            st.info(f"ℹ️ No {log.lower()} archived yet.")
+            return
+        if filters["start"] is None:
+            # Archive files are only opened for a chosen period
+            st.info(f"ℹ️ Archived {log.lower()} cover {days[0]} to {days[-1]}. Pick a date range to view them.")
+            return
+
+    # Start again from the first page whenever the query changes
+    query = (log, source, tuple(sorted(filters.items())), page_size)
+    if st.session_state.get("log_query") != query:
+        st.session_state.log_query = query
+        st.session_state.log_cursors = [None]  # Cursor of every visited page (keyset, or row offset in the archive)
+    cursors = st.session_state.log_cursors
+
+    if source == "Archive":
+        page, next_cursor, total, by_user = _archive_page(log, filters, cursors[-1], page_size)
+    else:
+        page, next_cursor = get_log_page(log, filters, cursors[-1], page_size)
+    if page.empty:
+        filtered = any(value is not None for value in filters.values())
+        st.warning("No log entries match the filters." if filtered else f"No {log.lower()} logged yet.")
+        return
+
+    if source == "Live":
+        total = count_logs(log, filters)
+        by_user = count_logs_by_user(log, filters)
+    col1, col2 = st.columns([1, 2])
+    col1.metric("Matching Entries", f"{total:,}")
+    if len(by_user) > 1:
+        col2.bar_chart(by_user.set_index("user"), height=160)
+
+    first_row = (len(cursors) - 1) * page_size + 1
+    nav_prev, nav_info, nav_next = st.columns([1, 4, 1])
+    if nav_prev.button("⬅️ Previous", disabled=len(cursors) == 1, key="log_prev"):
+        cursors.pop()
+        st.rerun()
+    nav_info.caption(f"Showing {first_row}-{first_row + len(page) - 1} of {total:,} entries (page {len(cursors)})")
+    if nav_next.button("Next ➡️", disabled=next_cursor is None, key="log_next"):
+        cursors.append(next_cursor)
+        st.rerun()
+
+    st.dataframe(page.drop(columns=["id"]), hide_index=True)
@@ -0,0 +1,408 @@
+"""
+Versioned schema migrations and the query-plan check for the hot paths.
+
+Each migration runs in its own transaction and records its version in the
+``schema_version`` table, so ``upgrade()`` only applies what is missing.
+Migrations are written to be idempotent: a fresh database already gets the
+models' indexes/columns from ``create_all`` and the migration only records
+its version. A migration may return a callable for work that must wait
+until its transaction has committed (e.g. deleting files it replaced).
+
+``bootstrap()`` is the one place that creates the schema and seeds data;
+importing ``models`` does no database work.
+
+Usage:
+    python manage.py bootstrap
+    python manage.py migrate
+    python manage.py check-plans
+"""
+import os
+import re
+import shutil
+from collections import Counter
+
+import pandas as pd
+from sqlalchemy import bindparam, func, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from blob_store import blob_path, hash_file
+from models import (
+    AttachmentBlob, Attachments, Base, CreationLog, DeletedLog, ModifiedLog, SchemaVersion, TestCase,
+    TestCaseCounter, TestCodeGeneration, ToDoList, create_superadmin,
+)
+from numbering import parse_test_case_numbers, refresh_counters
+
+
+def _create_indexes(conn, table: str, indexes: dict):
+    """
+    Creates the indexes (name -> column names) that ``table`` does not have
+    yet. Migrations list their own indexes instead of reading the models, so
+    an index added to a model later is never replayed by an older migration.
+    """
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table)}
+    quote = conn.dialect.identifier_preparer.quote
+    for name, columns in indexes.items():
+        if name not in existing:
+            conn.execute(text(f"CREATE INDEX {quote(name)} ON {quote(table)} ({', '.join(map(quote, columns))})"))
+
+
+def _add_missing_columns(conn, model, *names):
+    """Adds declared columns that an older database does not have yet (create_all never alters tables)."""
+    table = model.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    quote = conn.dialect.identifier_preparer.quote
+    for name in names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(name)} {column_type}"))
+
+
+def _hot_path_indexes(conn):
+    """Indexes for get_user_data, the add_test_case scenario lookup and the dashboard GROUP BYs."""
+    _create_indexes(conn, "to_do_list", {
+        "ix_to_do_list_created_by": ["created_by"],
+        "ix_to_do_list_project": ["project", "tasks_assigned"],
+    })
+    _create_indexes(conn, "test_management", {
+        "ix_test_management_task_id": ["task_id", "test_case_id"],
+        "ix_test_management_created_by": ["created_by"],
+        "ix_test_management_build_status": ["build_version", "status"],
+        "ix_test_management_status": ["status"],
+    })
+    _create_indexes(conn, "attachments", {"ix_attachments_created_by": ["created_by"]})
+
+
+def _test_case_grid_indexes(conn):
+    """Per-user indexes behind the paged test case grid's filters and sorts."""
+    _create_indexes(conn, "test_management", {
+        "ix_test_management_owner_status": ["created_by", "status"],
+        "ix_test_management_owner_task": ["created_by", "task_id"],
+        "ix_test_management_owner_case": ["created_by", "test_case_id"],
+    })
+
+
+def _test_case_numbering(conn, batch_size: int = 5000):
+    """
+    Stores the TS#/TC# of every test case ID and its scenario key, indexes
+    them and seeds the per-task counters from the highest numbers in use.
+    """
+    _add_missing_columns(conn, TestCase, "ts_number", "tc_number", "scenario_key")
+    TestCaseCounter.__table__.create(conn, checkfirst=True)
+
+    table = TestCase.__table__
+    backfill = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(ts_number=bindparam("b_ts"), tc_number=bindparam("b_tc"), scenario_key=bindparam("b_key"))
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.test_case_id, table.c.test_scenario)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        batch = pd.DataFrame(rows, columns=["id", "test_case_id", "test_scenario"])
+        numbers = parse_test_case_numbers(batch["test_case_id"])
+        values = pd.DataFrame({
+            "b_id": batch["id"],
+            "b_ts": numbers["ts_number"],
+            "b_tc": numbers["tc_number"],
+            "b_key": batch["test_scenario"].astype("string").str.strip(),
+        }).astype(object)
+        conn.execute(backfill, values.where(values.notna(), None).to_dict("records"))
+        last_id = rows[-1].id
+
+    # Only now that its columns exist (migration 1 must never see this index)
+    _create_indexes(conn, "test_management", {
+        "ix_test_management_scenario": ["task_id", "scenario_key", "ts_number", "tc_number"],
+    })
+    refresh_counters(conn)
+
+
+# "20250318_163837_report.html" -> "report.html" (the prefix handle_attachments used to add)
+_UPLOAD_PREFIX = re.compile(r"^\d{8}_\d{6}_")
+
+
+def _attachment_blobs(conn):
+    """
+    Moves the files of existing attachments into the content-addressed blob
+    store: one blob per distinct content, hard-linked (or copied) from the
+    first file with that content. Rows then point at their blob and the old
+    files are deleted once the migration has committed.
+    """
+    _add_missing_columns(conn, Attachments, "file_name", "blob_digest")
+    AttachmentBlob.__table__.create(conn, checkfirst=True)
+
+    table, blobs = Attachments.__table__, AttachmentBlob.__table__
+    rows = conn.execute(select(table.c.id, table.c.file_path).where(table.c.blob_digest.is_(None))).all()
+
+    digests, sizes, references = {}, {}, Counter()  # legacy path -> digest, digest -> bytes, digest -> rows
+    moves = []
+    for attachment_id, stored_path in rows:
+        path = stored_path if os.path.isfile(stored_path) else stored_path.replace("\\", "/")  # Paths saved on Windows
+        if path not in digests:
+            if not os.path.isfile(path):
+                continue  # Missing file: the row keeps its path
+            digest, size = hash_file(path)
+            target = blob_path(digest)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(path, target)  # Same bytes on disk, no copy
+                except OSError:
+                    shutil.copy2(path, target)
+            digests[path], sizes[digest] = digest, size
+        digest = digests[path]
+        references[digest] += 1
+        moves.append({
+            "b_id": attachment_id,
+            "b_path": blob_path(digest),
+            "b_name": _UPLOAD_PREFIX.sub("", os.path.basename(path)),
+            "b_digest": digest,
+        })
+
+    known = set()
+    digest_list = list(references)
+    for start in range(0, len(digest_list), 900):
+        known.update(conn.execute(
+            select(blobs.c.digest).where(blobs.c.digest.in_(digest_list[start:start + 900]))
+        ).scalars())
+    new_blobs = [
+        {"digest": digest, "size": sizes[digest], "ref_count": count}
+        for digest, count in references.items() if digest not in known
+    ]
+    added_refs = [
+        {"b_digest": digest, "b_count": count} for digest, count in references.items() if digest in known
+    ]
+    if new_blobs:
+        conn.execute(blobs.insert(), new_blobs)
+    if added_refs:
+        conn.execute(
+            update(blobs).where(blobs.c.digest == bindparam("b_digest"))
+            .values(ref_count=blobs.c.ref_count + bindparam("b_count")),
+            added_refs,
+        )
+    if moves:
+        conn.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                file_path=bindparam("b_path"), file_name=bindparam("b_name"), blob_digest=bindparam("b_digest")
+            ),
+            moves,
+        )
+
+    def remove_replaced_files():
+        for path in digests:
+            if os.path.exists(path):
+                os.remove(path)
+
+    return remove_replaced_files
+
+
+def _log_indexes(conn):
+    """Code/time indexes the log tables were declared with, plus (user, time) and (task, time) for the log viewer."""
+    for table, user_column, time_column in (
+        ("modified_log", "modified_by", "modified_at"),
+        ("deleted_log", "deleted_by", "deleted_at"),
+        ("creation_log", "created_by", "created_at"),
+    ):
+        _create_indexes(conn, table, {
+            f"ix_{table}_code": ["code"],
+            f"ix_{table}_{time_column}": [time_column],
+            f"ix_{table}_user_time": [user_column, time_column],
+            f"ix_{table}_task_time": ["tasks_assigned", time_column],
+        })
+
+
+def _dashboard_rollup_index(conn):
+    """(status, priority, severity, project) on to_do_list, so the dashboard's task rollup reads only the index."""
+    _create_indexes(conn, "to_do_list", {"ix_to_do_list_rollup": ["status", "priority", "severity", "project"]})
+
+
+def _code_number_index(conn):
+    """(code_number, created_by) on test_code_generation, so the sequence audit streams the codes in index order."""
+    _create_indexes(conn, "test_code_generation", {
+        "ix_test_code_generation_code_number": ["code_number", "created_by"],
+    })
+
+
+def _test_case_rollup_index(conn):
+    """(task_id, build_version, status) on test_management, so the dashboard's test case rollup reads only the index."""
+    _create_indexes(conn, "test_management", {"ix_test_management_rollup": ["task_id", "build_version", "status"]})
+
+
+def _reset_sequence_state(conn):
+    """
+    Drops the stored sequence state. It used to count every lease as covering
+    its gaps; it now tracks open leases only and is reseeded from a full scan
+    on first use.
+    """
+    if "sequence_state" in inspect(conn).get_table_names():
+        conn.execute(text("DELETE FROM sequence_state"))
+
+
+# (version, description, function(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, "Indexes for the hot query paths", _hot_path_indexes),
+    (2, "Indexes for the paged test case grid", _test_case_grid_indexes),
+    (3, "TS#/TC# numbering columns and counters", _test_case_numbering),
+    (4, "Content-addressed attachment blobs", _attachment_blobs),
+    (5, "Indexes for the log viewer", _log_indexes),
+    (6, "Covering index for the dashboard rollup", _dashboard_rollup_index),
+    (7, "Index for the code sequence audit", _code_number_index),
+    (8, "Covering index for the test case rollup", _test_case_rollup_index),
+    (9, "Sequence state tracks open leases only", _reset_sequence_state),
+]
+
+
+def current_version(engine) -> int:
+    """Returns the highest applied migration version (0 for a new database)."""
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def upgrade(engine, target: int = None, progress=print) -> list:
+    """
+    Applies all pending migrations up to ``target`` (default: latest).
+
+    Args:
+        engine: Engine of the database to migrate.
+        target (int): Last version to apply.
+        progress: Callable receiving progress messages.
+
+    Returns:
+        list: Versions applied by this call.
+    """
+    applied = []
+    version = current_version(engine)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        with engine.begin() as conn:
+            after_commit = migrate(conn)
+            conn.execute(SchemaVersion.__table__.insert(), {"version": number, "description": description})
+        if callable(after_commit):
+            after_commit()
+        applied.append(number)
+        progress(f"✅ Applied migration {number}: {description}")
+    return applied
+
+
+def bootstrap(engine, progress=print) -> list:
+    """
+    Prepares a database for the app: creates missing tables, applies pending
+    migrations and seeds the superadmin with its lookup rows. Safe to re-run.
+
+    Returns:
+        list: Migration versions applied by this call.
+    """
+    Base.metadata.create_all(engine)
+    applied = upgrade(engine, progress=progress)
+    with Session(bind=engine) as session:
+        create_superadmin(session)
+    return applied
+
+
+def hot_queries():
+    """The read paths that must stay index-backed, as (name, statement) pairs."""
+    return [
+        ("user test cases", select(TestCase).where(TestCase.created_by == "superadmin")),
+        (
+            "test case grid page",
+            select(TestCase.id, TestCase.test_case_id)
+            .where(TestCase.created_by == "superadmin", TestCase.status == "Pass", TestCase.id < 1000)
+            .order_by(TestCase.id.desc())
+            .limit(51),
+        ),
+        (
+            "test case grid by case id",
+            select(TestCase.id, TestCase.test_case_id)
+            .where(TestCase.created_by == "superadmin")
+            .order_by(TestCase.test_case_id, TestCase.id)
+            .limit(51),
+        ),
+        ("user tasks", select(ToDoList).where(ToDoList.created_by == "superadmin")),
+        ("user attachments", select(Attachments).where(Attachments.created_by == "superadmin")),
+        (
+            "scenario lookup",
+            select(TestCase.test_scenario, TestCase.expected_result, TestCase.test_case_id)
+            .where(TestCase.task_id == 1)
+            .order_by(TestCase.test_case_id),
+        ),
+        (
+            "scenario number",
+            select(TestCase.ts_number)
+            .where(TestCase.task_id == 1, TestCase.scenario_key == "Login", TestCase.ts_number.isnot(None))
+            .limit(1),
+        ),
+        (
+            "next TC# seed",
+            select(func.max(TestCase.tc_number)).where(TestCase.task_id == 1, TestCase.ts_number == 1),
+        ),
+        (
+            "modification log page",
+            select(ModifiedLog.id, ModifiedLog.modified_at)
+            .where(ModifiedLog.modified_by == "superadmin")
+            .order_by(ModifiedLog.modified_at.desc(), ModifiedLog.id.desc())
+            .limit(51),
+        ),
+        (
+            "deletion log by task",
+            select(func.count()).select_from(DeletedLog).where(DeletedLog.tasks_assigned == "1"),
+        ),
+        (
+            "log time range",
+            select(CreationLog.id)
+            .where(CreationLog.created_at >= "2025-01-01", CreationLog.created_at < "2025-02-01")
+            .order_by(CreationLog.created_at.desc(), CreationLog.id.desc())
+            .limit(51),
+        ),
+        (
+            "dashboard task rollup",
+            select(ToDoList.status, ToDoList.priority, ToDoList.severity, ToDoList.project, func.count())
+            .group_by(ToDoList.status, ToDoList.priority, ToDoList.severity, ToDoList.project),
+        ),
+        (
+            "dashboard test case rollup",
+            select(TestCase.task_id, TestCase.build_version, TestCase.status, func.count())
+            .group_by(TestCase.task_id, TestCase.build_version, TestCase.status),
+        ),
+        (
+            "dashboard task projects",
+            select(ToDoList.project, TestCase.task_id)
+            .join(TestCase, ToDoList.tasks_assigned == TestCase.task_id)
+            .distinct(),
+        ),
+        (
+            "sequence audit",
+            select(TestCodeGeneration.code_number, TestCodeGeneration.created_by).order_by(TestCodeGeneration.code_number),
+        ),
+    ]
+
+
+# Any SCAN reads every row; only one served entirely from a covering index is cheap enough
+_FULL_SCAN = re.compile(r"^SCAN (?!.*USING COVERING INDEX)")
+
+
+def check_query_plans(engine) -> list:
+    """
+    Runs EXPLAIN QUERY PLAN for every hot query (SQLite only).
+
+    Returns:
+        list: (name, plan lines, ok) per query; ok is False when a table is scanned other than through a covering index.
+    """
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError("⚠️ EXPLAIN QUERY PLAN checks are only available for SQLite.")
+
+    results = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries():
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            ok = not any(_FULL_SCAN.match(line) for line in plan)
+            results.append((name, plan, ok))
+    return results
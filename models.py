@@ -1,25 +1,26 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Float
+from sqlalchemy import func, insert, Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, scoped_session
+from sqlalchemy.orm import relationship, Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import UserMixin
 from sqlalchemy.exc import IntegrityError, OperationalError
-from wtforms.validators import DataRequired, Length
-from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SelectField, SubmitField
+from contextlib import contextmanager
 from functools import wraps
-from flask import session, flash, redirect, url_for, render_template
+from database import SessionLocal
+from bisect import bisect_left, bisect_right
+import atexit
+import json
+import os
+import random
+import socket
+import threading
+import time
 
 defaultCode = "00001"
 defaultId = 1
 
 
-DATABASE_URL = 'sqlite:///dataQatables.db'
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = scoped_session(sessionmaker(bind=engine))
-db_session = SessionLocal()
+db_session = SessionLocal  # Thread-local session proxy
 Base = declarative_base()
 
 
@@ -35,6 +36,11 @@ class TestCodeGeneration(Base):
 
     user = relationship("User", back_populates="test_codes")
 
+    __table_args__ = (
+        # Codes are zero-padded, so text order is number order; covers the sequence audit's scan
+        Index("ix_test_code_generation_code_number", "code_number", "created_by"),
+    )
+
 class Counter(Base):
     __tablename__ = "counter"
     
@@ -42,40 +48,462 @@ class Counter(Base):
     last_code = Column(String(6), nullable=False, default="000000")
 
 
-def validate_sequence(db_session, code_id: int):
+class SequenceState(Base):
+    __tablename__ = "sequence_state"
+
+    id = Column(Integer, primary_key=True)
+    high_water_mark = Column(Integer, nullable=False, default=0)
+    allocated_ranges = Column(Text, nullable=False, default="[]")  # JSON list of [start, end] pairs
+    leased_ranges = Column(Text, nullable=False, default="[]")  # Codes of CodeLease blocks not released yet
+    duplicate_count = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0)  # Bumped by every writer that claims the row
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CodeLease(Base):
+    __tablename__ = "code_lease"
+
+    id = Column(Integer, primary_key=True)
+    start_code = Column(Integer, nullable=False, index=True)
+    end_code = Column(Integer, nullable=False)
+    leased_by = Column(String(100), nullable=False)  # host:pid of the allocating process
+    leased_at = Column(DateTime, default=datetime.utcnow)
+    last_used = Column(Integer, nullable=True)  # Last code handed out, set when the lease is released
+    released_at = Column(DateTime, nullable=True)
+
+
+class CodeIntervalSet:
     """
-    Validates the sequence of codes in the TestCodeGeneration table and updates qa_status.
-    
+    Sorted, non-overlapping [start, end] ranges of code numbers.
+
+    A gap-free sequence is a single range, so the stored state stays tiny and
+    membership checks and inserts are O(log N) in the number of ranges.
+    """
+
+    def __init__(self, ranges=None):
+        self.starts = []
+        self.ends = []
+        for start, end in ranges or []:
+            self.add_range(start, end)
+
+    def __contains__(self, number):
+        i = bisect_right(self.starts, number) - 1
+        return i >= 0 and number <= self.ends[i]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add_range(self, start: int, end: int) -> int:
+        """
+        Adds [start, end] to the set, merging touching ranges.
+
+        Returns:
+            int: How many of the added numbers were already present.
+        """
+        i = bisect_left(self.ends, start - 1)
+        j = bisect_right(self.starts, end + 1)
+
+        overlap = 0
+        for k in range(i, j):
+            lo, hi = max(start, self.starts[k]), min(end, self.ends[k])
+            if hi >= lo:
+                overlap += hi - lo + 1
+
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+        return overlap
+
+    def remove_range(self, start: int, end: int):
+        """Removes [start, end] from the set, trimming or splitting the ranges it cuts."""
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i >= j:
+            return
+        starts, ends = [], []
+        if self.starts[i] < start:
+            starts.append(self.starts[i])
+            ends.append(start - 1)
+        if self.ends[j - 1] > end:
+            starts.append(end + 1)
+            ends.append(self.ends[j - 1])
+        self.starts[i:j] = starts
+        self.ends[i:j] = ends
+
+    def add(self, number: int) -> bool:
+        """Adds a single number; returns False if it was already present."""
+        return self.add_range(number, number) == 0
+
+    def covers(self, start: int, end: int) -> bool:
+        """True if every number in [start, end] is in the set."""
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and end <= self.ends[i]
+
+    def is_contiguous_from_one(self) -> bool:
+        return not self.starts or (len(self.starts) == 1 and self.starts[0] == 1)
+
+    def gaps(self, upto: int):
+        """Yields the missing (start, end) ranges in [1, upto]."""
+        expected = 1
+        for start, end in zip(self.starts, self.ends):
+            if start > upto:
+                break
+            if start > expected:
+                yield expected, start - 1
+            expected = max(expected, end + 1)
+        if expected <= upto:
+            yield expected, upto
+
+    def to_json(self) -> str:
+        return json.dumps([[s, e] for s, e in zip(self.starts, self.ends)], separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw):
+        ranges = cls()
+        for start, end in json.loads(raw or "[]"):
+            ranges.starts.append(start)
+            ranges.ends.append(end)
+        return ranges
+
+
+def _sequence_qa_status(allocated, leased, high_water_mark: int, duplicate_count: int) -> str:
+    """
+    A sequence passes QA when it has no duplicates and every gap from 1 to the
+    high-water mark is covered by an open lease (codes a running allocator may
+    still hand out). Codes that were issued but never written, and the unused
+    tail of a released lease, are gaps.
+    """
+    if duplicate_count:
+        return "False"
+    if allocated.is_contiguous_from_one():
+        return "True"
+    return "True" if all(leased.covers(s, e) for s, e in allocated.gaps(high_water_mark)) else "False"
+
+
+def _claim_sequence_state(db_session):
+    """
+    Takes the write lock on the sequence state row before reading it, so
+    concurrent writers queue on the database lock instead of overwriting each
+    other. Does not commit.
+
+    Returns:
+        SequenceState | None: The locked state, or None if it does not exist yet.
+    """
+    claimed = db_session.query(SequenceState).filter(SequenceState.id == 1).update(
+        {"version": SequenceState.version + 1}, synchronize_session=False
+    )
+    if not claimed:
+        return None
+    return db_session.query(SequenceState).populate_existing().filter(SequenceState.id == 1).first()
+
+
+def _save_sequence_state(db_session, allocated, leased, high_water_mark, duplicate_count):
+    """Writes the claimed sequence state back. Does not commit."""
+    db_session.query(SequenceState).filter(SequenceState.id == 1).update(
+        {
+            "high_water_mark": high_water_mark,
+            "allocated_ranges": allocated.to_json(),
+            "leased_ranges": leased.to_json(),
+            "duplicate_count": duplicate_count,
+            "updated_at": datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+
+
+def _load_sequence_state(db_session):
+    """Claims the stored SequenceState, seeding it from a full scan on first use."""
+    state = _claim_sequence_state(db_session)
+    if state is None:
+        rebuild_sequence_state(db_session)
+        state = _claim_sequence_state(db_session)
+    return state
+
+
+def _record_lease(db_session, start: int, last_used: int, end: int):
+    """
+    Merges the codes written from the released lease [start, end] into the
+    sequence state and drops the lease from the open ones: one state write per
+    lease, not per code. Codes up to ``last_used`` without a row (failed
+    inserts) and the unused tail after it stay gaps. Does not commit.
+    """
+    state = _load_sequence_state(db_session)
+    allocated = CodeIntervalSet.from_json(state.allocated_ranges)
+    leased = CodeIntervalSet.from_json(state.leased_ranges)
+    duplicate_count, high_water_mark = state.duplicate_count, state.high_water_mark
+
+    runs = []  # Consecutive written codes as [start, end], merged with one add_range each
+    if last_used >= start:
+        written = (
+            db_session.query(TestCodeGeneration.code_number, func.count())
+            .filter(TestCodeGeneration.code_number.between(f"{start:06}", f"{last_used:06}"))
+            .group_by(TestCodeGeneration.code_number)
+            .order_by(TestCodeGeneration.code_number)
+        )
+        for code_number, count in written:
+            number = int(code_number)
+            duplicate_count += count - 1
+            if runs and runs[-1][1] == number - 1:
+                runs[-1][1] = number
+            else:
+                runs.append([number, number])
+    for run_start, run_end in runs:
+        duplicate_count += allocated.add_range(run_start, run_end)
+        high_water_mark = max(high_water_mark, run_end)
+    leased.remove_range(start, end)
+
+    _save_sequence_state(db_session, allocated, leased, high_water_mark, duplicate_count)
+
+
+_qa_status_cache = {}  # (database, state version) -> qa_status; one entry per database
+
+
+def current_qa_status(db_session) -> str:
+    """
+    QA status of the stored sequence, for the codes being written now.
+
+    Reads the state without writing it. The status is only recomputed when
+    the state's version changed, which happens once per lease, not per code.
+    """
+    version = db_session.query(SequenceState.version).filter(SequenceState.id == 1).scalar()
+    if version is None:
+        return rebuild_sequence_state(db_session)["qa_status"]
+
+    database = str(db_session.get_bind().url)
+    status = _qa_status_cache.get((database, version))
+    if status is None:
+        state = db_session.query(SequenceState).filter(SequenceState.id == 1).first()
+        status = _sequence_qa_status(
+            CodeIntervalSet.from_json(state.allocated_ranges),
+            CodeIntervalSet.from_json(state.leased_ranges),
+            state.high_water_mark,
+            state.duplicate_count,
+        )
+        for key in [key for key in _qa_status_cache if key[0] == database]:
+            del _qa_status_cache[key]
+        _qa_status_cache[(database, state.version)] = status
+    return status
+
+
+def rebuild_sequence_state(db_session, chunk_size: int = 10000) -> dict:
+    """
+    Rebuilds the sequence state from a full scan of TestCodeGeneration and
+    the open CodeLease rows, and compares it with the stored state.
+
     Args:
         db_session: SQLAlchemy database session.
-        code_id (int): ID of the newly inserted code.
+        chunk_size (int): Rows fetched per round-trip while streaming codes.
+
+    Returns:
+        dict: The rebuilt state and whether it matched what was stored.
     """
-    # Fetch all codes from the TestCodeGeneration table
-    codes = db_session.query(TestCodeGeneration.code_number).order_by(TestCodeGeneration.code_number).all()
-    code_list = [int(code[0]) for code in codes]
-    
-    # Check for duplicates
-    has_duplicates = len(code_list) != len(set(code_list))
-    
-    # Check for missing codes
-    expected_codes = set(range(1, max(code_list) + 1)) if code_list else set()
-    missing_codes = expected_codes - set(code_list)
-    
-    # Determine qa_status
-    if has_duplicates or missing_codes:
-        qa_status = "False"
-    else:
-        qa_status = "True"
-    
-    # Update the qa_status for the newly inserted code
-    db_session.query(TestCodeGeneration).filter(TestCodeGeneration.id == code_id).update({"qa_status": qa_status})
+    state = _claim_sequence_state(db_session)
+    if state is None:
+        try:
+            db_session.add(SequenceState(id=1, version=1))
+            db_session.flush()
+        except IntegrityError:
+            # Another process seeded it first
+            db_session.rollback()
+            state = _claim_sequence_state(db_session)
+
+    allocated = CodeIntervalSet()
+    duplicate_count = 0
+    high_water_mark = 0
+
+    for (code_number,) in db_session.query(TestCodeGeneration.code_number).yield_per(chunk_size):
+        number = int(code_number)
+        if not allocated.add(number):
+            duplicate_count += 1
+        high_water_mark = max(high_water_mark, number)
+
+    # Only leases still open can explain a gap; released ones have reported what they used
+    leased = CodeIntervalSet()
+    open_leases = db_session.query(CodeLease.start_code, CodeLease.end_code).filter(CodeLease.released_at.is_(None))
+    for start, end in open_leases.yield_per(chunk_size):
+        leased.add_range(start, end)
+
+    matches_stored = bool(
+        state
+        and state.high_water_mark == high_water_mark
+        and state.duplicate_count == duplicate_count
+        and state.allocated_ranges == allocated.to_json()
+        and state.leased_ranges == leased.to_json()
+    )
+
+    _save_sequence_state(db_session, allocated, leased, high_water_mark, duplicate_count)
     db_session.commit()
 
-# Modify the generate_sequential_code function
+    return {
+        "high_water_mark": high_water_mark,
+        "duplicate_count": duplicate_count,
+        "ranges": len(allocated),
+        "missing_ranges": list(allocated.gaps(high_water_mark)),
+        "pending_ranges": [gap for gap in allocated.gaps(high_water_mark) if leased.covers(*gap)],
+        "qa_status": _sequence_qa_status(allocated, leased, high_water_mark, duplicate_count),
+        "matches_stored": matches_stored,
+    }
+
+
+class _Lease:
+    """A leased block [start, end]; ``next`` is the next code to hand out."""
+
+    def __init__(self, lease_id: int, start: int, end: int, bind):
+        self.id = lease_id
+        self.start = start
+        self.end = end
+        self.next = start
+        self.bind = bind
+        self.in_flight = 0  # Codes handed out whose insert has not finished yet
+
+
+class CodeAllocator:
+    """
+    Block-leased (hi-lo) code allocator.
+
+    Reserves ``block_size`` codes at a time with a single compare-and-swap UPDATE
+    of the counter row and hands them out from memory, so most codes cost no
+    counter write at all. Every lease is recorded in CodeLease and stays open
+    in the sequence state until it is released: when it is used up and its
+    last insert has finished, or at process exit. The release records the
+    codes actually written from it in one state update, so failed inserts and
+    unused codes show up as gaps.
+    """
+
+    def __init__(self, block_size: int = 50, max_retries: int = 10):
+        self.block_size = block_size
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._current = None  # Lease codes are handed out from
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _lease_block(self, bind, size: int) -> _Lease:
+        """Reserves the next ``size`` codes in its own short transaction."""
+        session = Session(bind=bind)
+        try:
+            for attempt in range(self.max_retries):
+                try:
+                    state = _load_sequence_state(session)
+                    counter = session.query(Counter).populate_existing().first()
+                    if not counter:
+                        session.add(Counter(last_code="000000"))
+                        session.commit()
+                        continue
+
+                    start = int(counter.last_code) + 1
+                    end = start + size - 1
+
+                    # Atomic compare-and-swap: only one process can move the counter from last_code.
+                    updated = (
+                        session.query(Counter)
+                        .filter(Counter.id == counter.id, Counter.last_code == counter.last_code)
+                        .update({"last_code": f"{end:06}"}, synchronize_session=False)
+                    )
+                    if updated != 1:
+                        session.rollback()
+                        continue
+
+                    lease = CodeLease(start_code=start, end_code=end, leased_by=self._owner())
+                    session.add(lease)
+
+                    leased = CodeIntervalSet.from_json(state.leased_ranges)
+                    leased.add_range(start, end)
+                    _save_sequence_state(
+                        session,
+                        CodeIntervalSet.from_json(state.allocated_ranges),
+                        leased,
+                        state.high_water_mark,
+                        state.duplicate_count,
+                    )
+
+                    session.commit()
+                    return _Lease(lease.id, start, end, bind)
+                except OperationalError:
+                    session.rollback()
+                    print(f"Database is locked. Retrying lease ({attempt + 1}/{self.max_retries})...")
+                    time.sleep(random.uniform(0.05, 0.15))
+        finally:
+            session.close()
+        raise OperationalError("Failed to lease a code block after maximum retries.", None, None)
+
+    def _release_locked(self, lease: _Lease):
+        """Closes the lease and records the codes written from it. Caller holds the lock."""
+        session = Session(bind=lease.bind)
+        try:
+            session.query(CodeLease).filter(CodeLease.id == lease.id).update(
+                {"last_used": lease.next - 1, "released_at": datetime.utcnow()},
+                synchronize_session=False,
+            )
+            if session.query(SequenceState.id).first() is None:
+                rebuild_sequence_state(session)  # Seeds the state, this lease included
+            else:
+                _record_lease(session, lease.start, lease.next - 1, lease.end)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error releasing code lease {lease.id}: {e}")
+        finally:
+            session.close()
+
+    @contextmanager
+    def issue(self, db_session, count: int = 1):
+        """
+        Hands out ``count`` contiguous codes for the caller to write, leasing a
+        new block when the current one cannot satisfy the request. The lease is
+        released only after every ``issue`` block using it has exited, so its
+        codes are recorded once their inserts committed (or failed).
+
+        Yields:
+            range: The issued code numbers.
+        """
+        bind = db_session.get_bind()
+        with self._lock:
+            lease = self._current
+            if lease is not None and (lease.bind is not bind or lease.end - lease.next + 1 < count):
+                self._retire_locked()
+                lease = None
+            if lease is None:
+                lease = self._current = self._lease_block(bind, max(self.block_size, count))
+            codes = range(lease.next, lease.next + count)
+            lease.next += count
+            lease.in_flight += 1
+        try:
+            yield codes
+        finally:
+            with self._lock:
+                lease.in_flight -= 1
+                if lease is not self._current and lease.in_flight == 0:
+                    self._release_locked(lease)
+
+    def _retire_locked(self):
+        """Stops handing out the current lease; released now unless inserts from it are in flight."""
+        lease, self._current = self._current, None
+        if lease is not None and lease.in_flight == 0:
+            self._release_locked(lease)
+
+    def release(self):
+        """Returns the unused tail of the current lease (called at process exit)."""
+        with self._lock:
+            self._retire_locked()
+
+
+code_allocator = CodeAllocator(block_size=int(os.getenv("CODE_BLOCK_SIZE", "50")))
+atexit.register(code_allocator.release)
+
+
 def generate_sequential_code(db_session, created_by: str, max_retries: int = 5) -> str:
     """
     Generates a sequential 6-digit numeric code, logs it in TestCodeGeneration table,
     and validates the sequence.
+
+    The code comes from the process-wide block allocator. Its qa_status is read
+    from the sequence state without writing it; the code itself is merged into
+    the state when its lease is released.
     
     Args:
         db_session: SQLAlchemy database session.
@@ -85,55 +513,85 @@ def generate_sequential_code(db_session, created_by: str, max_retries: int = 5)
     Returns:
         str: A 6-digit code as a string (e.g., "000001", "000002").
     """
-    retries = 0
-    while retries < max_retries:
-        try:
-            # Fetch or create the counter record
-            counter = db_session.query(Counter).first()
-            if not counter:
-                counter = Counter(last_code="000000")
-                db_session.add(counter)
+    with code_allocator.issue(db_session) as codes:
+        next_code_str = f"{codes[0]:06}"
+
+        retries = 0
+        while retries < max_retries:
+            try:
+                # Log the generated code in TestCodeGeneration table
+                db_session.add(TestCodeGeneration(
+                    created_by=created_by,
+                    code_number=next_code_str,
+                    qa_status=current_qa_status(db_session)
+                ))
                 db_session.commit()
-            
-            # Increment the last code
-            next_code = int(counter.last_code) + 1
-            
-            # Format the code as a 6-digit string with leading zeros
-            next_code_str = f"{next_code:06}"
-            
-            # Log the generated code in TestCodeGeneration table
-            test_code = TestCodeGeneration(
-                created_by=created_by,
-                code_number=next_code_str,
-                qa_status="Pending"  # Default status
-            )
-            db_session.add(test_code)
-            db_session.commit()
-            
-            # Update the counter
-            counter.last_code = next_code_str
-            db_session.commit()
-            
-            # Validate the sequence and update qa_status
-            validate_sequence(db_session, test_code.id)
-            
-            return next_code_str
-        except OperationalError as e:
-            retries += 1
-            print(f"Database is locked. Retrying ({retries}/{max_retries})...")
-            time.sleep(0.1)  # Wait for 100ms before retrying
-        except Exception as e:
-            print(f"Error generating code: {e}")
-            raise
-    raise OperationalError("Failed to generate code after maximum retries.")
+
+                return next_code_str
+            except OperationalError as e:
+                db_session.rollback()
+                retries += 1
+                print(f"Database is locked. Retrying ({retries}/{max_retries})...")
+                time.sleep(0.1)  # Wait for 100ms before retrying
+            except Exception as e:
+                db_session.rollback()
+                print(f"Error generating code: {e}")
+                raise
+        raise OperationalError("Failed to generate code after maximum retries.", None, None)
+
+
+def generate_sequential_codes(db_session, created_by: str, n: int, max_retries: int = 5) -> list:
+    """
+    Generates ``n`` contiguous sequential codes in one transaction.
+
+    The codes are reserved from the block allocator in one step and all
+    TestCodeGeneration rows are written with a single executemany; like
+    single codes, they reach the sequence state when their lease is released.
+
+    Args:
+        db_session: SQLAlchemy database session.
+        created_by (str): Username of the user generating the codes.
+        n (int): Number of codes to generate.
+        max_retries (int): Maximum number of retries if the database is locked.
+
+    Returns:
+        list: The 6-digit codes as strings, in order.
+    """
+    if n <= 0:
+        return []
+
+    with code_allocator.issue(db_session, n) as codes:
+        code_strs = [f"{code:06}" for code in codes]
+
+        retries = 0
+        while retries < max_retries:
+            try:
+                qa_status = current_qa_status(db_session)
+                db_session.execute(
+                    insert(TestCodeGeneration),
+                    [{"created_by": created_by, "code_number": code, "qa_status": qa_status} for code in code_strs],
+                )
+                db_session.commit()
+                return code_strs
+            except OperationalError as e:
+                db_session.rollback()
+                retries += 1
+                print(f"Database is locked. Retrying ({retries}/{max_retries})...")
+                time.sleep(0.1)  # Wait for 100ms before retrying
+            except Exception as e:
+                db_session.rollback()
+                print(f"Error generating codes: {e}")
+                raise
+        raise OperationalError("Failed to generate codes after maximum retries.", None, None)
 
 
 def update_counter(next_code_str):
     """
     Updates the counter only when the form submission is successful.
+    The counter never moves backwards, so leased blocks are not handed out twice.
     """
     counter = db_session.query(Counter).first()
-    if counter:
+    if counter and int(next_code_str) > int(counter.last_code):
         counter.last_code = next_code_str
         db_session.commit()
 
@@ -247,6 +705,11 @@ class CreationLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Added index
     changes = Column(Text, nullable=False)
 
+    __table_args__ = (
+        Index("ix_creation_log_user_time", "created_by", "created_at"),  # Log viewer filters, newest first
+        Index("ix_creation_log_task_time", "tasks_assigned", "created_at"),
+    )
+
 class ModifiedLog(Base):
     __tablename__ = 'modified_log'
     id = Column(Integer, primary_key=True)
@@ -256,6 +719,11 @@ class ModifiedLog(Base):
     modified_at = Column(DateTime, default=datetime.utcnow, index=True)  # Added default and index
     changes = Column(Text, nullable=False)
 
+    __table_args__ = (
+        Index("ix_modified_log_user_time", "modified_by", "modified_at"),  # Log viewer filters, newest first
+        Index("ix_modified_log_task_time", "tasks_assigned", "modified_at"),
+    )
+
 class DeletedLog(Base):
     __tablename__ = 'deleted_log'
     id = Column(Integer, primary_key=True)
@@ -265,6 +733,11 @@ class DeletedLog(Base):
     deleted_at = Column(DateTime, default=datetime.utcnow, index=True)  # Added index
     changes = Column(Text, nullable=False)
 
+    __table_args__ = (
+        Index("ix_deleted_log_user_time", "deleted_by", "deleted_at"),  # Log viewer filters, newest first
+        Index("ix_deleted_log_task_time", "tasks_assigned", "deleted_at"),
+    )
+
 class ToDoList(Base):
     __tablename__ = 'to_do_list'
     
@@ -293,6 +766,12 @@ class ToDoList(Base):
     # Rename relationship to avoid conflict
     test_case_list = relationship("TestCase", back_populates="task", cascade="all, delete")
 
+    __table_args__ = (
+        Index("ix_to_do_list_created_by", "created_by"),
+        Index("ix_to_do_list_project", "project", "tasks_assigned"),  # Project filter/group + join to test cases
+        Index("ix_to_do_list_rollup", "status", "priority", "severity", "project"),  # Dashboard rollup, index-only
+    )
+
 
 
 class TestCase(Base):
@@ -316,12 +795,41 @@ class TestCase(Base):
     task_id = Column(Integer, ForeignKey("to_do_list.id", ondelete="CASCADE"), nullable=False)
     build_version = Column(String, nullable=True)
 
+    # TS#/TC# of the test_case_id and the scenario they number (see numbering.py)
+    ts_number = Column(Integer, nullable=True)
+    tc_number = Column(Integer, nullable=True)
+    scenario_key = Column(String, nullable=True)
+
     created_by = Column(String, ForeignKey("user.username", ondelete="SET NULL"), nullable=False)
 
     # Relationships
     attachments = relationship("Attachments", back_populates="test_case_rel", cascade="all, delete-orphan")
     task = relationship("ToDoList", back_populates="test_case_list")
 
+    __table_args__ = (
+        Index("ix_test_management_task_id", "task_id", "test_case_id"),  # Scenario lookup, ordered by case id
+        Index("ix_test_management_created_by", "created_by"),  # (created_by, id): user's rows in id order
+        Index("ix_test_management_owner_status", "created_by", "status"),  # Paged grid filters/sorts
+        Index("ix_test_management_owner_task", "created_by", "task_id"),
+        Index("ix_test_management_owner_case", "created_by", "test_case_id"),
+        Index("ix_test_management_build_status", "build_version", "status"),
+        Index("ix_test_management_status", "status"),
+        Index("ix_test_management_scenario", "task_id", "scenario_key", "ts_number", "tc_number"),
+        Index("ix_test_management_rollup", "task_id", "build_version", "status"),  # Dashboard rollup, index only
+    )
+
+
+class TestCaseCounter(Base):
+    """
+    Last TS#/TC# handed out per task. The row with ts_number 0 counts the
+    task's scenarios (TS#); every other row counts the cases (TC#) of one scenario.
+    """
+    __tablename__ = "test_case_counter"
+
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    ts_number = Column(Integer, primary_key=True, autoincrement=False)
+    last_number = Column(Integer, nullable=False, default=0)
+
 
 
 class TaskHistory(Base):
@@ -333,10 +841,21 @@ class TaskHistory(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 
+class AttachmentBlob(Base):
+    """One stored file per content digest, shared by every attachment with the same bytes (see blob_store.py)."""
+    __tablename__ = 'attachment_blob'
+    digest = Column(String(64), primary_key=True)  # SHA-256, hex
+    size = Column(Integer, nullable=False)  # Bytes
+    ref_count = Column(Integer, nullable=False, default=0)  # Attachments rows pointing at the blob
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Attachments(Base):
     __tablename__ = 'attachments'
     id = Column(Integer, primary_key=True)
-    file_path = Column(String, nullable=False)  # Path to the uploaded file
+    file_path = Column(String, nullable=False)  # Path to the uploaded file (the blob for stored files)
+    file_name = Column(String, nullable=True)  # Name of the file as uploaded
+    blob_digest = Column(String(64), ForeignKey('attachment_blob.digest'), nullable=True)
     project = Column(String, nullable=False)  # Project name
     task_assigned = Column(String, nullable=False)  # Task assigned
     test_case_id = Column(Integer, ForeignKey('test_management.id'))  # Foreign key to TestCase
@@ -349,11 +868,28 @@ class Attachments(Base):
     # Relationships
     test_case_rel = relationship("TestCase", back_populates="attachments")
 
+    __table_args__ = (
+        Index("ix_attachments_created_by", "created_by"),
+    )
+
+
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
 
 
-def create_superadmin():
-    """Creates a Superadmin user, ensuring first values from each table are used."""
-    db = SessionLocal()
+
+def create_superadmin(db=None):
+    """
+    Creates a Superadmin user, ensuring first values from each table are used.
+    A session passed in is left open for the caller; without one, a private
+    session is opened and closed here.
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal.session_factory()  # Not the thread's shared scoped session
     
     try:
         if not db.query(User).filter_by(username="superadmin").first():
@@ -412,11 +948,6 @@ def create_superadmin():
         print(f"❌ Error creating superadmin: {e}")
 
     finally:
-        db.close()
-
-
-# --- Initialize Database ---
-Base.metadata.create_all(engine)
+        if owns_session:
+            db.close()
 
-# --- Run Superadmin Creation ---
-create_superadmin()
@@ -0,0 +1,191 @@
+"""
+TS#/TC# numbering of test cases.
+
+Test case IDs look like ``<task>-<build>-<project>-TS# 3-TC# 2-<timestamp>``:
+TS# numbers the scenarios of a task and TC# the cases of one scenario. The
+numbers and the scenario they belong to are stored in TestCase.ts_number,
+tc_number and scenario_key, so looking up a scenario is one indexed lookup
+on (task_id, scenario_key) instead of a regex over every case of the task.
+
+New numbers come from TestCaseCounter: one UPDATE ... SET last_number =
+last_number + 1 per number, which takes the row (or, on SQLite, the
+database) write lock, so concurrent sessions never get the same number.
+"""
+import re
+
+import pandas as pd
+from sqlalchemy import and_, bindparam, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import TestCase, TestCaseCounter
+
+TEST_CASE_NUMBER = re.compile(r"-TS# (\d+)-TC# (\d+)")
+
+_LOOKUP_CHUNK = 900  # IN (...) values per statement, below SQLite's bound-parameter limit
+
+
+def scenario_key(scenario):
+    """The value a scenario is matched on (surrounding whitespace ignored); None for no scenario."""
+    if scenario is None or (not isinstance(scenario, str) and pd.isna(scenario)):
+        return None
+    return str(scenario).strip()
+
+
+def parse_test_case_number(test_case_id):
+    """Returns (TS#, TC#) from a test case ID, (None, None) when it carries no numbers."""
+    match = TEST_CASE_NUMBER.search(test_case_id or "")
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+
+def parse_test_case_numbers(test_case_ids: pd.Series) -> pd.DataFrame:
+    """Vectorized parse_test_case_number: ts_number/tc_number columns (nullable Int64)."""
+    numbers = test_case_ids.astype("string").str.extract(TEST_CASE_NUMBER.pattern)
+    numbers.columns = ["ts_number", "tc_number"]
+    return numbers.astype("Int64")
+
+
+def format_test_case_id(task_id, build_version, project, ts_number, tc_number, timestamp) -> str:
+    return f"{task_id}-{build_version}-{project}-TS# {ts_number}-TC# {tc_number}-{timestamp}"
+
+
+def with_number_columns(mapping: dict) -> dict:
+    """Adds the derived number/scenario columns to a TestCase update mapping that changes their source."""
+    if "test_scenario" in mapping:
+        mapping["scenario_key"] = scenario_key(mapping["test_scenario"])
+    if "test_case_id" in mapping:
+        mapping["ts_number"], mapping["tc_number"] = parse_test_case_number(mapping["test_case_id"])
+    return mapping
+
+
+def find_case(session, task_id, scenario, expected_result):
+    """(TS#, TC#) of the task's latest case with this scenario and expected result, or None."""
+    stmt = (
+        select(TestCase.ts_number, TestCase.tc_number)
+        .where(
+            TestCase.task_id == task_id,
+            TestCase.scenario_key == scenario_key(scenario),
+            TestCase.ts_number.isnot(None),
+            func.trim(func.coalesce(TestCase.expected_result, "")) == (expected_result or "").strip(),
+        )
+        .order_by(TestCase.ts_number.desc(), TestCase.tc_number.desc())
+        .limit(1)
+    )
+    row = session.execute(stmt).first()
+    return tuple(row) if row else None
+
+
+def find_scenario_number(session, task_id, scenario):
+    """TS# of the task's scenario, or None for a new scenario."""
+    stmt = (
+        select(TestCase.ts_number)
+        .where(
+            TestCase.task_id == task_id,
+            TestCase.scenario_key == scenario_key(scenario),
+            TestCase.ts_number.isnot(None),
+        )
+        .limit(1)
+    )
+    return session.execute(stmt).scalar()
+
+
+def next_number(session, task_id, ts_number: int = 0) -> int:
+    """
+    Allocates the next TS# of a task (``ts_number`` 0) or the next TC# of
+    scenario ``ts_number``, inside the caller's transaction.
+    """
+    counter = TestCaseCounter.__table__
+    key = and_(counter.c.task_id == task_id, counter.c.ts_number == ts_number)
+    bump = update(counter).where(key).values(last_number=counter.c.last_number + 1)
+
+    if session.execute(bump).rowcount == 0:
+        # First number since the counter existed: continue after what is already stored
+        if ts_number == 0:
+            stmt = select(func.max(TestCase.ts_number)).where(TestCase.task_id == task_id)
+        else:
+            stmt = select(func.max(TestCase.tc_number)).where(
+                TestCase.task_id == task_id, TestCase.ts_number == ts_number
+            )
+        last = session.execute(stmt).scalar() or 0
+        try:
+            with session.begin_nested():
+                session.execute(insert(counter).values(task_id=task_id, ts_number=ts_number, last_number=last + 1))
+        except IntegrityError:
+            session.execute(bump)  # Another session created the row first
+
+    return session.execute(select(counter.c.last_number).where(key)).scalar()
+
+
+def assign_test_case_number(session, task_id, scenario, expected_result):
+    """
+    Numbers a case: an existing scenario and expected result keep their
+    TS#/TC#, a new expected result gets the scenario's next TC#, and a new
+    scenario gets the task's next TS# with TC# 1.
+
+    Returns:
+        tuple: (TS#, TC#, True if the scenario/expected result pair already exists)
+    """
+    existing = find_case(session, task_id, scenario, expected_result)
+    if existing:
+        return existing[0], existing[1], True
+
+    ts_number = find_scenario_number(session, task_id, scenario)
+    if ts_number is None:
+        ts_number = next_number(session, task_id)
+    return ts_number, next_number(session, task_id, ts_number), False
+
+
+def refresh_counters(conn, task_ids=None) -> int:
+    """
+    Raises the counters of ``task_ids`` (default: every task) to the highest
+    TS#/TC# stored in test_management, for rows written without next_number
+    (uploads, the backfill). Counters never go down.
+
+    Returns:
+        int: Counter rows inserted or raised.
+    """
+    counter = TestCaseCounter.__table__
+    numbered = [TestCase.ts_number > 0, TestCase.tc_number.isnot(None)]  # TS# 0 would clash with the task row
+    if task_ids is None:
+        chunks = [None]
+    else:
+        task_ids = list(task_ids)
+        chunks = [task_ids[start:start + _LOOKUP_CHUNK] for start in range(0, len(task_ids), _LOOKUP_CHUNK)]
+
+    changed = 0
+    for chunk in chunks:
+        scope = [] if chunk is None else [TestCase.task_id.in_(chunk)]
+        stored = {}
+        for task_id, ts_number, last in conn.execute(
+            select(TestCase.task_id, TestCase.ts_number, func.max(TestCase.tc_number))
+            .where(*numbered, *scope)
+            .group_by(TestCase.task_id, TestCase.ts_number)
+        ):
+            stored[(task_id, ts_number)] = last
+            stored[(task_id, 0)] = max(stored.get((task_id, 0), 0), ts_number)
+
+        counter_scope = [] if chunk is None else [counter.c.task_id.in_(chunk)]
+        current = {
+            (task_id, ts_number): last
+            for task_id, ts_number, last in conn.execute(select(counter).where(*counter_scope))
+        }
+
+        inserts = [
+            {"task_id": task_id, "ts_number": ts_number, "last_number": last}
+            for (task_id, ts_number), last in stored.items() if (task_id, ts_number) not in current
+        ]
+        raises = [
+            {"k_task_id": task_id, "k_ts_number": ts_number, "last_number": last}
+            for (task_id, ts_number), last in stored.items()
+            if (task_id, ts_number) in current and current[(task_id, ts_number)] < last
+        ]
+        if inserts:
+            conn.execute(insert(counter), inserts)
+        if raises:
+            conn.execute(
+                update(counter).where(
+                    counter.c.task_id == bindparam("k_task_id"), counter.c.ts_number == bindparam("k_ts_number")
+                ),
+                raises,
+            )
+        changed += len(inserts) + len(raises)
+    return changed
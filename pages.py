@@ -18,62 +18,48 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, func
+from sqlalchemy import Column, Integer, String, Boolean, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session
 from models import (
     User, countryIT, cityIT, projectIT, planIT, Role, Comment, Chat, Attachments, 
     StatusCount, ModifiedLog, DeletedLog, ToDoList, TaskHistory, TestCase,
     create_superadmin, generate_password_hash, check_password_hash, generate_sequential_code
 )
+from database import SessionLocal
+from data_access import DASHBOARD_TTL, cache_stats, get_dashboard_data
 
 
-DATABASE_URL = 'sqlite:///dataQatables.db'
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = scoped_session(sessionmaker(bind=engine))
-db_session = SessionLocal()
+db_session = SessionLocal  # Thread-local session proxy; this module is imported once per process
 
 def dashboard():
-    # Dashboard data
-    def get_summary_data():
-        
-        with SessionLocal() as session:
-            project_summary = session.query(ToDoList.project, func.count(ToDoList.id)).group_by(ToDoList.project).all()
-            status_summary = session.query(ToDoList.status, func.count(ToDoList.id)).group_by(ToDoList.status).all()
-            priority_summary = session.query(ToDoList.priority, func.count(ToDoList.id)).group_by(ToDoList.priority).all()
-            severity_summary = session.query(ToDoList.severity, func.count(ToDoList.id)).group_by(ToDoList.severity).all()
-        return project_summary, status_summary, priority_summary, severity_summary
+    # Dashboard data: every rollup comes from one cached aggregation pass (data_access.get_dashboard_data)
+    def get_summary_data(rollups):
+        return (
+            rollups["project_summary"], rollups["status_summary"],
+            rollups["priority_summary"], rollups["severity_summary"],
+        )
 
     # Fetch Graph Data
-    def get_graph_data():
-        
-        with SessionLocal() as session:
-            project_test_cases = (
-                session.query(ToDoList.project, func.count(func.distinct(TestCase.id)))
-                .join(TestCase, ToDoList.tasks_assigned == TestCase.task_id)
-                .group_by(ToDoList.project)
-                .all()
-            )
-
-            status_count = (
-                session.query(TestCase.status, func.count(func.distinct(TestCase.id)))
-                .group_by(TestCase.status)
-                .all()
-            )
-
-            build_versions = (
-                session.query(TestCase.build_version, func.count(func.distinct(TestCase.id)))
-                .filter(TestCase.build_version.isnot(None))
-                .group_by(TestCase.build_version)
-                .all()
-            )
-        return project_test_cases, status_count, build_versions
+    def get_graph_data(rollups):
+        return rollups["project_test_cases"], rollups["test_case_status"], rollups["build_versions"]
     
     # 📌 **Dashboard Page**
     if st.sidebar.selectbox("Select Page:", ["Dashboard"]) == "Dashboard":
         # 🔍 **Fetch Data**
-        project_summary, status_summary, priority_summary, severity_summary = get_summary_data()
-        project_test_cases, status_count, build_versions = get_graph_data()
+        refresh = st.button("🔄 Refresh", key="dashboard_refresh")
+        data = get_dashboard_data(refresh=refresh)
+        rollups = data["rollups"]
+        project_summary, status_summary, priority_summary, severity_summary = get_summary_data(rollups)
+        project_test_cases, status_count, build_versions = get_graph_data(rollups)
+        st.caption(
+            f"⏱️ Computed in {data['compute_ms']:,.0f} ms, {data['age_seconds']:,.0f}s ago "
+            f"(refreshed after task/test case changes or every {DASHBOARD_TTL}s)"
+        )
+        stats = cache_stats()
+        st.caption(
+            f"Data cache: {stats['hits']:,} hits, {stats['misses']:,} misses ({stats['hit_ratio']:.0%} hit ratio), "
+            f"{stats['invalidations']:,} invalidations, {stats['entries']:,} entries"
+        )
 
         # 📌 **Summary Overview**
         st.header("Tasks Summary")
@@ -81,16 +67,16 @@ def dashboard():
         
         with col1:
             st.subheader("📂 Project-wise Tasks")
-            st.table(pd.DataFrame(project_summary, columns=["Project", "Total Tasks"]))
+            st.table(project_summary.set_axis(["Project", "Total Tasks"], axis=1))
         with col2:
             st.subheader("📊 Status-wise Tasks")
-            st.table(pd.DataFrame(status_summary, columns=["Status", "Total Tasks"]))
+            st.table(status_summary.set_axis(["Status", "Total Tasks"], axis=1))
         with col3:
             st.subheader("⚡ Priority-wise Tasks")
-            st.table(pd.DataFrame(priority_summary, columns=["Priority", "Total Tasks"]))
+            st.table(priority_summary.set_axis(["Priority", "Total Tasks"], axis=1))
         with col4:
             st.subheader("🚨 Severity-wise Defects")
-            st.table(pd.DataFrame(severity_summary, columns=["Severity", "Total Defects"]))
+            st.table(severity_summary.set_axis(["Severity", "Total Defects"], axis=1))
         
             
         
@@ -100,7 +86,7 @@ def dashboard():
         
         # 📌 **Graph 1: Project-wise Test Cases**
         if graph_option == "Project-wise Test Cases":
-            df = pd.DataFrame(project_test_cases, columns=["Project", "Test Case Count"])
+            df = project_test_cases.set_axis(["Project", "Test Case Count"], axis=1)
             if not df.empty:
                 fig = px.bar(df, x="Project", y="Test Case Count", title="Test Cases per Project", text="Test Case Count", color="Project")
                 fig.update_traces(textposition="outside")
@@ -110,7 +96,7 @@ def dashboard():
         
         # 📌 **Graph 2: Status-wise Test Cases**
         elif graph_option == "Status-wise Test Cases":
-            df = pd.DataFrame(status_count, columns=["Status", "Count"])
+            df = status_count.set_axis(["Status", "Count"], axis=1)
             if not df.empty:
                 color_map = {
                     "Pass": "#4CAF50",        # **Deep Green (Success)**
@@ -127,39 +113,22 @@ def dashboard():
 
         # 📌 **Graph 3: Build Version-wise Test Cases**
         elif graph_option == "Build Version-wise Analysis":
-            with SessionLocal() as session:
-                projects = [p[0] for p in session.query(ToDoList.project).distinct().all()]
-            selected_project = st.selectbox("Select Project:", projects)
-
-            with SessionLocal() as session:
-                build_versions = [
-                    b[0] for b in session.query(TestCase.build_version)
-                    .join(ToDoList, TestCase.task_id == ToDoList.tasks_assigned)
-                    .filter(ToDoList.project == selected_project)
-                    .distinct()
-                    .all()
-                ]
+            selected_project = st.selectbox("Select Project:", rollups["projects"])
+
+            project_builds = rollups["project_builds"]
+            project_builds = project_builds[
+                (project_builds["project"] == selected_project) & project_builds["build_version"].notna()
+            ]
+            build_versions = project_builds["build_version"].drop_duplicates().tolist()
 
             if build_versions:
                 selected_version = st.multiselect("Select Build Version(s):", build_versions, default=build_versions)
 
                 if selected_version:
-                    with SessionLocal() as session:
-                        version_data = (
-                            session.query(
-                                TestCase.build_version,
-                                TestCase.status,
-                                func.count(func.distinct(TestCase.id)).label("Test Case Count")
-                            )
-                            .join(ToDoList, ToDoList.tasks_assigned == TestCase.task_id)
-                            .filter(ToDoList.project == selected_project)
-                            .filter(TestCase.build_version.in_(selected_version))
-                            .group_by(TestCase.build_version, TestCase.status)
-                            .order_by(TestCase.build_version)
-                            .all()
-                        )
-
-                    df = pd.DataFrame(version_data, columns=["Build Version", "Status", "Test Case Count"])
+                    version_data = project_builds[project_builds["build_version"].isin(selected_version)]
+                    df = version_data[["build_version", "status", "count"]].set_axis(
+                        ["Build Version", "Status", "Test Case Count"], axis=1
+                    )
 
                     if not df.empty:
                         # 🎨 **Professional Color Palette**
@@ -0,0 +1,223 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from database import SessionLocal
+from models import TestCodeGeneration, CodeLease
+
+
+def _load_leases(db_session):
+    """(start, end, last_used) for every lease, ordered by start code.
+    last_used is None while the lease has not been released."""
+    query = (
+        db_session.query(CodeLease.start_code, CodeLease.end_code, CodeLease.last_used, CodeLease.released_at)
+        .order_by(CodeLease.start_code)
+    )
+    return [(start, end, last_used if released_at is not None else None) for start, end, last_used, released_at in query]
+
+
+def _split_gap(start, end, leases, current):
+    """
+    Splits the missing range [start, end] at lease boundaries and labels each part.
+
+    ``leases`` is the ordered lease iterator and ``current`` the lease it is
+    positioned on; both advance together with the (ordered) gaps.
+
+    Returns:
+        tuple: (list of gap dicts, the lease the iterator is now positioned on)
+    """
+    parts = []
+    while start <= end:
+        while current is not None and current[1] < start:
+            current = next(leases, None)
+
+        if current is None or current[0] > end:
+            parts.append({"start": start, "length": end - start + 1, "status": "not leased"})
+            break
+        if current[0] > start:
+            parts.append({"start": start, "length": current[0] - start, "status": "not leased"})
+            start = current[0]
+
+        part_end = min(end, current[1])
+        last_used = current[2]
+        if last_used is None:
+            parts.append({"start": start, "length": part_end - start + 1, "status": "leased, pending"})
+        else:
+            if start <= last_used:
+                # Handed out by the allocator but no row exists (deleted or failed insert)
+                used_end = min(part_end, last_used)
+                parts.append({"start": start, "length": used_end - start + 1, "status": "allocated, missing"})
+                start = used_end + 1
+            if start <= part_end:
+                parts.append({"start": start, "length": part_end - start + 1, "status": "leased, unused"})
+        start = part_end + 1
+    return parts, current
+
+
+def _allocation_rate(db_session, chunk_size, bucket, last_code):
+    """
+    Codes leased and used per time bucket, from the lease history. Open leases
+    count the codes issued so far: up to ``last_code``, the highest code in the table.
+    """
+    rates = {}
+    query = (
+        db_session.query(CodeLease.leased_at, CodeLease.start_code, CodeLease.end_code, CodeLease.last_used)
+        .order_by(CodeLease.leased_at)
+        .yield_per(chunk_size)
+    )
+    for leased_at, start, end, last_used in query:
+        if leased_at is None:
+            continue
+        if bucket == "day":
+            period = leased_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        else:
+            period = leased_at.replace(minute=0, second=0, microsecond=0)
+
+        row = rates.setdefault(period, {"period": period, "leases": 0, "codes_leased": 0, "codes_used": 0})
+        row["leases"] += 1
+        row["codes_leased"] += end - start + 1
+        if last_used is None:
+            # Not released yet: only codes up to the highest one written can have been issued
+            last_used = min(end, last_code) if last_code is not None else start - 1
+        row["codes_used"] += max(last_used - start + 1, 0)
+    return list(rates.values())
+
+
+def audit_sequence(db_session, chunk_size: int = 10000, bucket: str = "hour") -> dict:
+    """
+    Streams test_code_generation ordered by code number and reports the gaps,
+    duplicates and allocation rate of the code sequence.
+
+    Only the previous code and its creators are kept while streaming, so memory
+    use does not depend on the table size. The lease history (one row per
+    block of codes) is read into memory first, so only one result set is open
+    on the connection at a time. Gaps are reported as run-length intervals and
+    labelled against the leases.
+
+    Args:
+        db_session: SQLAlchemy database session.
+        chunk_size (int): Rows fetched per round-trip.
+        bucket (str): "hour" or "day" for the allocation rate.
+
+    Returns:
+        dict: Summary counts plus "missing", "duplicates" and "allocation_rate" lists.
+    """
+    leases = iter(_load_leases(db_session))
+    current_lease = next(leases, None)
+
+    # code_number is zero-padded, so its text order is number order and the scan follows its index
+    codes = (
+        db_session.query(TestCodeGeneration.code_number, TestCodeGeneration.created_by)
+        .order_by(TestCodeGeneration.code_number)
+        .yield_per(chunk_size)
+    )
+
+    total = distinct = 0
+    first_code = previous = None
+    creators = []
+    missing, duplicates = [], []
+
+    def flush_duplicate():
+        if len(creators) > 1:
+            duplicates.append({
+                "code_number": f"{previous:06}",
+                "count": len(creators),
+                "created_by": ", ".join(sorted(set(creators))),
+            })
+
+    for code_number, created_by in codes:
+        number = int(code_number)
+        total += 1
+        if number == previous:
+            creators.append(created_by)
+            continue
+
+        flush_duplicate()
+        expected = 1 if previous is None else previous + 1
+        if number > expected:
+            parts, current_lease = _split_gap(expected, number - 1, leases, current_lease)
+            missing.extend(parts)
+
+        if first_code is None:
+            first_code = number
+        distinct += 1
+        previous = number
+        creators = [created_by]
+    flush_duplicate()
+
+    return {
+        "generated_at": datetime.utcnow(),
+        "total_codes": total,
+        "distinct_codes": distinct,
+        "first_code": first_code,
+        "last_code": previous,
+        "missing_codes": sum(gap["length"] for gap in missing),
+        "missing": missing,
+        "duplicates": duplicates,
+        "allocation_rate": _allocation_rate(db_session, chunk_size, bucket, previous),
+    }
+
+
+def report_to_json(report: dict) -> str:
+    return json.dumps(report, default=str, indent=2)
+
+
+def sequence_audit_page():
+    """Runs the sequence audit on demand and shows/exports the results."""
+    st.subheader("🔢 Code Sequence Audit")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        bucket = st.selectbox("Allocation rate per", ["hour", "day"])
+    with col2:
+        chunk_size = st.number_input("Rows per fetch", min_value=1000, max_value=100000, value=10000, step=1000)
+
+    if st.button("▶️ Run Audit"):
+        with SessionLocal.session_factory() as session:
+            st.session_state.sequence_audit = audit_sequence(session, chunk_size=int(chunk_size), bucket=bucket)
+
+    report = st.session_state.get("sequence_audit")
+    if not report:
+        st.info("Run the audit to scan the code sequence.")
+        return
+
+    st.caption(f"Generated at {report['generated_at']:%Y-%m-%d %H:%M:%S} UTC")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Codes", report["total_codes"])
+    col2.metric("Distinct Codes", report["distinct_codes"])
+    col3.metric("Missing Codes", report["missing_codes"])
+    col4.metric("Duplicated Codes", len(report["duplicates"]))
+
+    missing_df = pd.DataFrame(report["missing"], columns=["start", "length", "status"])
+    if not missing_df.empty:
+        missing_df["start"] = missing_df["start"].map(lambda x: f"{x:06}")
+    duplicates_df = pd.DataFrame(report["duplicates"], columns=["code_number", "count", "created_by"])
+    rate_df = pd.DataFrame(report["allocation_rate"], columns=["period", "leases", "codes_leased", "codes_used"])
+
+    st.markdown("### Missing Ranges")
+    if missing_df.empty:
+        st.success("✅ No gaps in the sequence.")
+    else:
+        st.dataframe(missing_df, hide_index=True)
+
+    st.markdown("### Duplicate Codes")
+    if duplicates_df.empty:
+        st.success("✅ No duplicate codes.")
+    else:
+        st.dataframe(duplicates_df, hide_index=True)
+
+    st.markdown("### Allocation Rate")
+    if rate_df.empty:
+        st.info("No lease history yet (codes generated before block leasing have no timestamps).")
+    else:
+        st.bar_chart(rate_df.set_index("period")[["codes_used"]])
+        st.dataframe(rate_df, hide_index=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("📥 Missing Ranges (CSV)", missing_df.to_csv(index=False), "sequence_missing.csv", "text/csv")
+    with col2:
+        st.download_button("📥 Duplicates (CSV)", duplicates_df.to_csv(index=False), "sequence_duplicates.csv", "text/csv")
+    with col3:
+        st.download_button("📥 Full Report (JSON)", report_to_json(report), "sequence_audit.json", "application/json")
@@ -0,0 +1,80 @@
+import os
+
+from sqlalchemy import event
+
+
+# PRAGMA presets applied to every new SQLite connection.
+#   durable   - WAL + synchronous=FULL: no committed transaction is lost on power failure.
+#   balanced  - WAL + synchronous=NORMAL: default for the app; safe against app crashes,
+#               larger page cache and memory-mapped reads.
+#   bulk-load - synchronous=OFF and a big cache for imports/migrations; run only with backups.
+SQLITE_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 10000,  # ms
+        "cache_size": -16000,  # negative = KiB, ~16 MB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,  # ~64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+    },
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 30000,
+        "cache_size": -256000,  # ~256 MB
+        "mmap_size": 1073741824,  # 1 GB
+        "temp_store": "MEMORY",
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def get_sqlite_settings(profile: str = None) -> dict:
+    """
+    Returns the PRAGMA settings for a preset.
+
+    The preset comes from ``profile`` or the SQLITE_PROFILE environment variable.
+    Single settings can be overridden per deployment with SQLITE_<PRAGMA>, e.g.
+    SQLITE_BUSY_TIMEOUT=15000.
+    """
+    name = profile or os.getenv("SQLITE_PROFILE", DEFAULT_PROFILE)
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"❌ Unknown SQLite profile '{name}'. Choose one of: {', '.join(SQLITE_PROFILES)}")
+
+    settings = dict(SQLITE_PROFILES[name])
+    for pragma in settings:
+        override = os.getenv(f"SQLITE_{pragma.upper()}")
+        if override:
+            settings[pragma] = override
+    return settings
+
+
+def apply_sqlite_profile(engine, profile: str = None):
+    """
+    Registers a connect hook on a SQLite engine that applies the profile's PRAGMAs.
+    Engines for other backends are left untouched.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    settings = get_sqlite_settings(profile)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in settings.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+    return engine
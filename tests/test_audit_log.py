@@ -0,0 +1,69 @@
+"""
+A batch the database rejects must not wedge the audit log writer: the good
+entries are written, the bad ones dropped and counted.
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+
+from audit_log import AuditLogWriter, _is_transient
+from models import Base, CreationLog
+
+
+@pytest.fixture
+def writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    writer = AuditLogWriter(engine, flush_interval=0.05, retry_delay=0.01)
+    yield writer
+    writer.close()
+    engine.dispose()
+
+
+def _logged_codes(writer):
+    with writer.bind.connect() as conn:
+        return sorted(conn.execute(select(CreationLog.code)).scalars())
+
+
+def test_record_rejects_missing_fields(writer):
+    with pytest.raises(ValueError, match="changes"):
+        writer.record("creation", "c1", "t1", "u", None)
+    with pytest.raises(ValueError, match="user"):
+        writer.record("creation", "c1", "t1", "", "created")
+    assert writer.stats()["enqueued"] == 0
+
+
+def test_rejected_entry_is_dropped_and_the_rest_written(writer):
+    writer.record("creation", "c1", "t1", "u", "created")
+    # An entry that bypassed record()'s checks: the NOT NULL constraint rejects the whole batch
+    writer._queue.put(("creation", {"code": "bad", "tasks_assigned": "t1", "created_by": "u", "changes": None}))
+    writer.record("creation", "c2", "t1", "u", "created")
+    assert writer.flush(timeout=5)
+
+    assert _logged_codes(writer) == ["c1", "c2"]
+    stats = writer.stats()
+    assert stats["dropped"] == 1
+    assert stats["failed_flushes"] == 1
+
+    # The writer keeps going afterwards
+    writer.record("creation", "c3", "t1", "u", "created")
+    assert writer.flush(timeout=5)
+    with writer.bind.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(CreationLog)).scalar() == 3
+
+
+def test_schema_errors_are_not_retried(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")  # No log tables: "no such table"
+    writer = AuditLogWriter(engine, flush_interval=0.05, retry_delay=0.01)
+    writer.record("creation", "c1", "t1", "u", "created")
+    assert writer.flush(timeout=5)
+    assert writer.stats()["dropped"] == 1
+    writer.close()
+    engine.dispose()
+
+
+def test_locked_database_is_transient():
+    assert _is_transient(OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked")))
+    assert not _is_transient(OperationalError("INSERT", {}, sqlite3.OperationalError("no such table: creation_log")))
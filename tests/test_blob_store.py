@@ -0,0 +1,56 @@
+"""
+Deleting test cases deletes their attachments and releases their blob references.
+"""
+import io
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from blob_store import blob_path, collect_garbage, delete_test_case_attachments, store_blob
+from models import AttachmentBlob, Attachments, Base
+import models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _attach(session, test_case_id, content, root):
+    digest, path = store_blob(session, io.BytesIO(content), root)
+    session.execute(insert(Attachments).values(
+        file_path=path, blob_digest=digest, project="P", task_assigned="1", test_case_id=test_case_id,
+        test_case="case", status="Pass", build_version="1.0", created_by="alice",
+    ))
+    return digest
+
+
+def test_deleting_test_cases_releases_their_blobs(engine, tmp_path):
+    root = str(tmp_path / "blobs")
+    with Session(engine) as session:
+        session.execute(insert(models.TestCase), [
+            {"id": i, "test_case_id": f"TC{i}", "status": "Pending", "task_id": 1, "created_by": "alice",
+             "timestamp": datetime(2026, 1, 1)}
+            for i in (1, 2)
+        ])
+        shared = _attach(session, 1, b"same screenshot", root)
+        _attach(session, 2, b"same screenshot", root)
+        only_first = _attach(session, 1, b"report", root)
+        session.commit()
+
+        assert delete_test_case_attachments(session, [1]) == 2
+        session.commit()
+
+        counts = dict(session.execute(select(AttachmentBlob.digest, AttachmentBlob.ref_count)).all())
+        assert counts == {shared: 1, only_first: 0}
+        assert session.execute(select(func.count()).select_from(Attachments)).scalar() == 1
+
+    collect_garbage(engine, root, grace_seconds=0)
+    assert not os.path.exists(blob_path(only_first, root))
+    assert os.path.exists(blob_path(shared, root))
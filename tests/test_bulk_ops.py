@@ -0,0 +1,26 @@
+"""
+diff_frames finds the edited cells and refuses a grid that lost its keys.
+"""
+import pandas as pd
+import pytest
+
+from bulk_ops import diff_frames
+
+COLUMNS = {"Status": "status", "Build Version": "build_version"}
+
+
+def _frame(ids, statuses):
+    return pd.DataFrame({"id": ids, "Status": statuses, "Build Version": ["1.0"] * len(ids)})
+
+
+def test_only_changed_cells_are_returned():
+    original = _frame([1, 2], ["Pending", "Pending"])
+    edited = _frame([1, 2], ["Pending", "Pass"])
+    assert diff_frames(original, edited, COLUMNS) == [{"id": 2, "status": "Pass"}]
+
+
+def test_edited_key_is_refused():
+    original = _frame([1, 2], ["Pending", "Pending"])
+    edited = _frame([1, 99], ["Pending", "Pending"])  # Someone typed over an id
+    with pytest.raises(ValueError, match="2"):
+        diff_frames(original, edited, COLUMNS)
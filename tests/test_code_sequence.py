@@ -0,0 +1,161 @@
+"""
+CodeIntervalSet, the compact set of written codes behind the sequence state,
+and the block allocator that records codes per lease.
+"""
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+import models
+from models import (
+    Base, CodeAllocator, CodeIntervalSet, CodeLease, Counter, SequenceState, current_qa_status,
+    rebuild_sequence_state,
+)
+
+
+def _ranges(codes):
+    return list(zip(codes.starts, codes.ends))
+
+
+def test_adjacent_ranges_merge_into_one():
+    codes = CodeIntervalSet()
+    assert codes.add_range(1, 5) == 0
+    assert codes.add_range(6, 10) == 0
+    assert codes.add(11)
+    assert _ranges(codes) == [(1, 11)]
+    assert codes.is_contiguous_from_one()
+
+
+def test_overlapping_ranges_merge_and_count_the_overlap():
+    codes = CodeIntervalSet([(1, 5), (10, 15)])
+    assert codes.add_range(4, 11) == 4  # 4, 5, 10 and 11 were already present
+    assert _ranges(codes) == [(1, 15)]
+
+
+def test_a_range_spanning_several_ranges_swallows_them():
+    codes = CodeIntervalSet([(2, 3), (5, 6), (9, 9)])
+    assert codes.add_range(1, 10) == 5
+    assert _ranges(codes) == [(1, 10)]
+
+
+def test_duplicates_are_detected():
+    codes = CodeIntervalSet([(1, 3)])
+    assert not codes.add(2)
+    assert codes.add_range(3, 3) == 1
+    assert _ranges(codes) == [(1, 3)]
+
+
+def test_gaps_membership_and_coverage():
+    codes = CodeIntervalSet([(1, 3), (7, 8)])
+    assert list(codes.gaps(10)) == [(4, 6), (9, 10)]
+    assert 2 in codes and 5 not in codes
+    assert codes.covers(7, 8) and not codes.covers(3, 7)
+    assert not codes.is_contiguous_from_one()
+
+
+def test_json_round_trip():
+    codes = CodeIntervalSet([(1, 3), (7, 8)])
+    assert _ranges(CodeIntervalSet.from_json(codes.to_json())) == [(1, 3), (7, 8)]
+
+
+def test_remove_range_trims_and_splits():
+    codes = CodeIntervalSet([(1, 10), (20, 30)])
+    codes.remove_range(5, 22)
+    assert _ranges(codes) == [(1, 4), (23, 30)]
+    codes.remove_range(2, 3)
+    assert _ranges(codes) == [(1, 1), (4, 4), (23, 30)]
+    codes.remove_range(40, 50)
+    assert _ranges(codes) == [(1, 1), (4, 4), (23, 30)]
+
+
+# --- Block allocator ---
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'codes.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _write(session, numbers):
+    session.execute(insert(models.TestCodeGeneration), [
+        {"code_number": f"{number:06}", "created_by": "alice", "qa_status": current_qa_status(session)}
+        for number in numbers
+    ])
+    session.commit()
+
+
+def _state(session):
+    session.expire_all()
+    return session.query(SequenceState).one()
+
+
+def test_lease_retries_when_the_counter_moved(session):
+    session.add(Counter(last_code="000000"))
+    session.commit()
+    raced = []
+
+    @event.listens_for(session.get_bind(), "before_cursor_execute", retval=True)
+    def stale_compare(conn, cursor, statement, parameters, context, executemany):
+        # The first compare-and-swap expects a value another process already replaced
+        if statement.startswith("UPDATE counter") and not raced:
+            raced.append(statement)
+            parameters = (*parameters[:-1], "000042")
+        return statement, parameters
+
+    allocator = CodeAllocator(block_size=5)
+    with allocator.issue(session) as codes:
+        assert list(codes) == [1]
+    assert "counter.last_code = ?" in raced[0]
+    session.expire_all()
+    assert session.query(Counter.last_code).scalar() == "000005"
+    assert session.query(CodeLease).count() == 1  # The failed swap leased nothing
+
+
+def test_codes_reach_the_state_once_per_lease(session):
+    allocator = CodeAllocator(block_size=5)
+    with allocator.issue(session) as codes:
+        _write(session, codes)
+    version = _state(session).version
+    for _ in range(3):
+        with allocator.issue(session) as codes:
+            _write(session, codes)
+    assert _state(session).version == version  # Issuing from an open lease writes no state
+
+    allocator.release()  # As at process exit
+    state = _state(session)
+    assert state.allocated_ranges == "[[1,4]]"
+    assert state.leased_ranges == "[]"
+    lease = session.query(CodeLease).one()
+    assert (lease.last_used, lease.released_at is not None) == (4, True)
+    assert rebuild_sequence_state(session)["matches_stored"]
+
+
+def test_failed_inserts_and_unused_codes_are_gaps(session):
+    allocator = CodeAllocator(block_size=5)
+    with allocator.issue(session) as codes:
+        _write(session, codes)  # 1
+    with allocator.issue(session):
+        pass  # 2: the insert failed
+    with allocator.issue(session) as codes:
+        _write(session, codes)  # 3
+    assert current_qa_status(session) == "True"  # Still an open lease: 2 may yet appear
+
+    allocator.release()  # 4 and 5 were never used
+    state = _state(session)
+    assert state.allocated_ranges == "[[1,1],[3,3]]"
+    assert current_qa_status(session) == "False"
+    assert rebuild_sequence_state(session)["missing_ranges"] == [(2, 2)]
+
+
+def test_lease_waits_for_inserts_in_flight(session):
+    allocator = CodeAllocator(block_size=2)
+    with allocator.issue(session) as first:
+        with allocator.issue(session, 2) as second:  # Needs a new block: the first lease is retired
+            assert session.query(CodeLease).filter(CodeLease.released_at.isnot(None)).count() == 0
+            _write(session, second)
+        _write(session, first)
+    # Released after its insert committed, so code 1 is recorded, not a gap
+    assert CodeIntervalSet.from_json(_state(session).allocated_ranges).covers(1, 1)
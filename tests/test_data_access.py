@@ -0,0 +1,33 @@
+"""
+A load that overlaps an invalidation of its table must not be cached.
+"""
+import data_access
+from data_access import _cached, invalidate_user_data
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    invalidate_user_data()
+    calls = []
+
+    def stale_load():
+        calls.append("stale")
+        invalidate_user_data("to_do_list")  # A commit lands while the read is running
+        return "before the write"
+
+    assert _cached("tasks", "alice", None, stale_load) == "before the write"
+    assert ("tasks", "alice", None) not in data_access._cache
+
+    assert _cached("tasks", "alice", None, lambda: "after the write") == "after the write"
+    assert _cached("tasks", "alice", None, stale_load) == "after the write"  # Cached now
+    assert calls == ["stale"]
+
+
+def test_invalidating_another_table_keeps_the_load():
+    invalidate_user_data()
+
+    def load():
+        invalidate_user_data("attachments")
+        return "tasks"
+
+    _cached("tasks", "bob", None, load)
+    assert ("tasks", "bob", None) in data_access._cache
@@ -0,0 +1,51 @@
+"""
+Old values of a grid save come from the database, and row lookups stay
+under the bound-parameter limit however many rows are selected.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from bulk_ops import MAX_BIND_PARAMS, bulk_update
+from history import previous_values, snapshot_rows
+from models import Base, ToDoList
+
+ROWS = MAX_BIND_PARAMS + 50
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 1, 1)
+    task = {
+        "project": "P", "description": "d", "build_version": "1.0", "priority": "High", "severity": "Major",
+        "start_date": now, "end_date": now, "status": "Pending", "time_spent_min": 0, "test_cases": 0,
+        "defects_count": 0, "fixed": 0, "need_to_fix_remaining": 0, "pass_count": 0, "ongoing": 0,
+        "time_spent_per_case_min": 0.0, "created_by": "admin",
+    }
+    with Session(engine) as session:
+        session.execute(insert(ToDoList), [{**task, "id": i, "tasks_assigned": f"T{i}"} for i in range(1, ROWS + 1)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_snapshot_rows_chunks_large_selections(session):
+    rows = snapshot_rows(session, ToDoList, range(1, ROWS + 1))
+    assert sorted(row["id"] for row in rows) == list(range(1, ROWS + 1))
+
+
+def test_previous_values_reads_the_stored_row(session):
+    # Someone else saved after this grid was loaded
+    bulk_update(session, ToDoList, [{"id": 2, "status": "Ongoing"}])
+    session.commit()
+
+    changes = [{"id": 2, "status": "Done"}, {"id": 3, "priority": "Low"}]
+    previous = previous_values(session, ToDoList, changes, "tasks_assigned")
+    assert previous == [
+        {"id": 2, "status": "Ongoing", "tasks_assigned": "T2"},
+        {"id": 3, "priority": "High", "tasks_assigned": "T3"},
+    ]
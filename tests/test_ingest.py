@@ -0,0 +1,29 @@
+"""
+CSV task imports read text columns the same way in every chunk.
+"""
+import io
+
+from ingest import normalize_task_chunk, read_sheet_chunks
+
+
+class Upload(io.BytesIO):
+    name = "tasks.csv"
+
+    @property
+    def size(self):
+        return len(self.getvalue())
+
+
+def test_text_columns_keep_their_text_in_every_chunk():
+    upload = Upload(
+        b"Project,Tasks Assigned,Description,Fixed,Ongoing\n"
+        b"001,NA,first,1,yes\n"
+        b"1.50,12,,,\n"
+    )
+    rows = [normalize_task_chunk(chunk, "alice")[0].iloc[0] for chunk, _ in read_sheet_chunks(upload, chunk_size=1)]
+
+    assert [row["project"] for row in rows] == ["001", "1.50"]  # Not 1 and 1.5
+    assert [row["tasks_assigned"] for row in rows] == ["NA", "12"]  # "NA" is a value, not a missing cell
+    assert [row["description"] for row in rows] == ["first", "N/A"]  # Empty cells still get the default
+    assert [row["fixed"] for row in rows] == [1, 0]
+    assert [row["ongoing"] for row in rows] == [1, 0]
@@ -0,0 +1,21 @@
+"""
+Copying a database leaves the source file as it was: no WAL switch.
+"""
+import sqlite3
+
+from migrate_to_mysql import copy_database
+from models import Base
+
+
+def test_copy_keeps_source_journal_mode(tmp_path):
+    source = tmp_path / "source.db"
+    with sqlite3.connect(source) as conn:
+        conn.execute("CREATE TABLE country_it (id INTEGER PRIMARY KEY, code TEXT, name TEXT, description TEXT, created_by TEXT)")
+        conn.execute("INSERT INTO country_it VALUES (1, 'IT', 'Italy', 'Italy', 'admin')")
+
+    copied = copy_database(Base.metadata, f"sqlite:///{source}", f"sqlite:///{tmp_path / 'target.db'}",
+                           progress=lambda message: None)
+
+    assert copied == {"country_it": 1}
+    with sqlite3.connect(source) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
@@ -0,0 +1,86 @@
+"""
+Upgrades a database at the baseline schema (the checked-in dataQatables.db,
+created before any migration existed) through every migration.
+"""
+import os
+import shutil
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from migrations import _FULL_SCAN, MIGRATIONS, bootstrap, check_query_plans, current_version, upgrade
+from models import Base, User, create_superadmin
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataQatables.db")
+
+
+@pytest.fixture
+def baseline_engine(tmp_path, monkeypatch):
+    if not os.path.exists(BASELINE_DB):
+        pytest.skip("dataQatables.db is not available")
+    path = tmp_path / "baseline.db"
+    shutil.copy(BASELINE_DB, path)
+    # Relative attachment paths resolve inside tmp_path, so migration 4 never touches the repo's files
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def _indexes(engine, tables):
+    inspector = inspect(engine)
+    return {
+        (table, index["name"], tuple(index["column_names"]))
+        for table in tables for index in inspector.get_indexes(table)
+    }
+
+
+def test_upgrade_applies_every_migration_to_baseline(baseline_engine):
+    assert "schema_version" not in inspect(baseline_engine).get_table_names()
+
+    applied = upgrade(baseline_engine, progress=lambda message: None)
+
+    assert applied == [number for number, _, _ in MIGRATIONS]
+    assert current_version(baseline_engine) == MIGRATIONS[-1][0]
+    columns = {column["name"] for column in inspect(baseline_engine).get_columns("test_management")}
+    assert {"ts_number", "tc_number", "scenario_key"} <= columns
+
+
+def test_upgraded_indexes_match_a_fresh_schema(baseline_engine, tmp_path):
+    upgrade(baseline_engine, progress=lambda message: None)
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(fresh)
+
+    tables = set(inspect(baseline_engine).get_table_names()) & set(inspect(fresh).get_table_names())
+    assert _indexes(baseline_engine, tables) == _indexes(fresh, tables)
+    fresh.dispose()
+
+
+def test_bootstrap_baseline_is_repeatable(baseline_engine):
+    bootstrap(baseline_engine, progress=lambda message: None)
+    assert bootstrap(baseline_engine, progress=lambda message: None) == []
+
+
+def test_upgraded_hot_queries_avoid_full_scans(baseline_engine):
+    bootstrap(baseline_engine, progress=lambda message: None)
+    failing = [(name, plan) for name, plan, ok in check_query_plans(baseline_engine) if not ok]
+    assert failing == []
+
+
+def test_scan_through_a_non_covering_index_is_a_full_scan():
+    assert _FULL_SCAN.match("SCAN test_management")
+    assert _FULL_SCAN.match("SCAN test_management USING INDEX ix_test_management_scenario")
+    assert not _FULL_SCAN.match("SCAN to_do_list USING COVERING INDEX ix_to_do_list_rollup")
+    assert not _FULL_SCAN.match("SEARCH test_management USING INDEX ix_test_management_task_id (task_id=?)")
+
+
+def test_create_superadmin_leaves_the_callers_session_open(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        create_superadmin(session)
+        superadmin = session.query(User).filter_by(username="superadmin").one()
+        create_superadmin(session)  # Already there: nothing to do, and the session keeps its objects
+        assert superadmin in session
+    engine.dispose()
@@ -0,0 +1,46 @@
+"""
+The sequence audit labels gaps against the lease history while streaming the codes.
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import models
+from models import Base, CodeLease
+from sequence_audit import audit_sequence
+
+
+def test_gaps_are_split_at_lease_boundaries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'codes.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(models.TestCodeGeneration), [
+            {"code_number": f"{number:06}", "created_by": user}
+            for number, user in [(1, "a"), (2, "a"), (2, "b"), (6, "a"), (12, "b")]
+        ])
+        session.execute(insert(CodeLease), [
+            {"start_code": 3, "end_code": 5, "leased_by": "h:1", "leased_at": datetime(2026, 1, 1, 10, 5),
+             "last_used": 4, "released_at": datetime(2026, 1, 1, 11)},
+            {"start_code": 7, "end_code": 9, "leased_by": "h:2", "leased_at": datetime(2026, 1, 1, 10, 30)},
+            # Open and beyond the last code written: nothing issued from it yet
+            {"start_code": 13, "end_code": 20, "leased_by": "h:3", "leased_at": datetime(2026, 1, 1, 11, 15)},
+        ])
+        session.commit()
+
+        report = audit_sequence(session, chunk_size=2)
+    engine.dispose()
+
+    assert report["total_codes"] == 5
+    assert report["distinct_codes"] == 4
+    assert report["duplicates"] == [{"code_number": "000002", "count": 2, "created_by": "a, b"}]
+    assert report["missing"] == [
+        {"start": 3, "length": 2, "status": "allocated, missing"},
+        {"start": 5, "length": 1, "status": "leased, unused"},
+        {"start": 7, "length": 3, "status": "leased, pending"},
+        {"start": 10, "length": 2, "status": "not leased"},
+    ]
+    assert report["allocation_rate"] == [
+        {"period": datetime(2026, 1, 1, 10), "leases": 2, "codes_leased": 6, "codes_used": 5},
+        {"period": datetime(2026, 1, 1, 11), "leases": 1, "codes_leased": 8, "codes_used": 0},
+    ]